@@ -0,0 +1,109 @@
+"""Measure the memory allocated by the capture add-on for each flow.
+
+Each synthetic flow is passed through the request and response hooks while
+tracemalloc records the peak memory allocated, which is reported as an average
+per flow. Storage keeps no requests, so the figures are the transient cost of
+converting and intercepting flows rather than of holding captured data.
+
+Usage:
+    python -m benchmarks.flow_allocation [--flows N] [--body-size BYTES]
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.flows import make_flow, make_proxy
+from seleniumwire.handler import InterceptRequestHandler
+from seleniumwire.request import Request, RequestView
+
+URL = 'http://127.0.0.1/asset.js'
+
+
+def _request_interceptor(request):
+    request.headers['X-Benchmark'] = '1'
+
+
+def _response_interceptor(request, response):
+    del response.headers['Cache-Control']
+
+
+def measure(func, flows: list) -> float:
+    """Call the function with each flow in turn.
+
+    Returns: The average peak number of bytes allocated by a call.
+    """
+    total = 0
+    tracemalloc.start()
+
+    try:
+        for flow in flows:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            func(flow)
+            _, peak = tracemalloc.get_traced_memory()
+            total += peak - before
+    finally:
+        tracemalloc.stop()
+
+    return total / len(flows)
+
+
+def copy_request(flow):
+    return Request(
+        method=flow.request.method,
+        url=flow.request.url,
+        headers=flow.request.headers.items(),
+        body=flow.request.raw_content,
+    )
+
+
+def view_request(flow):
+    return RequestView(flow.request, flow.request.url)
+
+
+def handle(handler):
+    def func(flow):
+        handler.requestheaders(flow)
+        handler.request(flow)
+        handler.responseheaders(flow)
+        handler.response(flow)
+
+    return func
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--flows', type=int, default=2000, help='The number of flows per measurement.')
+    parser.add_argument('--body-size', type=int, default=10000, help='The size of each response body in bytes.')
+    args = parser.parse_args()
+
+    body = b'x' * args.body_size
+
+    def flows():
+        return [make_flow(URL, body) for _ in range(args.flows)]
+
+    print('Request conversion:')
+    print('  {:<24} {:>10.0f} bytes/flow'.format('copy', measure(copy_request, flows())))
+    print('  {:<24} {:>10.0f} bytes/flow'.format('view', measure(view_request, flows())))
+
+    print('Capture add-on:')
+    runs = [
+        ('no interceptors', {}),
+        (
+            'interceptors',
+            {'request_interceptor': _request_interceptor, 'response_interceptor': _response_interceptor},
+        ),
+    ]
+
+    for name, attrs in runs:
+        proxy = make_proxy(maxsize=0, **attrs)
+
+        try:
+            bytes_per_flow = measure(handle(InterceptRequestHandler(proxy)), flows())
+        finally:
+            proxy.storage.cleanup()
+
+        print('  {:<24} {:>10.0f} bytes/flow'.format(name, bytes_per_flow))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Synthetic flows and a stand-in proxy for timing the capture add-on without a live proxy."""
+from types import SimpleNamespace
+from typing import Optional
+
+from seleniumwire import storage
+from seleniumwire.modifier import RequestModifier
+from seleniumwire.rules import RuleEngine
+from seleniumwire.scope import ScopeMatcher
+from seleniumwire.thirdparty.mitmproxy.connections import ClientConnection, ServerConnection
+from seleniumwire.thirdparty.mitmproxy.http import HTTPFlow, HTTPRequest, HTTPResponse
+
+REQUEST_HEADERS = [(b'Host', b'127.0.0.1'), (b'User-Agent', b'benchmark'), (b'Accept', b'*/*')] * 5
+RESPONSE_HEADERS = [(b'Content-Type', b'application/javascript'), (b'Cache-Control', b'max-age=60')] * 5
+
+
+def make_proxy(scopes: Optional[list] = None, maxsize: int = 100, **attrs) -> SimpleNamespace:
+    """Create a stand-in for MitmProxy with the attributes the capture add-on uses.
+
+    Args:
+        scopes: The capture scopes. Default all URLs.
+        maxsize: The number of requests the in-memory storage holds.
+        attrs: Attributes to override, such as the interceptors.
+    """
+    proxy = SimpleNamespace(
+        options={},
+        storage=storage.create(memory_only=True, maxsize=maxsize),
+        modifier=RequestModifier(),
+        rules=RuleEngine(),
+        scope_matcher=ScopeMatcher(scopes or []),
+        request_interceptor=None,
+        response_interceptor=None,
+        interceptor_executor=None,
+    )
+    vars(proxy).update(attrs)
+
+    return proxy
+
+
+def make_flow(url: str, body: Optional[bytes] = None) -> HTTPFlow:
+    """Create a flow for a GET request to the URL, with a response if a body is supplied."""
+    flow = HTTPFlow(ClientConnection.make_dummy(('127.0.0.1', 0)), ServerConnection.make_dummy(('127.0.0.1', 0)))
+    flow.request = HTTPRequest.make('GET', url, headers=REQUEST_HEADERS)
+
+    if body is not None:
+        flow.response = HTTPResponse.make(200, body, RESPONSE_HEADERS)
+
+    return flow
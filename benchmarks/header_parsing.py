@@ -0,0 +1,90 @@
+"""Measure how quickly the proxy reads request heads and bodies from connections.
+
+Header-heavy requests are written back to back to one end of a socket pair by a
+thread, and their heads are parsed from the other end as the proxy parses them.
+Then bodies of growing size are read in a single read, which takes time in
+proportion to their size.
+
+Usage:
+    python -m benchmarks.header_parsing [--requests N] [--headers N]
+"""
+import argparse
+import socket
+import threading
+import time
+
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+from seleniumwire.thirdparty.mitmproxy.net.http import http1
+
+
+def _request(headers: int) -> bytes:
+    lines = [
+        b'GET https://www.example.com/search?q=selenium+wire&page=2 HTTP/1.1',
+        b'Host: www.example.com',
+        b'User-Agent: Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0',
+        b'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        b'Accept-Language: en-GB,en;q=0.9',
+        b'Cookie: ' + b'; '.join(b'session_%d=%s' % (i, b'0123456789abcdef' * 2) for i in range(8)),
+    ]
+    lines += [b'X-Custom-Header-%d: value-%d-%s' % (i, i, b'x' * 24) for i in range(headers - len(lines) + 1)]
+    return b'\r\n'.join(lines) + b'\r\n\r\n'
+
+
+def _reader(data: bytes) -> tcp.Reader:
+    """A reader of the data, which a thread writes to a socket pair."""
+    writer, reader = socket.socketpair()
+
+    def write():
+        with writer:
+            writer.sendall(data)
+
+    threading.Thread(target=write, daemon=True).start()
+
+    return tcp.Reader(socket.SocketIO(reader, 'rb'))
+
+
+def run_heads(requests: int, headers: int) -> float:
+    """Parse the heads of requests written back to back.
+
+    Returns: The time taken to parse each head, in microseconds.
+    """
+    rfile = _reader(_request(headers) * requests)
+    start = time.perf_counter()
+
+    for _ in range(requests):
+        http1.read_request_head(rfile)
+
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def run_body(size: int) -> float:
+    """Read a body of the size in a single read.
+
+    Returns: The time taken, in milliseconds.
+    """
+    rfile = _reader(b'x' * size)
+    start = time.perf_counter()
+    rfile.safe_read(size)
+
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='The number of requests to parse.')
+    parser.add_argument('--headers', type=int, default=40, help='The number of headers in each request.')
+    args = parser.parse_args()
+
+    size = len(_request(args.headers))
+    print('Request heads ({} headers, {} bytes):'.format(args.headers, size))
+    per_head = run_heads(args.requests, args.headers)
+    print('  {:>8.1f} us per head  {:>6.1f} MB/s'.format(per_head, size / per_head))
+
+    print('Bodies read in one read:')
+
+    for mb in (1, 4, 16):
+        print('  {:>3} MB  {:>8.1f} ms'.format(mb, run_body(mb * 1024 * 1024)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""A local TLS server for benchmarks to make connections to."""
+import http.server
+import os
+import ssl
+import tempfile
+import threading
+
+from OpenSSL import crypto
+
+from seleniumwire.thirdparty.mitmproxy import certs
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """Responds to every request with a short body, and counts the requests made over resumed TLS sessions."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    resumed = 0
+
+    def do_GET(self):
+        if self.connection.session_reused:
+            type(self).resumed += 1
+
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+def create_tls_server(tls_version: str = '1.3') -> http.server.ThreadingHTTPServer:
+    """Start a TLS server on a thread of its own.
+
+    Args:
+        tls_version: The highest TLS version the server accepts, 1.2 or 1.3.
+
+    Returns: The server, which is serving.
+    """
+    # A certificate for the server signed by a CA of its own
+    store_dir = tempfile.mkdtemp()
+    store = certs.CertStore.from_store(store_dir, 'origin', 2048)
+    cert, key, _ = store.get_cert(b'127.0.0.1', [b'127.0.0.1'])
+    cert_file = os.path.join(store_dir, 'server.pem')
+
+    with open(cert_file, 'wb') as f:
+        f.write(cert.to_pem())
+        f.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, key))
+
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_file)
+    context.maximum_version = ssl.TLSVersion.TLSv1_2 if tls_version == '1.2' else ssl.TLSVersion.TLSv1_3
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
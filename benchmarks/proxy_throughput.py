@@ -0,0 +1,137 @@
+"""Measure proxy throughput with request capture enabled and disabled.
+
+Requests are sent over keep-alive connections through the proxy to a local
+HTTP server, so the figures reflect the cost of handling flows in the proxy
+rather than of the network. The request hooks of the capture add-on are
+also timed on their own, without the proxy, since their cost is otherwise
+hidden by the cost of relaying the traffic.
+
+Usage:
+    python -m benchmarks.proxy_throughput [--requests N] [--clients N] [--body-size BYTES]
+"""
+import argparse
+import http.client
+import http.server
+import threading
+import time
+
+from benchmarks.flows import make_flow, make_proxy
+from seleniumwire import backend
+from seleniumwire.handler import InterceptRequestHandler
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Avoid delayed acknowledgements dominating the timings
+    disable_nagle_algorithm = True
+    body = b''
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/javascript')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _client(addr: str, port: int, url: str, requests: int, ready: threading.Barrier) -> None:
+    conn = http.client.HTTPConnection(addr, port)
+
+    # Warm up the connection to the server
+    conn.request('GET', url)
+    conn.getresponse().read()
+    ready.wait()
+
+    for _ in range(requests):
+        conn.request('GET', url)
+        conn.getresponse().read()
+
+    conn.close()
+
+
+def run(options: dict, url: str, requests: int, clients: int) -> float:
+    """Send requests from concurrent clients through a new proxy configured with the options.
+
+    Returns: The number of requests handled per second.
+    """
+    proxy = backend.create(options=options)
+
+    try:
+        addr, port, *_ = proxy.address()
+        ready = threading.Barrier(clients + 1)
+        threads = [
+            threading.Thread(target=_client, args=(addr, port, url, requests // clients, ready)) for _ in range(clients)
+        ]
+
+        for t in threads:
+            t.start()
+
+        ready.wait()
+        start = time.perf_counter()
+
+        for t in threads:
+            t.join()
+
+        elapsed = time.perf_counter() - start
+    finally:
+        proxy.shutdown()
+
+    return (requests // clients) * clients / elapsed
+
+
+def run_handler(scopes: list, url: str, requests: int) -> float:
+    """Pass synthetic flows through the request hooks of the capture add-on.
+
+    Returns: The number of flows handled per second.
+    """
+    proxy = make_proxy(scopes)
+    handler = InterceptRequestHandler(proxy)
+    flows = [make_flow(url) for _ in range(requests)]
+
+    try:
+        start = time.perf_counter()
+
+        for flow in flows:
+            handler.requestheaders(flow)
+            handler.request(flow)
+
+        return requests / (time.perf_counter() - start)
+    finally:
+        proxy.storage.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='The number of requests per run.')
+    parser.add_argument('--clients', type=int, default=50, help='The number of concurrent clients.')
+    parser.add_argument('--body-size', type=int, default=10000, help='The size of each response body in bytes.')
+    args = parser.parse_args()
+
+    _Handler.body = b'x' * args.body_size
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:{}/asset.js'.format(server.server_port)
+
+    runs = [
+        ('capture enabled', {'request_storage': 'memory'}),
+        ('out of scope', {'request_storage': 'memory', 'ignore_http_methods': ['GET']}),
+        ('capture disabled', {'request_storage': 'memory', 'disable_capture': True}),
+    ]
+
+    try:
+        print('Proxy:')
+        for name, options in runs:
+            print('  {:<20} {:>10.1f} requests/s'.format(name, run(options, url, args.requests, args.clients)))
+    finally:
+        server.shutdown()
+
+    print('Capture add-on:')
+    for name, scopes in [('capture enabled', []), ('capture disabled', ['$^'])]:
+        print('  {:<20} {:>10.1f} requests/s'.format(name, run_handler(scopes, url, args.requests * 10)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Measure how quickly the proxy completes TLS handshakes with clients, by key type.
+
+Handshakes are made with a certificate from the certificate store in the way the
+proxy makes them with clients, first for RSA certificates and then for ECDSA
+certificates, both signed by an RSA CA. Each handshake is made over a new socket
+pair, with a client on another thread. Besides the time each handshake takes, the
+CPU time the proxy's side of it takes is reported, as that is what limits the
+number of handshakes the proxy can make at once.
+
+The same is then measured end to end, with each request sent over a new client
+connection that tunnels through the proxy to a local TLS server.
+
+Usage:
+    python -m benchmarks.tls_handshakes [--handshakes N] [--tls-version {1.2,1.3}]
+"""
+import argparse
+import http.client
+import queue
+import socket
+import ssl
+import statistics
+import tempfile
+import threading
+import time
+
+from OpenSSL import SSL
+
+from benchmarks.origin import create_tls_server
+from seleniumwire import backend
+from seleniumwire.thirdparty.mitmproxy import certs
+from seleniumwire.thirdparty.mitmproxy.net import tls
+from seleniumwire.thirdparty.mitmproxy.server.protocol.tls import DEFAULT_CLIENT_CIPHERS
+
+
+def _client_context(tls_version: str) -> ssl.SSLContext:
+    context = ssl._create_unverified_context()
+    context.maximum_version = ssl.TLSVersion.TLSv1_2 if tls_version == '1.2' else ssl.TLSVersion.TLSv1_3
+    return context
+
+
+def run_handshakes(key_type: str, tls_version: str, handshakes: int) -> list:
+    """Make TLS handshakes with a certificate from a store of the key type, as the proxy does with clients.
+
+    Returns: The time taken by each handshake and the CPU time taken by the proxy's side of it, in milliseconds.
+    """
+    store = certs.CertStore.from_store(tempfile.mkdtemp(), 'seleniumwire', 2048, key_type=key_type)
+    cert, key, chain_file = store.get_cert(b'example.test', [b'example.test'])
+    server_context = tls.create_server_context(
+        cert=cert, key=key, chain_file=chain_file, dhparams=store.dhparams, cipher_list=DEFAULT_CLIENT_CIPHERS
+    )
+    client_context = _client_context(tls_version)
+    sockets = queue.Queue()
+
+    def client():
+        while True:
+            sock = sockets.get()
+
+            if sock is None:
+                return
+
+            with client_context.wrap_socket(sock, server_hostname='example.test'):
+                pass
+
+    thread = threading.Thread(target=client, daemon=True)
+    thread.start()
+    timings, cpu_timings = [], []
+
+    try:
+        for _ in range(handshakes):
+            server_sock, client_sock = socket.socketpair()
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            sockets.put(client_sock)
+            conn = SSL.Connection(server_context, server_sock)
+            conn.set_accept_state()
+            conn.do_handshake()
+            timings.append((time.perf_counter() - start) * 1000)
+            cpu_timings.append((time.thread_time() - cpu_start) * 1000)
+            server_sock.close()
+    finally:
+        sockets.put(None)
+        thread.join()
+
+    return timings, cpu_timings
+
+
+def run_proxy(key_type: str, tls_version: str, handshakes: int) -> list:
+    """Send each request over a new connection through a proxy that generates certificates of the key type.
+
+    Returns: The time taken by each request, in milliseconds, and None for the CPU time.
+    """
+    server = create_tls_server()
+    proxy = backend.create(options={'request_storage': 'memory', 'key_type': key_type, 'cert_store_persist': False})
+    client_context = _client_context(tls_version)
+    timings = []
+
+    try:
+        addr, proxy_port, *_ = proxy.address()
+
+        for _ in range(handshakes):
+            start = time.perf_counter()
+            conn = http.client.HTTPSConnection(addr, proxy_port, context=client_context)
+            conn.set_tunnel('127.0.0.1', server.server_port)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            timings.append((time.perf_counter() - start) * 1000)
+            conn.close()
+    finally:
+        proxy.shutdown()
+        server.shutdown()
+
+    return timings, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--handshakes', type=int, default=300, help='The number of handshakes per run.')
+    parser.add_argument('--tls-version', choices=['1.2', '1.3'], default='1.3', help='The TLS version of the client.')
+    args = parser.parse_args()
+
+    for title, run in [('Client handshakes', run_handshakes), ('Through the proxy', run_proxy)]:
+        print('{} (TLS {}):'.format(title, args.tls_version))
+
+        for key_type in certs.KEY_TYPES:
+            timings, cpu_timings = run(key_type, args.tls_version, args.handshakes)
+            line = '  {:<6} median {:>6.2f} ms  p90 {:>6.2f} ms'.format(
+                key_type, statistics.median(timings), statistics.quantiles(timings, n=10)[-1]
+            )
+
+            if cpu_timings:
+                line += '  proxy CPU median {:>5.2f} ms'.format(statistics.median(cpu_timings))
+
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Measure the latency of setting up TLS connections to servers.
+
+Connections are made to a local TLS server in the way the proxy makes them, and
+each is used for a single request. The figures are compared with no contexts or
+sessions cached, with SSL contexts cached, and with TLS sessions cached too so that
+connections resume a session rather than make a full handshake. The server reports
+how many of the connections resumed a session.
+
+The same is then measured end to end, with each request sent over a new client
+connection that tunnels through the proxy, so that the proxy makes a new TLS
+connection to the server for every request.
+
+Usage:
+    python -m benchmarks.tls_setup [--requests N] [--tls-version {1.2,1.3}]
+"""
+import argparse
+import http.client
+import ssl
+import statistics
+import time
+
+from OpenSSL import SSL
+
+from benchmarks.origin import Handler, create_tls_server
+from seleniumwire import backend
+from seleniumwire.thirdparty.mitmproxy import connections
+from seleniumwire.thirdparty.mitmproxy.net import tls
+
+
+def run_connections(context_cache: tls.ContextCache, port: int, requests: int) -> list:
+    """Make a TLS connection to the server for each request, as the proxy does.
+
+    Returns: The time taken by each request, in milliseconds.
+    """
+    timings = []
+
+    for _ in range(requests):
+        start = time.perf_counter()
+        conn = connections.ServerConnection(('127.0.0.1', port))
+        conn.connect()
+        conn.establish_tls(
+            sni='127.0.0.1', alpn_protos=[b'http/1.1'], verify=SSL.VERIFY_NONE, context_cache=context_cache
+        )
+        conn.wfile.write(b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n')
+        conn.wfile.flush()
+
+        # Read the status line and headers, then the body
+        while conn.rfile.readline() not in (b'\r\n', b''):
+            pass
+        conn.rfile.read(2)
+
+        timings.append((time.perf_counter() - start) * 1000)
+        conn.finish()
+        conn.close()
+
+    return timings
+
+
+def run_proxy(context_cache: tls.ContextCache, port: int, requests: int) -> list:
+    """Send each request over a new connection through a proxy that uses the context cache.
+
+    Returns: The time taken by each request, in milliseconds.
+    """
+    proxy = backend.create(options={'request_storage': 'memory'})
+    proxy.master.server.config.context_cache = context_cache
+    client_context = ssl._create_unverified_context()
+    timings = []
+
+    try:
+        addr, proxy_port, *_ = proxy.address()
+
+        for _ in range(requests):
+            start = time.perf_counter()
+            conn = http.client.HTTPSConnection(addr, proxy_port, context=client_context)
+            conn.set_tunnel('127.0.0.1', port)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            timings.append((time.perf_counter() - start) * 1000)
+            conn.close()
+    finally:
+        proxy.shutdown()
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='The number of requests per run.')
+    parser.add_argument('--tls-version', choices=['1.2', '1.3'], default='1.3', help='The TLS version of the server.')
+    args = parser.parse_args()
+
+    server = create_tls_server(args.tls_version)
+
+    try:
+        for title, run in [('Server connections', run_connections), ('Through the proxy', run_proxy)]:
+            print('{} (TLS {}):'.format(title, args.tls_version))
+
+            runs = [
+                # A cache that holds nothing creates a context for every connection, as without a cache
+                ('no caching', tls.ContextCache(max_contexts=0, max_sessions=0)),
+                ('contexts cached', tls.ContextCache(max_sessions=0)),
+                ('sessions cached', tls.ContextCache()),
+            ]
+
+            for name, context_cache in runs:
+                Handler.resumed = 0
+                timings = run(context_cache, server.server_port, args.requests)
+                print('  {:<16} median {:>6.2f} ms  p90 {:>6.2f} ms  resumed {:>4}/{}'.format(
+                    name,
+                    statistics.median(timings),
+                    statistics.quantiles(timings, n=10)[-1],
+                    Handler.resumed,
+                    args.requests,
+                ))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
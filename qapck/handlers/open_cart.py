@@ -3,15 +3,26 @@ from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from .load import load_driver, manual_load_driver
-from typing import List, Dict
+from typing import Any, List, Dict
 
 from ..misc import (
     resp_json,
     await_string_in_url,
-    cloudflare
+    cloudflare,
+    parse_cell
 )
 
 
+# Collects the cell text of every row in a single WebDriver round trip.
+# Mirrors `find_elements(By.TAG_NAME, ...)` + `.text` on each element.
+TABLE_SCRIPT = """
+const rows = arguments[0].querySelectorAll('tr');
+return Array.from(rows, row => Array.from(
+    row.querySelectorAll('td'), cell => (cell.innerText || '').trim()
+));
+"""
+
+
 class OpenCart:
     """
     A class to represent the OpenCart functionalities.
@@ -216,28 +227,43 @@ class OpenCart:
         self.get(self.build_url(url))
         await_string_in_url(self.driver, category_path)
 
-    def get_table(self, table: WebElement = None) -> dict:
+    def get_table(self, table: WebElement = None, bulk: bool = True, typed: bool = False) -> List[Dict[str, Any]]:
         """
         Retrieve the items from the table on the current page.
 
+        Args:
+            - table (WebElement): The table to read. Defaults to the first table on the page.
+            - bulk (bool): Read the whole table in a single `execute_script` round trip.
+            - typed (bool): Parse price and date cells into floats and datetimes.
+
         Returns:
-            - dict: The items from the table and table name.
+            - List[Dict[str, Any]]: The rows of the table keyed by header. The cells are strings,
+              or with `typed` the values `parse_cell` parses them into where it can.
         """
-        items = []
-        table = WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "table"))
-        )
+        if table is None:
+            table = WebDriverWait(self.driver, 10).until(
+                EC.presence_of_element_located((By.TAG_NAME, "table"))
+            )
+
+        if bulk:
+            rows = self.driver.execute_script(TABLE_SCRIPT, table)
+        else:
+            rows = [
+                [cell.text for cell in row.find_elements(By.TAG_NAME, "td")]
+                for row in table.find_elements(By.TAG_NAME, "tr")
+            ]
+
+        if not rows:
+            return []
 
-        rows = table.find_elements(By.TAG_NAME, "tr")
-        headers = rows[0].find_elements(By.TAG_NAME, "td")
-        headers = [header.text for header in headers]
+        items = []
+        headers = rows[0]
 
         for row in rows[1:]:
             item = {}
-            cells = [td for td in row.find_elements(By.TAG_NAME, "td")]
-            for header, value in zip(headers, cells):
-                if header.strip() and value.text.strip():
-                    item[header] = value.text
+            for header, value in zip(headers, row):
+                if header.strip() and value.strip():
+                    item[header] = parse_cell(value) if typed else value
             if item: items.append(item)
-            
-        return items
\ No newline at end of file
+
+        return items
@@ -25,9 +25,15 @@ __all__ = [
     'disable_logging',
     'cloudflare',
     'get_pagination',
-    'sleep_for'
+    'sleep_for',
+    'parse_price',
+    'parse_date',
+    'parse_cell'
 ]
 
+PRICE_PATTERN = re.compile(r'^-?[$\u00a3\u20ac]\s*-?[\d,]+(\.\d+)?$')
+DATE_FORMAT = '%d/%m/%Y'
+
 def timed_await(max_seconds: int):
     """
     Decorator to limit the time a function can run for.
@@ -237,4 +243,53 @@ def sleep_for(seconds: float = 2.0):
             time.sleep(seconds)
             return func(*args, **kwargs)
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+def parse_price(text: str) -> Union[float, None]:
+    """
+    Parse a price cell such as "$1,234.00" into a float.
+
+    Special prices are rendered below the regular price, only the first line is used.
+
+    Args:
+        text (str): The cell text.
+
+    Returns:
+        Union[float, None]: The price, or None if the text is not a price.
+    """
+    text = text.split('\n')[0].strip()
+    if not PRICE_PATTERN.match(text):
+        return None
+    value = float(re.sub(r'[^\d.]', '', text))
+    return -value if '-' in text else value
+
+def parse_date(text: str) -> Union[datetime, None]:
+    """
+    Parse a date cell such as "30/09/2024" into a datetime.
+
+    Args:
+        text (str): The cell text.
+
+    Returns:
+        Union[datetime, None]: The date, or None if the text is not a date.
+    """
+    try:
+        return datetime.strptime(text.strip(), DATE_FORMAT)
+    except ValueError:
+        return None
+
+def parse_cell(text: str) -> Union[str, float, datetime]:
+    """
+    Parse a table cell into a price or date where possible.
+
+    Args:
+        text (str): The cell text.
+
+    Returns:
+        Union[str, float, datetime]: The parsed value, or the original text.
+    """
+    for parser in (parse_price, parse_date):
+        value = parser(text)
+        if value is not None:
+            return value
+    return text
@@ -0,0 +1,508 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from seleniumwire.thirdparty.mitmproxy.http import HTTPResponse
+from seleniumwire.thirdparty.mitmproxy.net import websockets
+from seleniumwire.thirdparty.mitmproxy.net.http.headers import Headers
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_MEMORY = 64 * 1024 * 1024
+DEFAULT_MAX_DISK = 512 * 1024 * 1024
+
+# Status codes that can be cached without explicit freshness information.
+CACHEABLE_STATUS_CODES = frozenset({200, 203, 204, 300, 301, 308, 404, 405, 410, 414, 501})
+
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'TRACE'})
+
+# Headers of a 304 response that don't replace those of the stored response.
+NOT_UPDATED_HEADERS = frozenset({'content-length', 'content-encoding', 'transfer-encoding', 'content-range'})
+
+# The fraction of the time since a response was last modified that it is considered
+# fresh for, when it has no explicit freshness lifetime.
+HEURISTIC_FRACTION = 0.1
+
+
+class _CacheEntry:
+    """A stored response, along with what is needed to judge its freshness."""
+
+    __slots__ = ('url', 'status_code', 'reason', 'fields', 'body', 'vary', 'response_time', 'initial_age', 'lifetime')
+
+    def __init__(self, url: str, response, vary: Tuple[Tuple[str, Optional[str]], ...]):
+        self.url = url
+        self.status_code = response.status_code
+        self.reason = response.data.reason
+        self.fields = response.headers.fields
+        self.body = response.raw_content or b''
+        # The names and values of the request headers the response varies by
+        self.vary = vary
+        self.refresh(response.headers)
+
+    def refresh(self, headers: Headers):
+        """Reset the age and freshness lifetime of the entry from the headers of a response just received."""
+        self.response_time = now = time.time()
+        date = _parse_date(headers.get('Date'))
+
+        try:
+            age = max(int(headers.get('Age', 0)), 0)
+        except ValueError:
+            age = 0
+
+        self.initial_age = max(age, now - date if date is not None else 0)
+        self.lifetime = _freshness_lifetime(headers, date if date is not None else now)
+
+    def age(self) -> float:
+        return self.initial_age + time.time() - self.response_time
+
+    def is_fresh(self) -> bool:
+        return self.age() < self.lifetime
+
+    def make_response(self) -> HTTPResponse:
+        now = time.time()
+        response = HTTPResponse(
+            b'HTTP/1.1', self.status_code, self.reason, Headers(self.fields), self.body, None, now, now
+        )
+        response.headers['Age'] = str(int(self.age()))
+
+        return response
+
+
+class ResponseCache:
+    """Caches responses to GET requests so that they need not be fetched upstream again.
+
+    Responses are stored according to their Cache-Control, Expires and Vary headers,
+    in the manner of a shared cache. A stored response is served without contacting
+    the server while it is fresh. Once stale, it is revalidated with If-None-Match
+    or If-Modified-Since, and served again if the server replies 304 Not Modified.
+
+    Recently used responses are held in memory, and every response is also written
+    to a directory, which outlives the proxy so that later sessions start warm. Both
+    tiers are limited in size, discarding the least recently used responses first.
+
+    Instances of this class are designed to be threadsafe.
+    """
+
+    def __init__(self, cache_dir: str, max_memory: Optional[int] = None, max_disk: Optional[int] = None):
+        """Initialise a new ResponseCache.
+
+        Args:
+            cache_dir: The directory the responses are written to.
+            max_memory: The maximum number of body bytes held in memory. Default 64MB.
+            max_disk: The maximum number of bytes held on disk. Default 512MB.
+        """
+        self.cache_dir = cache_dir
+        self.max_memory = max_memory if max_memory is not None else DEFAULT_MAX_MEMORY
+        self.max_disk = max_disk if max_disk is not None else DEFAULT_MAX_DISK
+        self._lock = threading.Lock()
+        # Entries and sizes keyed by the digest of their URL, least recently used first.
+        self._memory: Dict[str, _CacheEntry] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: Dict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._bytes_saved = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_disk()
+
+    def _index_disk(self):
+        """Index the responses written to disk by earlier sessions, oldest use first."""
+        files = []
+
+        with os.scandir(self.cache_dir) as it:
+            for e in it:
+                if e.is_file() and not e.name.startswith('.'):
+                    stat = e.stat()
+                    files.append((stat.st_mtime, e.name, stat.st_size))
+
+        for _, digest, size in sorted(files):
+            self._disk[digest] = size
+            self._disk_bytes += size
+
+        self._evict_disk()
+
+    def apply_request(self, flow) -> None:
+        """Serve the request of a flow from the cache if possible.
+
+        A fresh response is set on the flow, so that it isn't sent upstream. Otherwise a
+        stale response is revalidated by making the request conditional.
+
+        Args:
+            flow: The mitmproxy flow.
+        """
+        request = flow.request
+
+        if request.method != 'GET' or not _may_use_cache(request.headers):
+            return
+
+        url = request.url
+        directives = _parse_cache_control(request.headers.get('Cache-Control'))
+
+        if 'no-store' in directives:
+            return
+
+        flow.metadata['seleniumwire_cache'] = url
+        entry = self._get(url)
+
+        if entry is not None and entry.vary != _vary_values(entry.fields, request.headers):
+            entry = None
+
+        if entry is None:
+            with self._lock:
+                self._misses += 1
+            return
+
+        no_cache = 'no-cache' in directives or directives.get('max-age') == '0' or 'no-cache' in (
+            request.headers.get('Pragma') or ''
+        )
+
+        if entry.is_fresh() and not no_cache:
+            flow.response = entry.make_response()
+            flow.metadata['seleniumwire_cache_hit'] = True
+
+            with self._lock:
+                self._hits += 1
+                self._bytes_saved += len(entry.body)
+
+            log.debug('Serving %s from the cache', url)
+            return
+
+        stored = Headers(entry.fields)
+        etag, last_modified = stored.get('ETag'), stored.get('Last-Modified')
+
+        if etag is None and last_modified is None:
+            with self._lock:
+                self._misses += 1
+            return
+
+        # Revalidate the stored response in place of whatever the client holds
+        for name in ('If-None-Match', 'If-Modified-Since'):
+            if name in request.headers:
+                del request.headers[name]
+
+        if etag is not None:
+            request.headers['If-None-Match'] = etag
+        if last_modified is not None:
+            request.headers['If-Modified-Since'] = last_modified
+
+        flow.metadata['seleniumwire_cache_entry'] = entry
+
+    def will_store(self, flow) -> bool:
+        """Whether the response of a flow will be stored, judged from its headers.
+
+        Args:
+            flow: The mitmproxy flow, whose response body has not been read yet.
+
+        Returns: True if the response will be stored, in which case the body must not be streamed.
+        """
+        if 'seleniumwire_cache' not in flow.metadata or flow.metadata.get('seleniumwire_cache_hit'):
+            return False
+
+        if flow.response.stream or not _is_storable(flow.request.headers, flow.response):
+            return False
+
+        try:
+            return int(flow.response.headers.get('Content-Length', 0)) <= self.max_disk
+        except ValueError:
+            return True
+
+    def apply_response(self, flow) -> None:
+        """Store the response of a flow, or serve the stored response the server revalidated.
+
+        Args:
+            flow: The mitmproxy flow.
+        """
+        if flow.request.method not in SAFE_METHODS and flow.response.status_code < 400:
+            # The stored response is likely to have changed
+            self._delete(flow.request.url)
+            return
+
+        url = flow.metadata.get('seleniumwire_cache')
+
+        if url is None or flow.metadata.get('seleniumwire_cache_hit'):
+            return
+
+        response = flow.response
+        entry = flow.metadata.get('seleniumwire_cache_entry')
+
+        if entry is not None and response.status_code == 304:
+            stored = Headers(entry.fields)
+
+            for name, value in response.headers.items():
+                if name.lower() not in NOT_UPDATED_HEADERS:
+                    stored[name] = value
+
+            entry.fields = stored.fields
+            entry.refresh(response.headers)
+            self._put(url, entry)
+            flow.response = entry.make_response()
+
+            with self._lock:
+                self._revalidated += 1
+                self._bytes_saved += len(entry.body)
+
+            log.debug('Serving %s from the cache after revalidating it', url)
+            return
+
+        if entry is not None:
+            with self._lock:
+                self._misses += 1
+
+        if response.raw_content is not None and _is_storable(flow.request.headers, response):
+            self._put(url, _CacheEntry(url, response, _vary_values(response.headers.fields, flow.request.headers)))
+        else:
+            self._delete(url)
+
+    def stats(self) -> dict:
+        """Report how well the cache is saving responses being fetched.
+
+        Returns: A dictionary with the keys 'hits', 'revalidated', 'misses', 'bytes_saved',
+            'entries', 'memory_bytes' and 'disk_bytes'.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'revalidated': self._revalidated,
+                'misses': self._misses,
+                'bytes_saved': self._bytes_saved,
+                'entries': len(self._disk.keys() | self._memory.keys()),
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes,
+            }
+
+    def clear(self) -> None:
+        """Remove every stored response, both from memory and from disk."""
+        with self._lock:
+            digests = list(self._disk)
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk.clear()
+            self._disk_bytes = 0
+
+        for digest in digests:
+            self._remove_file(digest)
+
+    def _get(self, url: str) -> Optional[_CacheEntry]:
+        digest = _digest(url)
+
+        with self._lock:
+            entry = self._memory.get(digest)
+
+            if entry is not None:
+                self._memory.move_to_end(digest)
+                if digest in self._disk:
+                    self._disk.move_to_end(digest)
+                return entry
+
+            if digest not in self._disk:
+                return None
+
+            self._disk.move_to_end(digest)
+
+        path = os.path.join(self.cache_dir, digest)
+
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            # Record the use for the sessions that follow
+            os.utime(path)
+        except FileNotFoundError:
+            # Can happen if another session sharing the directory removed it
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(digest, 0)
+            return None
+        except Exception as e:
+            log.warning('Could not load cached response for %s: %r', url, e)
+            return None
+
+        if entry.url != url:
+            return None
+
+        with self._lock:
+            self._add_to_memory(digest, entry)
+
+        return entry
+
+    def _put(self, url: str, entry: _CacheEntry) -> None:
+        digest = _digest(url)
+        data = pickle.dumps(entry)
+        size = len(data)
+
+        if size > self.max_disk:
+            self._delete(url)
+            return
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.')
+
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+
+            os.replace(tmp_path, os.path.join(self.cache_dir, digest))
+        except OSError as e:
+            log.warning('Could not write cached response for %s: %r', url, e)
+        else:
+            with self._lock:
+                self._disk_bytes += size - self._disk.pop(digest, 0)
+                self._disk[digest] = size
+                evicted = self._evict_disk()
+
+            for d in evicted:
+                self._remove_file(d)
+
+        with self._lock:
+            self._add_to_memory(digest, entry)
+
+    def _delete(self, url: str) -> None:
+        digest = _digest(url)
+
+        with self._lock:
+            entry = self._memory.pop(digest, None)
+            if entry is not None:
+                self._memory_bytes -= len(entry.body)
+
+            if digest not in self._disk:
+                return
+
+            self._disk_bytes -= self._disk.pop(digest)
+
+        self._remove_file(digest)
+
+    def _add_to_memory(self, digest: str, entry: _CacheEntry) -> None:
+        old = self._memory.pop(digest, None)
+        if old is not None:
+            self._memory_bytes -= len(old.body)
+
+        if len(entry.body) > self.max_memory:
+            return
+
+        self._memory[digest] = entry
+        self._memory_bytes += len(entry.body)
+
+        while self._memory_bytes > self.max_memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.body)
+
+    def _evict_disk(self) -> list:
+        """Forget the least recently used responses on disk until under the limit.
+
+        Returns: The digests of the responses, whose files are to be removed.
+        """
+        evicted = []
+
+        while self._disk_bytes > self.max_disk:
+            digest, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(digest)
+
+        return evicted
+
+    def _remove_file(self, digest: str) -> None:
+        try:
+            os.remove(os.path.join(self.cache_dir, digest))
+        except OSError:
+            pass
+
+
+def _digest(url: str) -> str:
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def _parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+
+    for directive in (value or '').split(','):
+        name, _, arg = directive.partition('=')
+        name = name.strip().lower()
+
+        if name:
+            directives[name] = arg.strip().strip('"') if arg else None
+
+    return directives
+
+
+def _parse_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _freshness_lifetime(headers: Headers, date: float) -> float:
+    directives = _parse_cache_control(headers.get('Cache-Control'))
+
+    if 'no-cache' in directives:
+        return 0
+
+    for name in ('s-maxage', 'max-age'):
+        if name in directives:
+            try:
+                return max(int(directives[name]), 0)
+            except (TypeError, ValueError):
+                return 0
+
+    if 'Expires' in headers:
+        expires = _parse_date(headers['Expires'])
+        return max(expires - date, 0) if expires is not None else 0
+
+    last_modified = _parse_date(headers.get('Last-Modified'))
+
+    if last_modified is not None:
+        return max(date - last_modified, 0) * HEURISTIC_FRACTION
+
+    return 0
+
+
+def _may_use_cache(headers: Headers) -> bool:
+    # Responses to authorised, partial and websocket requests are not shared
+    if 'Authorization' in headers or 'Range' in headers:
+        return False
+
+    return not websockets.check_handshake(headers)
+
+
+def _is_storable(request_headers: Headers, response) -> bool:
+    if response.status_code not in CACHEABLE_STATUS_CODES or not _may_use_cache(request_headers):
+        return False
+
+    headers = response.headers
+    directives = _parse_cache_control(headers.get('Cache-Control'))
+
+    if 'no-store' in directives or 'private' in directives or 'Set-Cookie' in headers:
+        return False
+
+    if headers.get('Vary', '').strip() == '*':
+        return False
+
+    # Keep only responses that can be served fresh, or at least revalidated
+    return (
+        'ETag' in headers
+        or 'Last-Modified' in headers
+        or 'Expires' in headers
+        or 'max-age' in directives
+        or 's-maxage' in directives
+    )
+
+
+def _vary_values(fields: tuple, request_headers: Headers) -> Tuple[Tuple[str, Optional[str]], ...]:
+    """Get the values of the request headers that a response with the supplied header fields varies by."""
+    names = []
+
+    for name, value in fields:
+        if name.lower() == b'vary':
+            names.extend(n.strip().lower() for n in value.decode('latin-1').split(',') if n.strip())
+
+    return tuple((name, request_headers.get(name)) for name in names)
@@ -1,17 +1,82 @@
+import asyncio
+import functools
 import logging
-import re
+import random
 from datetime import datetime
 
 from seleniumwire import har
-from seleniumwire.request import Request, Response, WebSocketMessage
+from seleniumwire.request import HeadersView, RequestView, ResponseView, WebSocketMessage
 from seleniumwire.thirdparty.mitmproxy.http import HTTPResponse
 from seleniumwire.thirdparty.mitmproxy.net import websockets
 from seleniumwire.thirdparty.mitmproxy.net.http.headers import Headers
-from seleniumwire.utils import is_list_alike
+from seleniumwire.utils import is_coroutine_callable
 
 log = logging.getLogger(__name__)
 
 
+class StreamCapture:
+    """Captures the body of a response as it is streamed to the client.
+
+    Mitmproxy calls an instance with the iterator of body chunks read from the
+    server. Each chunk is passed straight on to the client and a copy is kept,
+    up to an optional maximum size. Once the body has been sent, the callback
+    is called with the captured body and whether it was truncated.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.callback = None
+        self._chunks = []
+        self._size = 0
+        self._truncated = False
+
+    def __call__(self, chunks):
+        try:
+            for chunk in chunks:
+                if not self._truncated:
+                    self._keep(chunk)
+
+                yield chunk
+        except BaseException:
+            # The body was not received or sent in full
+            self._truncated = True
+            raise
+        finally:
+            if self.callback is not None:
+                self.callback(b''.join(self._chunks), self._truncated)
+
+    def _keep(self, chunk):
+        if self.max_size is not None and self._size + len(chunk) > self.max_size:
+            chunk = chunk[: self.max_size - self._size]
+            self._truncated = True
+
+        self._chunks.append(chunk)
+        self._size += len(chunk)
+
+
+class CacheHandler:
+    """Mitmproxy add-on which serves responses from the proxy's cache.
+
+    It runs ahead of the InterceptRequestHandler, so the cache holds the responses
+    the server sent, and rules and interceptors apply to cached responses just as
+    they do to those fetched from the server.
+    """
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+
+    def request(self, flow):
+        if flow.response is None:
+            self.proxy.cache.apply_request(flow)
+
+    def responseheaders(self, flow):
+        if self.proxy.cache.will_store(flow):
+            flow.metadata['seleniumwire_cache_store'] = True
+
+    def response(self, flow):
+        self.proxy.cache.apply_response(flow)
+
+
 class InterceptRequestHandler:
     """Mitmproxy add-on which is responsible for request modification
     and capture.
@@ -22,7 +87,7 @@ class InterceptRequestHandler:
 
     def requestheaders(self, flow):
         # Requests that are being captured are not streamed.
-        if self.in_scope(flow.request):
+        if self.in_scope(flow.request, flow):
             flow.request.stream = False
 
     def request(self, flow):
@@ -34,36 +99,100 @@ class InterceptRequestHandler:
                 flow.client_conn.finish()
                 return
 
-        # Make any modifications to the original request
-        # DEPRECATED. This will be replaced by request_interceptor
-        self.proxy.modifier.modify_request(flow.request, bodyattr='raw_content')
+        # Apply any declarative rules, which may block or mock the request
+        delay = self.proxy.rules.apply_request(flow)
+
+        if delay:
+            # Hold the flow without holding up the event loop
+            flow.intercept()
+            asyncio.get_event_loop().call_later(delay, self._resume_request, flow)
+            return
+
+        self._process_request(flow)
+
+    def _resume_request(self, flow):
+        handed_off = False
+
+        try:
+            handed_off = self._process_request(flow)
+        except Exception:
+            log.exception('Error handling delayed request %s', flow.request.url)
+        finally:
+            if not handed_off:
+                flow.resume()
+
+    def _process_request(self, flow):
+        """Modify and capture the request.
+
+        Returns: True if handling was handed off to complete later, in which case
+            the flow is resumed once it completes.
+        """
+        if self.proxy.modifier.active:
+            # Make any modifications to the original request
+            # DEPRECATED. This will be replaced by request_interceptor
+            self.proxy.modifier.modify_request(flow.request, bodyattr='raw_content')
+        elif not websockets.check_handshake(flow.request.headers) and not self.in_scope(flow.request, flow):
+            # Nothing can modify the request, so an out of scope request can be let through
+            # without converting it. Websocket URLs are only known once converted.
+            log.debug('Not capturing %s request: %s', flow.request.method, flow.request.url)
+            return False
 
         # Convert to one of our requests for handling
         request = self._create_request(flow)
 
-        if not self.in_scope(request):
+        if not self.in_scope(request, flow):
             log.debug('Not capturing %s request: %s', request.method, request.url)
-            return
+            return False
+
+        interceptor = self.proxy.request_interceptor
 
+        if interceptor is None:
+            self._handle_request(flow, request)
+            return False
+        elif is_coroutine_callable(interceptor):
+            return self._run_async(flow, self._handle_request_async(flow, request))
+        else:
+            return self._run(flow, self._handle_request, request)
+
+    def _handle_request(self, flow, request):
         # Call the request interceptor if set
         if self.proxy.request_interceptor is not None:
             self.proxy.request_interceptor(request)
+            self._update_request(flow, request)
 
-            if request.response:
-                # The interceptor has created a response for us to send back immediately
-                flow.response = HTTPResponse.make(
-                    status_code=int(request.response.status_code),
-                    content=request.response.body,
-                    headers=[(k.encode('utf-8'), v.encode('utf-8')) for k, v in request.response.headers.items()],
-                )
-            else:
-                flow.request.method = request.method
-                flow.request.url = request.url.replace('wss://', 'https://', 1)
+        self._capture_request(flow, request)
+
+    async def _handle_request_async(self, flow, request):
+        await self.proxy.request_interceptor(request)
+        self._update_request(flow, request)
+        self._capture_request(flow, request)
+
+    def _update_request(self, flow, request):
+        """Apply the changes made by the request interceptor to the flow."""
+        if request.response:
+            # The interceptor has created a response for us to send back immediately
+            flow.response = HTTPResponse.make(
+                status_code=int(request.response.status_code),
+                content=request.response.body,
+                headers=[(k.encode('utf-8'), v.encode('utf-8')) for k, v in request.response.headers.items()],
+            )
+        else:
+            # The headers and body were changed in place, unless the headers were replaced
+            flow.request.method = request.method
+            flow.request.url = request.url.replace('wss://', 'https://', 1)
+
+            if not isinstance(request.headers, HeadersView):
                 flow.request.headers = self._to_headers_obj(request.headers)
-                flow.request.raw_content = request.body
 
+    def _capture_request(self, flow, request):
         log.info('Capturing request: %s', request.url)
 
+        # Storage needs a copy that doesn't depend on the flow
+        request = request.materialize(body=self._captures_body(request.headers))
+
+        if request.response and request.response.body and not self._captures_body(request.response.headers):
+            request.response.body = b''
+
         self.proxy.storage.save_request(request)
 
         if request.id is not None:  # Will not be None when captured
@@ -81,33 +210,83 @@ class InterceptRequestHandler:
         if 'Proxy-Connection' in flow.request.headers:
             del flow.request.headers['Proxy-Connection']
 
-    def in_scope(self, request):
-        if request.method in self.proxy.options.get('ignore_http_methods', ['OPTIONS']):
+    def in_scope(self, request, flow=None):
+        """Whether the request is in the scope of capture.
+
+        When a flow is supplied, the scope match is cached on it and reused by later
+        hooks for the same request, as long as the scopes haven't changed. Only a
+        sample of the flows in scope are captured when 'capture_sample_rate' is set.
+        Each flow is counted once in the scope stats, by the first decision made for it.
+        """
+        matcher = self.proxy.scope_matcher
+
+        if flow is None:
+            matched = matcher.matches(request.method, request.url)
+            matcher.count(matched)
+            return matched
+
+        key = (matcher.generation, request.method, request.url)
+        cached = flow.metadata.get('seleniumwire_scope')
+
+        if cached is not None and cached[0] == key:
+            matched = cached[1]
+        else:
+            matched = matcher.matches(request.method, request.url)
+            flow.metadata['seleniumwire_scope'] = (key, matched)
+
+        sampled = True
+        sample_rate = self.proxy.options.get('capture_sample_rate')
+
+        if matched and sample_rate is not None:
+            # Sample once per flow so that every hook agrees
+            sampled = flow.metadata.setdefault('seleniumwire_sampled', random.random() < sample_rate)
+
+        if cached is None:
+            matcher.count(matched, sampled)
+
+        return matched and sampled
+
+    def _captures_body(self, headers):
+        """Whether the body of a request or response with the supplied headers is captured.
+
+        Bodies are not captured when 'capture_bodies' is False, or when their content type
+        does not start with one of the 'capture_body_content_types', if set.
+        """
+        if not self.proxy.options.get('capture_bodies', True):
             return False
 
-        scopes = self.proxy.scopes
+        content_types = self.proxy.options.get('capture_body_content_types')
 
-        if not scopes:
+        if content_types is None:
             return True
-        elif not is_list_alike(scopes):
-            scopes = [scopes]
-
-        for scope in scopes:
-            match = re.search(scope, request.url)
-            if match:
-                return True
 
-        return False
+        return (headers.get('Content-Type') or '').lower().startswith(tuple(content_types))
 
     def responseheaders(self, flow):
-        # Responses that are being captured are not streamed.
-        if self.in_scope(flow.request):
+        if not self.in_scope(flow.request, flow):
+            return
+
+        if (
+            self.proxy.options.get('stream_capture')
+            and hasattr(flow.request, 'id')
+            and self.proxy.response_interceptor is None
+            and flow.response.data.content is None  # Not a mocked response
+            and not flow.metadata.get('seleniumwire_cache_store')  # The cache needs the whole body
+            and self._captures_body(flow.response.headers)
+        ):
+            # Send the body on to the client as it arrives, capturing it on the way
+            flow.response.stream = StreamCapture(self.proxy.options.get('capture_max_body_size'))
+        else:
+            # Responses that are being captured are otherwise not streamed.
             flow.response.stream = False
 
     def response(self, flow):
-        # Make any modifications to the response
-        # DEPRECATED. This will be replaced by response_interceptor
-        self.proxy.modifier.modify_response(flow.response, flow.request)
+        self.proxy.rules.apply_response(flow)
+
+        if self.proxy.modifier.active:
+            # Make any modifications to the response
+            # DEPRECATED. This will be replaced by response_interceptor
+            self.proxy.modifier.modify_response(flow.response, flow.request)
 
         if not hasattr(flow.request, 'id'):
             # Request was not stored
@@ -117,13 +296,67 @@ class InterceptRequestHandler:
         # for handling.
         response = self._create_response(flow)
 
+        if isinstance(flow.response.stream, StreamCapture):
+            # The body has yet to be streamed, so capture the response once it has
+            flow.response.stream.callback = functools.partial(self._capture_streamed_response, flow, response)
+            return
+
+        interceptor = self.proxy.response_interceptor
+
+        if interceptor is None:
+            self._handle_response(flow, response)
+        elif is_coroutine_callable(interceptor):
+            self._run_async(flow, self._handle_response_async(flow, response))
+        else:
+            self._run(flow, self._handle_response, response)
+
+    def _handle_response(self, flow, response):
         # Call the response interceptor if set
         if self.proxy.response_interceptor is not None:
             self.proxy.response_interceptor(self._create_request(flow, response), response)
-            flow.response.status_code = response.status_code
-            flow.response.reason = response.reason
+            self._update_response(flow, response)
+
+        self._capture_response(flow, response)
+
+    async def _handle_response_async(self, flow, response):
+        await self.proxy.response_interceptor(self._create_request(flow, response), response)
+        self._update_response(flow, response)
+        self._capture_response(flow, response)
+
+    def _update_response(self, flow, response):
+        """Apply the changes made by the response interceptor to the flow.
+
+        The headers and body were changed in place, unless the headers were replaced.
+        """
+        flow.response.status_code = response.status_code
+        flow.response.reason = response.reason
+
+        if not isinstance(response.headers, HeadersView):
             flow.response.headers = self._to_headers_obj(response.headers)
-            flow.response.raw_content = response.body
+
+    def _capture_streamed_response(self, flow, response, body, truncated):
+        response = response.materialize(body=False)
+        response.body = body
+        response.truncated = truncated
+
+        # Make the body available to the HAR entry, as much of it as was captured
+        flow.response.data.content = body
+
+        try:
+            self._capture_response(flow, response)
+        except Exception:
+            log.exception('Error capturing streamed response for %s', flow.request.url)
+
+    def _capture_response(self, flow, response):
+        if isinstance(response, ResponseView):
+            # Storage needs a copy that doesn't depend on the flow
+            response = response.materialize(body=self._captures_body(response.headers))
+
+        max_size = self.proxy.options.get('capture_max_body_size')
+
+        if max_size is not None and len(response.body) > max_size:
+            response.body = response.body[:max_size]
+            response.truncated = True
 
         log.info('Capturing response: %s %s %s', flow.request.url, response.status_code, response.reason)
 
@@ -132,30 +365,69 @@ class InterceptRequestHandler:
         if self.proxy.options.get('enable_har', False):
             self.proxy.storage.save_har_entry(flow.request.id, har.create_har_entry(flow))
 
+    def _run(self, flow, handle, obj):
+        """Handle the request or response, on the interceptor thread pool when one is configured.
+
+        The flow is held until handling completes, so its request is always handled
+        before its response while interceptors for different flows run in parallel.
+
+        Returns: True if handling was handed off to the thread pool.
+        """
+        executor = self.proxy.interceptor_executor
+
+        if executor is None:
+            handle(flow, obj)
+            return False
+
+        flow.intercept()
+        executor.submit(self._run_and_resume, flow, handle, obj)
+        return True
+
+    def _run_and_resume(self, flow, handle, obj):
+        try:
+            handle(flow, obj)
+        except Exception:
+            log.exception('Error intercepting %s', flow.request.url)
+        finally:
+            flow.resume()
+
+    def _run_async(self, flow, coro):
+        """Await the handling of the request or response on the proxy event loop.
+
+        The flow is held until handling completes, leaving the loop free to serve
+        other connections in the meantime.
+
+        Returns: True, since handling always completes later.
+        """
+        flow.intercept()
+        asyncio.ensure_future(self._await_and_resume(flow, coro))
+        return True
+
+    async def _await_and_resume(self, flow, coro):
+        try:
+            await coro
+        except Exception:
+            log.exception('Error intercepting %s', flow.request.url)
+        finally:
+            flow.resume()
+
     def _create_request(self, flow, response=None):
-        request = Request(
-            method=flow.request.method,
-            url=flow.request.url,
-            headers=[(k, v) for k, v in flow.request.headers.items()],
-            body=flow.request.raw_content,
-        )
+        url = flow.request.url
 
         # For websocket requests, the scheme of the request is overwritten with https
         # in the initial CONNECT request so we set the scheme back to wss for capture.
-        if websockets.check_handshake(request.headers) and websockets.check_client_version(request.headers):
-            request.url = request.url.replace('https://', 'wss://', 1)
+        if websockets.check_handshake(flow.request.headers) and websockets.check_client_version(flow.request.headers):
+            url = url.replace('https://', 'wss://', 1)
 
+        # A view over the flow's request, which is only copied if it is captured
+        request = RequestView(flow.request, url)
         request.response = response
 
         return request
 
     def _create_response(self, flow):
-        response = Response(
-            status_code=flow.response.status_code,
-            reason=flow.response.reason,
-            headers=[(k, v) for k, v in flow.response.headers.items(multi=True)],
-            body=flow.response.raw_content,
-        )
+        # A view over the flow's response, which is only copied if it is captured
+        response = ResponseView(flow.response)
 
         cert = flow.server_conn.cert
         if cert is not None:
@@ -60,9 +60,10 @@ def create_har_entry(flow: HTTPFlow) -> dict:
 
     started_date_time = datetime.fromtimestamp(flow.request.timestamp_start, timezone.utc).isoformat()
 
-    # Response body size and encoding
+    # Response body size and encoding. A truncated body may not decode, and is then given as it is.
+    response_content = flow.response.get_content(strict=False)
     response_body_size = len(flow.response.raw_content) if flow.response.raw_content else 0
-    response_body_decoded_size = len(flow.response.content) if flow.response.content else 0
+    response_body_decoded_size = len(response_content) if response_content else 0
     response_body_compression = response_body_decoded_size - response_body_size
 
     entry = {
@@ -98,8 +99,8 @@ def create_har_entry(flow: HTTPFlow) -> dict:
     }
 
     # Store binary data as base64
-    if strutils.is_mostly_bin(flow.response.content):
-        entry["response"]["content"]["text"] = base64.b64encode(flow.response.content).decode()
+    if strutils.is_mostly_bin(response_content):
+        entry["response"]["content"]["text"] = base64.b64encode(response_content).decode()
         entry["response"]["content"]["encoding"] = "base64"
     else:
         entry["response"]["content"]["text"] = flow.response.get_text(strict=False)
@@ -1,6 +1,6 @@
 import inspect
-import time
-from typing import Iterator, List, Optional, Union
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Union
 
 from selenium.common.exceptions import TimeoutException
 
@@ -36,6 +36,33 @@ class InspectRequestsMixin:
         """
         yield from self.backend.storage.iter_requests()
 
+    def query_requests(
+        self,
+        host: Optional[str] = None,
+        method: Optional[str] = None,
+        status: Optional[int] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Request]:
+        """Retrieve the requests that match all of the supplied criteria.
+
+        With request_storage='sqlite' the filtering runs inside the database,
+        which is much faster than looping over driver.requests for large captures.
+
+        For example:
+
+            driver.query_requests(host='demo.opencart.com', method='POST', status=200)
+
+        Args:
+            host: The request host, including any port.
+            method: The request method, e.g. 'POST'.
+            status: The response status code.
+            since: Only match requests made at or after this time.
+
+        Returns:
+            A list of matching Request instances in chronological order.
+        """
+        return self.backend.storage.query(host=host, method=method, status=status, since=since)
+
     @property
     def last_request(self) -> Optional[Request]:
         """Retrieve the last request made between the browser and server.
@@ -70,18 +97,29 @@ class InspectRequestsMixin:
             TimeoutException if a request is not seen within the timeout
                 period.
         """
-        start = time.time()
-
-        while time.time() - start < timeout:
-            request = self.backend.storage.find(pat)
+        request = self.backend.storage.wait_for(pat, timeout)
 
-            if request is None:
-                time.sleep(1 / 5)
-            else:
-                return request
+        if request is not None:
+            return request
 
         raise TimeoutException('Timed out after {}s waiting for request matching {}'.format(timeout, pat))
 
+    @property
+    def storage_stats(self) -> Dict[str, int]:
+        """Get statistics about the captured data held in request storage.
+
+        All storage types report the number of requests held, and how well
+        their bodies deduplicate and compress: 'body_bytes' counts every copy of
+        a body that was saved, 'unique_body_bytes' counts the distinct bodies,
+        and 'stored_body_bytes' counts the bytes actually held once compressed.
+        'dedup_ratio' is the first divided by the second, and 'compression_ratio'
+        the second divided by the third. The in-memory storage also reports how
+        many body bytes are held in memory and how many have been spilled to disk.
+
+        Returns: A dictionary of statistics.
+        """
+        return self.backend.storage.stats()
+
     @property
     def har(self) -> str:
         """Get a HAR archive of HTTP transactions that have taken place.
@@ -281,12 +319,84 @@ class InspectRequestsMixin:
     def scopes(self):
         self.backend.scopes = []
 
+    @property
+    def rules(self) -> List[dict]:
+        """The declarative rules applied to requests and responses.
+
+        Rules block, mock, delay or rewrite requests and set headers without calling
+        back into Python for each request. The value can be a list of rules, or
+        the path to a JSON or YAML file of rules which is reloaded when it changes.
+
+        For example:
+            rules = [
+                {'match': {'host': 'google-analytics.com'}, 'action': 'block'},
+                {'match': {'path': '/api/products'}, 'action': 'mock', 'file': 'products.json'},
+            ]
+
+        See seleniumwire.rules.RuleEngine for the full set of actions.
+        """
+        return self.backend.rules.rules
+
+    @rules.setter
+    def rules(self, rules: Union[str, List[dict]]):
+        self.backend.rules.load(rules)
+
+    @rules.deleter
+    def rules(self):
+        self.backend.rules.load([])
+
+    @property
+    def scope_stats(self) -> Dict[str, int]:
+        """Get the number of requests found in and out of scope.
+
+        'hits' counts the requests that matched the scopes and were captured,
+        'misses' the requests that the scopes filtered out, and 'sampled_out'
+        the requests that matched but were left out by 'capture_sample_rate'.
+
+        Returns: A dictionary of statistics.
+        """
+        return self.backend.scope_matcher.stats()
+
+    @property
+    def cache_stats(self) -> Dict[str, int]:
+        """Get statistics about the responses served from the proxy's cache.
+
+        The cache is enabled with the 'cache' option. 'hits' counts the responses
+        served without contacting the server, 'revalidated' those served after the
+        server confirmed they had not changed, and 'misses' those fetched from the
+        server. 'bytes_saved' counts the body bytes that did not need to be fetched.
+
+        Returns: A dictionary of statistics, which is empty if the cache is not enabled.
+        """
+        if self.backend.cache is None:
+            return {}
+
+        return self.backend.cache.stats()
+
+    @property
+    def connection_pool_stats(self) -> Dict[str, Union[int, float]]:
+        """Get statistics about the reuse of connections to servers.
+
+        Connections are pooled with the 'connection_pool' option. 'hits' counts the
+        connections taken from the pool rather than being established afresh, 'misses'
+        those that had to be established, and 'hit_rate' the fraction that were hits.
+        'idle' is the number of connections currently in the pool, and 'evicted' the
+        number closed for being idle too long or closed by the server.
+
+        Returns: A dictionary of statistics, which is empty if connections are not pooled.
+        """
+        if self.backend.connection_pool is None:
+            return {}
+
+        return self.backend.connection_pool.stats()
+
     @property
     def request_interceptor(self) -> callable:
         """A callable that will be used to intercept/modify requests.
 
         The callable must accept a single argument for the request
-        being intercepted.
+        being intercepted. It may be an async def function, in which case
+        it is awaited on the proxy event loop without holding up other requests.
         """
         return self.backend.request_interceptor
 
@@ -303,7 +413,9 @@ class InspectRequestsMixin:
         """A callable that will be used to intercept/modify responses.
 
         The callable must accept two arguments: the response being
-        intercepted and the originating request.
+        intercepted and the originating request. It may be an async def
+        function, in which case it is awaited on the proxy event loop
+        without holding up other requests.
         """
         return self.backend.response_interceptor
 
@@ -197,6 +197,16 @@ class RequestModifier:
         with self._lock:
             self._rewrite_rules.clear()
 
+    @property
+    def active(self):
+        """Whether any overrides or rewrite rules are set.
+
+        When this is False, modify_request and modify_response leave requests
+        and responses unchanged and needn't be called.
+        """
+        with self._lock:
+            return bool(self._headers or self._params or self._querystring is not None or self._rewrite_rules)
+
     def modify_request(self, request, urlattr='url', methodattr='method', headersattr='headers', bodyattr='body'):
         """Performs modifications to the request.
 
@@ -1,24 +1,184 @@
 """Houses the classes used to transfer request and response data between components. """
 from datetime import datetime
 from http import HTTPStatus
-from http.client import HTTPMessage
 from typing import Dict, Iterable, List, Optional, Tuple, Union
 from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
 
 
-class HTTPHeaders(HTTPMessage):
+class HTTPHeaders:
     """A dict-like data-structure to hold HTTP headers.
 
-    Note that duplicate key names are permitted.
+    Note that duplicate key names are permitted. As with http.client.HTTPMessage,
+    names are matched case-insensitively, setting a header adds it alongside any
+    existing header with the same name, deleting a header deletes every header
+    with that name, and getting a missing header returns None. Its content type
+    helpers, as_string() and str() also behave as they do on an HTTPMessage.
+
+    The names and values are held alternately in a single flat list, which takes
+    a fraction of the memory of an HTTPMessage.
     """
 
+    __slots__ = ('_fields',)
+
+    def __init__(self, headers: Iterable[Tuple[str, str]] = ()):
+        """Initialise a new HTTPHeaders object.
+
+        Args:
+            headers: The headers as an iterable of 2-element tuples.
+        """
+        self._fields = [f for header in headers for f in header]
+
+    def __getitem__(self, name: str) -> Optional[str]:
+        return self.get(name)
+
+    def __setitem__(self, name: str, value: str):
+        self._fields += (name, value)
+
+    def __delitem__(self, name: str):
+        name = name.lower()
+        fields = self._fields
+        self._fields = [
+            f for i in range(0, len(fields), 2) if fields[i].lower() != name for f in (fields[i], fields[i + 1])
+        ]
+
+    def __contains__(self, name: str) -> bool:
+        name = name.lower()
+        return any(k.lower() == name for k in self._fields[::2])
+
+    def __len__(self) -> int:
+        return len(self._fields) // 2
+
+    def __iter__(self):
+        return iter(self._fields[::2])
+
+    def get(self, name: str, failobj=None):
+        name = name.lower()
+        fields = self._fields
+
+        for i in range(0, len(fields), 2):
+            if fields[i].lower() == name:
+                return fields[i + 1]
+
+        return failobj
+
+    def get_all(self, name: str, failobj=None):
+        name = name.lower()
+        fields = self._fields
+        values = [fields[i + 1] for i in range(0, len(fields), 2) if fields[i].lower() == name]
+        return values or failobj
+
+    def add_header(self, name: str, value: str):
+        self._fields += (name, value)
+
+    def replace_header(self, name: str, value: str):
+        lower = name.lower()
+        fields = self._fields
+
+        for i in range(0, len(fields), 2):
+            if fields[i].lower() == lower:
+                fields[i + 1] = value
+                return
+
+        raise KeyError(name)
+
+    def get_content_type(self) -> str:
+        """Get the media type of the Content-Type header in lower case, or 'text/plain'
+        if the header is missing or not valid.
+        """
+        value = self.get('Content-Type')
+
+        if value is None:
+            return 'text/plain'
+
+        ctype = value.split(';', 1)[0].strip().lower()
+
+        return ctype if ctype.count('/') == 1 else 'text/plain'
+
+    def get_content_maintype(self) -> str:
+        return self.get_content_type().split('/')[0]
+
+    def get_content_subtype(self) -> str:
+        return self.get_content_type().split('/')[1]
+
+    def get_content_charset(self, failobj=None):
+        """Get the charset parameter of the Content-Type header in lower case, or failobj
+        if there is none.
+        """
+        value = self.get('Content-Type')
+
+        if value is not None:
+            for param in value.split(';')[1:]:
+                name, _, charset = param.partition('=')
+
+                if name.strip().lower() == 'charset':
+                    return charset.strip().strip('"').lower() or failobj
+
+        return failobj
+
+    def as_string(self) -> str:
+        """Get the headers as a raw header block, a line per header followed by a blank line."""
+        fields = self._fields
+        return ''.join('{}: {}\n'.format(fields[i], fields[i + 1]) for i in range(0, len(fields), 2)) + '\n'
+
+    def keys(self) -> List[str]:
+        return self._fields[::2]
+
+    def values(self) -> List[str]:
+        return self._fields[1::2]
+
+    def items(self) -> List[Tuple[str, str]]:
+        fields = self._fields
+        return list(zip(fields[::2], fields[1::2]))
+
+    def __getstate__(self):
+        return self._fields
+
+    def __setstate__(self, state):
+        if isinstance(state, dict):
+            # Pickled when HTTPHeaders was an HTTPMessage
+            state = [f for header in state['_headers'] for f in header]
+        self._fields = state
+
+    def __str__(self):
+        return self.as_string()
+
     def __repr__(self):
         return repr(self.items())
 
 
+def _as_body(b: Union[str, bytes, None]) -> bytes:
+    if b is None:
+        return b''
+    elif isinstance(b, str):
+        return b.encode('utf-8')
+    elif not isinstance(b, bytes):
+        raise TypeError('body must be of type bytes')
+    return b
+
+
+def _getstate(obj, names: Tuple[str, ...]) -> dict:
+    # The state takes the form of the __dict__ the classes had before they used slots,
+    # so that objects pickled before then can still be loaded. Slots that are unset,
+    # such as the cert that storage moves from a response to its request, are left out.
+    state = {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+
+    if not isinstance(state.get('_body', b''), bytes):
+        # Loaded lazily from a storage, which may have discarded it by the time this is loaded
+        state['_body'] = obj.body
+
+    return state
+
+
+def _setstate(obj, state: dict):
+    for name, value in state.items():
+        setattr(obj, name, value)
+
+
 class Request:
     """Represents an HTTP request."""
 
+    __slots__ = ('id', 'method', 'url', 'headers', '_body', 'response', 'date', 'ws_messages', 'cert')
+
     def __init__(self, *, method: str, url: str, headers: Iterable[Tuple[str, str]], body: bytes = b''):
         """Initialise a new Request object.
 
@@ -31,11 +191,7 @@ class Request:
         self.id: Optional[str] = None  # The id is set for captured requests
         self.method = method
         self.url = url
-        self.headers = HTTPHeaders()
-
-        for k, v in headers:
-            self.headers.add_header(k, v)
-
+        self.headers = HTTPHeaders(headers)
         self.body = body
         self.response: Optional[Response] = None
         self.date: datetime = datetime.now()
@@ -46,20 +202,21 @@ class Request:
     def body(self) -> bytes:
         """Get the request body.
 
+        Bodies of stored requests may be loaded lazily on first access. Bodies held
+        for an in-memory storage are loaded afresh on each access instead, so that
+        the storage keeps them compressed or on disk as it accounts for them.
+
         Returns: The request body as bytes.
         """
+        if not isinstance(self._body, bytes):
+            if not getattr(self._body, 'retain', True):
+                return self._body()
+            self._body = self._body()
         return self._body
 
     @body.setter
     def body(self, b: bytes):
-        if b is None:
-            self._body = b''
-        elif isinstance(b, str):
-            self._body = b.encode('utf-8')
-        elif not isinstance(b, bytes):
-            raise TypeError('body must be of type bytes')
-        else:
-            self._body = b
+        self._body = _as_body(b)
 
     @property
     def querystring(self) -> str:
@@ -145,8 +302,16 @@ class Request:
         """
         self.create_response(status_code=error_code)
 
+    def __getstate__(self):
+        return _getstate(self, Request.__slots__)
+
+    def __setstate__(self, state):
+        _setstate(self, state)
+
     def __repr__(self):
-        return 'Request(method={method!r}, url={url!r}, headers={headers!r}, body={_body!r})'.format_map(vars(self))
+        return 'Request(method={!r}, url={!r}, headers={!r}, body={!r})'.format(
+            self.method, self.url, self.headers, self._body
+        )
 
     def __str__(self):
         return self.url
@@ -155,6 +320,8 @@ class Request:
 class Response:
     """Represents an HTTP response."""
 
+    __slots__ = ('status_code', 'reason', 'headers', '_body', 'date', 'cert', 'truncated')
+
     def __init__(self, *, status_code: int, reason: str, headers: Iterable[Tuple[str, str]], body: bytes = b''):
         """Initialise a new Response object.
 
@@ -166,38 +333,44 @@ class Response:
         """
         self.status_code = status_code
         self.reason = reason
-        self.headers = HTTPHeaders()
-
-        for k, v in headers:
-            self.headers.add_header(k, v)
-
+        self.headers = HTTPHeaders(headers)
         self.body = body
         self.date: datetime = datetime.now()
         self.cert: dict = {}
+        # Whether the captured body is only the start of the body that was received.
+        self.truncated: bool = False
 
     @property
     def body(self) -> bytes:
         """Get the response body.
 
+        Bodies of stored responses may be loaded lazily on first access. Bodies held
+        for an in-memory storage are loaded afresh on each access instead, so that
+        the storage keeps them compressed or on disk as it accounts for them.
+
         Returns: The response body as bytes.
         """
+        if not isinstance(self._body, bytes):
+            if not getattr(self._body, 'retain', True):
+                return self._body()
+            self._body = self._body()
         return self._body
 
     @body.setter
     def body(self, b: bytes):
-        if b is None:
-            self._body = b''
-        elif isinstance(b, str):
-            self._body = b.encode('utf-8')
-        elif not isinstance(b, bytes):
-            raise TypeError('body must be of type bytes')
-        else:
-            self._body = b
+        self._body = _as_body(b)
+
+    def __getstate__(self):
+        return _getstate(self, Response.__slots__)
+
+    def __setstate__(self, state):
+        # Responses pickled before truncation was recorded
+        self.truncated = False
+        _setstate(self, state)
 
     def __repr__(self):
-        return (
-            'Response(status_code={status_code!r}, reason={reason!r}, headers={headers!r}, '
-            'body={_body!r})'.format_map(vars(self))
+        return 'Response(status_code={!r}, reason={!r}, headers={!r}, body={!r})'.format(
+            self.status_code, self.reason, self.headers, self._body
         )
 
     def __str__(self):
@@ -209,6 +382,8 @@ class WebSocketMessage:
     or vice versa.
     """
 
+    __slots__ = ('from_client', 'content', 'date')
+
     def __init__(self, *, from_client: bool, content: Union[str, bytes], date: datetime):
         """Initialise a new websocket message.
 
@@ -221,6 +396,12 @@ class WebSocketMessage:
         self.content = content
         self.date = date
 
+    def __getstate__(self):
+        return _getstate(self, WebSocketMessage.__slots__)
+
+    def __setstate__(self, state):
+        _setstate(self, state)
+
     def __str__(self):
         if isinstance(self.content, str):
             return self.content
@@ -232,3 +413,184 @@ class WebSocketMessage:
         elif self is other:
             return True
         return self.from_client == other.from_client and self.content == other.content and self.date == other.date
+
+
+class HeadersView:
+    """Presents the headers of a mitmproxy request or response with the interface of
+    HTTPHeaders, reading and writing them in place rather than copying them.
+
+    As with HTTPHeaders, duplicate key names are permitted, setting a header adds
+    it alongside any existing header with the same name, and getting a missing
+    header returns None.
+    """
+
+    __slots__ = ('_headers',)
+
+    def __init__(self, headers):
+        self._headers = headers
+
+    def __getitem__(self, name: str) -> Optional[str]:
+        return self.get(name)
+
+    def __setitem__(self, name: str, value: str):
+        self._headers.add(name, value)
+
+    def __delitem__(self, name: str):
+        if name in self._headers:
+            del self._headers[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._headers
+
+    def __len__(self) -> int:
+        return len(self._headers.fields)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def get(self, name: str, failobj=None):
+        values = self._headers.get_all(name)
+        return values[0] if values else failobj
+
+    def get_all(self, name: str, failobj=None):
+        return self._headers.get_all(name) or failobj
+
+    def add_header(self, name: str, value: str):
+        self._headers.add(name, value)
+
+    def replace_header(self, name: str, value: str):
+        values = self._headers.get_all(name)
+
+        if not values:
+            raise KeyError(name)
+
+        self._headers.set_all(name, [value] + values[1:])
+
+    def keys(self) -> List[str]:
+        return [k for k, _ in self.items()]
+
+    def values(self) -> List[str]:
+        return [v for _, v in self.items()]
+
+    def items(self) -> List[Tuple[str, str]]:
+        return list(self._headers.items(multi=True))
+
+    def __repr__(self):
+        return repr(self.items())
+
+
+class RequestView(Request):
+    """A Request backed directly by the headers and body of a mitmproxy request.
+
+    Changes made to the headers and body are made to the mitmproxy request itself.
+    Call materialize() for a standalone copy, for example to store it.
+    """
+
+    __slots__ = ('_message',)
+
+    def __init__(self, message, url: str):
+        """Initialise a new RequestView.
+
+        Args:
+            message: The mitmproxy request.
+            url: The request URL, which may differ from that of the mitmproxy request.
+        """
+        self._message = message
+        self.id: Optional[str] = None
+        self.method = message.method
+        self.url = url
+        self.headers = HeadersView(message.headers)
+        self.response: Optional[Response] = None
+        self.date: datetime = datetime.now()
+        self.ws_messages: List[WebSocketMessage] = []
+        self.cert: dict = {}
+
+    @property
+    def body(self) -> bytes:
+        return self._message.raw_content or b''
+
+    @body.setter
+    def body(self, b: bytes):
+        self._message.raw_content = _as_body(b)
+
+    def materialize(self, body: bool = True) -> Request:
+        """Copy the request into a standalone Request.
+
+        Args:
+            body: Whether to copy the body. Default True.
+
+        Returns: The copy.
+        """
+        request = Request(
+            method=self.method,
+            url=self.url,
+            headers=self._message.headers.items(),
+            body=self.body if body else b'',
+        )
+        request.id = self.id
+        request.response = self.response
+        request.date = self.date
+        request.ws_messages = self.ws_messages
+        request.cert = self.cert
+
+        return request
+
+    def __repr__(self):
+        return 'RequestView(method={!r}, url={!r}, headers={!r})'.format(self.method, self.url, self.headers)
+
+
+class ResponseView(Response):
+    """A Response backed directly by the headers and body of a mitmproxy response.
+
+    Changes made to the headers and body are made to the mitmproxy response itself.
+    Call materialize() for a standalone copy, for example to store it.
+    """
+
+    __slots__ = ('_message',)
+
+    def __init__(self, message):
+        """Initialise a new ResponseView.
+
+        Args:
+            message: The mitmproxy response.
+        """
+        self._message = message
+        self.status_code = message.status_code
+        self.reason = message.reason
+        self.headers = HeadersView(message.headers)
+        self.date: datetime = datetime.now()
+        self.cert: dict = {}
+        self.truncated: bool = False
+
+    @property
+    def body(self) -> bytes:
+        return self._message.raw_content or b''
+
+    @body.setter
+    def body(self, b: bytes):
+        self._message.raw_content = _as_body(b)
+
+    def materialize(self, body: bool = True) -> Response:
+        """Copy the response into a standalone Response.
+
+        Args:
+            body: Whether to copy the body. Default True.
+
+        Returns: The copy.
+        """
+        response = Response(
+            status_code=self.status_code,
+            reason=self.reason,
+            headers=self._message.headers.items(multi=True),
+            body=self.body if body else b'',
+        )
+        response.date = self.date
+        response.cert = self.cert
+        response.truncated = self.truncated
+
+        return response
+
+    def __repr__(self):
+        return 'ResponseView(status_code={!r}, reason={!r}, headers={!r})'.format(
+            self.status_code, self.reason, self.headers
+        )
@@ -0,0 +1,342 @@
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Pattern, Tuple, Union
+
+from seleniumwire.thirdparty.mitmproxy.http import HTTPResponse
+
+log = logging.getLogger(__name__)
+
+ACTIONS = ('block', 'mock', 'header', 'rewrite', 'delay')
+
+# How often, in seconds, a rules file is checked for changes.
+RELOAD_INTERVAL = 1.0
+
+
+class _Rule:
+    """A rule compiled into the form it is evaluated in."""
+
+    __slots__ = ('index', 'host', 'path', 'regex', 'methods', 'action', 'args')
+
+    def __init__(
+        self,
+        index: int,
+        host: Optional[str],
+        path: Optional[str],
+        regex: Optional[Pattern],
+        methods: Optional[frozenset],
+        action: str,
+        args: tuple,
+    ):
+        self.index = index
+        self.host = host
+        self.path = path
+        self.regex = regex
+        self.methods = methods
+        self.action = action
+        self.args = args
+
+    def matches(self, path: str, method: str, url: str) -> bool:
+        if self.methods is not None and method not in self.methods:
+            return False
+        if self.path is not None and not path.startswith(self.path):
+            return False
+        if self.regex is not None and not self.regex.search(url):
+            return False
+        return True
+
+
+class RuleEngine:
+    """Applies a declarative table of rules to the requests and responses passing through the proxy.
+
+    Each rule matches requests on any of host, path prefix, URL regex and method,
+    and performs a single action:
+
+        - block: Respond immediately with a status code. Default 403.
+        - mock: Respond immediately with the contents of a file.
+        - header: Set or remove request or response headers.
+        - rewrite: Rewrite the request URL, replacing what the 'pattern' regex matches
+          with 'url'. The pattern defaults to the URL regex of the rule, and without
+          either the whole URL is replaced.
+        - delay: Hold the request for a number of seconds before it is sent.
+
+    For example:
+        rules = [
+            {'match': {'host': 'google-analytics.com'}, 'action': 'block'},
+            {'match': {'path': '/api/products', 'method': 'GET'}, 'action': 'mock', 'file': 'products.json'},
+            {'match': {'url': r'\\.js$'}, 'action': 'header', 'target': 'response',
+             'headers': {'Cache-Control': 'no-store'}},
+            {'match': {'url': r'^https://cdn\\.example\\.com/'}, 'action': 'rewrite',
+             'url': 'https://cdn.test/'},
+            {'match': {'host': 'slow.example.com'}, 'action': 'delay', 'seconds': 0.5},
+        ]
+
+    A host matches that host and its subdomains. Every matching rule is applied in
+    the order given, except that no further rules are applied once a request has been
+    blocked or mocked.
+
+    Rules are compiled into an index by host when they are loaded, so evaluating them
+    is a few dictionary lookups and string comparisons per request. Rules loaded from
+    a JSON or YAML file are reloaded when the file changes.
+
+    Instances of this class are designed to be threadsafe.
+    """
+
+    def __init__(self, rules: Union[str, List[dict], None] = None):
+        """Initialise a new RuleEngine.
+
+        Args:
+            rules: A list of rules, or the path to a JSON or YAML file of rules.
+        """
+        self._lock = threading.Lock()
+        self._rules: List[dict] = []
+        # Compiled rules keyed by host, and those that match any host.
+        self._index: Tuple[Dict[str, List[_Rule]], List[_Rule]] = ({}, [])
+        self._path: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+
+        if rules is not None:
+            self.load(rules)
+
+    @property
+    def rules(self) -> List[dict]:
+        """The rules currently loaded."""
+        return self._rules
+
+    @property
+    def path(self) -> Optional[str]:
+        """The path of the file the rules were loaded from, if any."""
+        return self._path
+
+    def load(self, rules: Union[str, List[dict]]) -> None:
+        """Load a list of rules, or the rules in a JSON or YAML file, replacing any loaded previously.
+
+        Args:
+            rules: A list of rules, or the path to a file of rules.
+        Raises:
+            ValueError: If a rule is not valid.
+        """
+        if isinstance(rules, (str, os.PathLike)):
+            path = os.fspath(rules)
+            mtime = os.stat(path).st_mtime
+            rules = _read_rules(path)
+        else:
+            path = mtime = None
+
+        index = self._compile(rules, os.path.dirname(path) if path else None)
+
+        with self._lock:
+            self._rules = list(rules)
+            self._index = index
+            self._path = path
+            self._mtime = mtime
+            self._checked = time.monotonic()
+
+    def _reload_if_changed(self) -> None:
+        now = time.monotonic()
+
+        if self._path is None or now - self._checked < RELOAD_INTERVAL:
+            return
+
+        self._checked = now
+
+        try:
+            if os.stat(self._path).st_mtime == self._mtime:
+                return
+            self.load(self._path)
+            log.info('Reloaded rules from %s', self._path)
+        except (OSError, ValueError) as e:
+            # Keep using the rules already loaded
+            log.warning('Could not reload rules from %s: %s', self._path, e)
+
+    def match(self, host: str, path: str, method: str, url: str) -> List[_Rule]:
+        """Find the rules that match a request.
+
+        Args:
+            host: The request host, in any case and with or without a trailing dot.
+            path: The request path, including any query string.
+            method: The request method.
+            url: The request URL.
+
+        Returns: The matching rules, in the order they were given.
+        """
+        self._reload_if_changed()
+        by_host, any_host = self._index
+
+        if not by_host and not any_host:
+            return []
+
+        candidates = [r for r in any_host if r.matches(path, method, url)]
+
+        if by_host:
+            # Hosts are indexed in lower case and without the trailing dot of a fully qualified name
+            labels = host.lower().rstrip('.').split('.')
+
+            # Look up the host and each of its parent domains
+            for i in range(len(labels)):
+                rules = by_host.get('.'.join(labels[i:]))
+
+                if rules:
+                    candidates.extend(r for r in rules if r.matches(path, method, url))
+
+        if len(candidates) > 1:
+            candidates.sort(key=lambda r: r.index)
+
+        return candidates
+
+    def apply_request(self, flow) -> float:
+        """Apply the rules that match the request of a flow.
+
+        Response header rules are recorded on the flow to be applied by apply_response.
+
+        Args:
+            flow: The mitmproxy flow.
+
+        Returns: The number of seconds the request should be delayed by.
+        """
+        if self._path is None and self._index == ({}, []):
+            # No rules, and no file that could add some
+            return 0.0
+
+        request = flow.request
+        rules = self.match(request.host, request.path, request.method, request.url)
+        delay = 0.0
+
+        for rule in rules:
+            action = rule.action
+
+            if action == 'block':
+                status, = rule.args
+                flow.response = HTTPResponse.make(status_code=status)
+                break
+            elif action == 'mock':
+                status, headers, body = rule.args
+                flow.response = HTTPResponse.make(status_code=status, content=body, headers=headers)
+                break
+            elif action == 'header':
+                target, headers = rule.args
+
+                if target == 'response':
+                    flow.metadata.setdefault('seleniumwire_rules', []).append(rule)
+                else:
+                    _set_headers(request.headers, headers)
+            elif action == 'rewrite':
+                pattern, replacement = rule.args
+                request.url = pattern.sub(replacement, request.url) if pattern else replacement
+            elif action == 'delay':
+                delay += rule.args[0]
+
+        return delay
+
+    def apply_response(self, flow) -> None:
+        """Apply the response header rules recorded against a flow by apply_request.
+
+        Args:
+            flow: The mitmproxy flow.
+        """
+        for rule in flow.metadata.get('seleniumwire_rules', ()):
+            _set_headers(flow.response.headers, rule.args[1])
+
+    def _compile(self, rules: List[dict], base_dir: Optional[str]) -> Tuple[Dict[str, List[_Rule]], List[_Rule]]:
+        by_host: Dict[str, List[_Rule]] = defaultdict(list)
+        any_host: List[_Rule] = []
+
+        for index, rule in enumerate(rules):
+            try:
+                compiled = _compile_rule(index, rule, base_dir)
+            except (KeyError, TypeError, ValueError, re.error, OSError) as e:
+                raise ValueError('Rule {} is not valid: {!r}'.format(index, e)) from e
+
+            if compiled.host is None:
+                any_host.append(compiled)
+            else:
+                by_host[compiled.host].append(compiled)
+
+        return dict(by_host), any_host
+
+
+def _compile_rule(index: int, rule: dict, base_dir: Optional[str]) -> _Rule:
+    match = rule.get('match', {})
+    action = rule['action']
+
+    if action not in ACTIONS:
+        raise ValueError('unknown action {!r}'.format(action))
+
+    host = match.get('host')
+    if host is not None:
+        host = host.lower().lstrip('*.').rstrip('.')
+
+    methods = match.get('method')
+    if methods is not None:
+        methods = frozenset(m.upper() for m in ([methods] if isinstance(methods, str) else methods))
+
+    regex = re.compile(match['url']) if 'url' in match else None
+
+    if action == 'block':
+        args = (int(rule.get('status', 403)),)
+    elif action == 'mock':
+        path = rule['file']
+        if base_dir and not os.path.isabs(path):
+            # Files are found relative to the rules file
+            path = os.path.join(base_dir, path)
+
+        with open(path, 'rb') as f:
+            body = f.read()
+
+        headers = dict(rule.get('headers', {}))
+        if not any(k.lower() == 'content-type' for k in headers):
+            headers['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+        args = (int(rule.get('status', 200)), _encode_headers(headers), body)
+    elif action == 'header':
+        target = rule.get('target', 'request')
+        if target not in ('request', 'response'):
+            raise ValueError('unknown target {!r}'.format(target))
+        args = (target, [(k, None if v is None else str(v)) for k, v in rule['headers'].items()])
+    elif action == 'rewrite':
+        # Without a pattern, the part of the URL the rule matched is replaced
+        args = (re.compile(rule['pattern']) if 'pattern' in rule else regex, rule['url'])
+    else:
+        args = (float(rule['seconds']),)
+
+    return _Rule(index, host, match.get('path'), regex, methods, action, args)
+
+
+def _read_rules(path: str) -> List[dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError('PyYAML not found. Install it with `pip install pyyaml`.') from e
+
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    if isinstance(data, dict):
+        data = data.get('rules', [])
+
+    if not isinstance(data, list):
+        raise ValueError('Rules file {} does not contain a list of rules'.format(path))
+
+    return data
+
+
+def _encode_headers(headers: dict) -> List[Tuple[bytes, bytes]]:
+    return [(k.encode('utf-8'), str(v).encode('utf-8')) for k, v in headers.items()]
+
+
+def _set_headers(headers, values: List[Tuple[str, Optional[str]]]) -> None:
+    for name, value in values:
+        if value is None:
+            if name in headers:
+                del headers[name]
+        else:
+            headers[name] = value
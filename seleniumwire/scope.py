@@ -0,0 +1,119 @@
+import re
+import threading
+from typing import Iterable, List, Optional, Pattern, Union
+
+from seleniumwire.utils import is_list_alike
+
+DEFAULT_IGNORE_HTTP_METHODS = ['OPTIONS']
+
+# Patterns that refer back to their own groups can't be merged into one alternation,
+# because merging renumbers the groups.
+BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+class ScopeMatcher:
+    """Decides whether requests are in the scope of capture.
+
+    The scope patterns are compiled once when they are set, into a single
+    alternation where possible, rather than being searched one by one for
+    every request. Counts of the requests found in and out of scope are kept
+    so that it's possible to see how much traffic the scopes filter out. Callers
+    record each request once with count(), since they may match it several times.
+
+    Instances of this class are designed to be threadsafe.
+    """
+
+    def __init__(self, scopes=None, ignore_http_methods: Optional[Iterable[str]] = None):
+        """Initialise a new ScopeMatcher.
+
+        Args:
+            scopes: A URL pattern or list of URL patterns. Default all URLs.
+            ignore_http_methods: The request methods that are never in scope.
+                Default OPTIONS.
+        """
+        if ignore_http_methods is None:
+            ignore_http_methods = DEFAULT_IGNORE_HTTP_METHODS
+
+        self._ignore_http_methods = frozenset(ignore_http_methods)
+        self._lock = threading.Lock()
+        self._scopes = []
+        self._patterns: Optional[List[Pattern]] = None
+        # Incremented each time the scopes change so cached decisions can be recognised as stale.
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.sampled_out = 0
+
+        if scopes is not None:
+            self.scopes = scopes
+
+    @property
+    def scopes(self) -> Union[str, List[str]]:
+        """The URL patterns used to scope request capture."""
+        return self._scopes
+
+    @scopes.setter
+    def scopes(self, scopes: Union[str, List[str]]):
+        """Sets the URL patterns used to scope request capture.
+
+        Args:
+            scopes: A URL pattern or list of URL patterns. An empty list means all URLs.
+        """
+        patterns = [scopes] if scopes and not is_list_alike(scopes) else list(scopes or [])
+
+        if not patterns:
+            compiled = None
+        elif any(BACKREFERENCE.search(p) for p in patterns):
+            compiled = [re.compile(p) for p in patterns]
+        else:
+            try:
+                compiled = [re.compile('|'.join('(?:{})'.format(p) for p in patterns))]
+            except re.error:
+                # For example inline flags that are only valid at the start of a pattern
+                compiled = [re.compile(p) for p in patterns]
+
+        with self._lock:
+            self._scopes = scopes
+            self._patterns = compiled
+            self.generation += 1
+
+    def matches(self, method: str, url: str) -> bool:
+        """Whether a request with the supplied method and URL is in scope.
+
+        Args:
+            method: The request method.
+            url: The request URL.
+
+        Returns: True if the request is in scope, False otherwise.
+        """
+        if method in self._ignore_http_methods:
+            return False
+
+        patterns = self._patterns
+
+        return patterns is None or any(p.search(url) for p in patterns)
+
+    def count(self, matched: bool, sampled: bool = True) -> None:
+        """Record the decision made for a request.
+
+        Args:
+            matched: Whether the request was in scope.
+            sampled: Whether the request was picked for capture when only a sample
+                of the requests in scope are captured.
+        """
+        with self._lock:
+            if not matched:
+                self.misses += 1
+            elif sampled:
+                self.hits += 1
+            else:
+                self.sampled_out += 1
+
+    def stats(self) -> dict:
+        """Report how many requests were found in and out of scope.
+
+        Returns: A dictionary with the keys 'hits', 'misses' and 'sampled_out',
+            the last counting the requests in scope that sampling left uncaptured.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'sampled_out': self.sampled_out}
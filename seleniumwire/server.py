@@ -1,9 +1,14 @@
 import asyncio
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 from seleniumwire import storage
-from seleniumwire.handler import InterceptRequestHandler
+from seleniumwire.cache import ResponseCache
+from seleniumwire.handler import CacheHandler, InterceptRequestHandler
 from seleniumwire.modifier import RequestModifier
+from seleniumwire.rules import RuleEngine
+from seleniumwire.scope import ScopeMatcher
 from seleniumwire.thirdparty.mitmproxy import addons
 from seleniumwire.thirdparty.mitmproxy.master import Master
 from seleniumwire.thirdparty.mitmproxy.options import Options
@@ -31,12 +36,33 @@ class MitmProxy:
         # DEPRECATED. Will be superceded by request/response interceptors.
         self.modifier = RequestModifier()
 
+        # Declarative rules applied to requests and responses before any interceptors.
+        self.rules = RuleEngine(options.get('rules'))
+
         # The scope of requests we're interested in capturing.
-        self.scopes = []
+        self.scope_matcher = ScopeMatcher(ignore_http_methods=options.get('ignore_http_methods'))
 
         self.request_interceptor = None
         self.response_interceptor = None
 
+        # Runs interceptors for different flows in parallel when configured.
+        self.interceptor_executor = None
+
+        if options.get('interceptor_workers'):
+            self.interceptor_executor = ThreadPoolExecutor(
+                max_workers=options['interceptor_workers'], thread_name_prefix='Selenium Wire Interceptor'
+            )
+
+        # Caches responses so that they need not be fetched upstream again, when enabled.
+        self.cache = None
+
+        if options.get('cache'):
+            self.cache = ResponseCache(
+                os.path.join(self.storage.home_dir, 'cache'),
+                max_memory=options.get('cache_max_memory'),
+                max_disk=options.get('cache_max_disk'),
+            )
+
         self._event_loop = asyncio.new_event_loop()
 
         mitmproxy_opts = Options()
@@ -44,6 +70,10 @@ class MitmProxy:
         self.master = Master(self._event_loop, mitmproxy_opts)
         self.master.addons.add(*addons.default_addons())
         self.master.addons.add(SendToLogger())
+
+        if self.cache is not None:
+            self.master.addons.add(CacheHandler(self))
+
         self.master.addons.add(InterceptRequestHandler(self))
 
         mitmproxy_opts.update(
@@ -53,6 +83,12 @@ class MitmProxy:
             ssl_insecure=not options.get('verify_ssl', DEFAULT_VERIFY_SSL),
             stream_websockets=DEFAULT_STREAM_WEBSOCKETS,
             suppress_connection_errors=options.get('suppress_connection_errors', DEFAULT_SUPPRESS_CONNECTION_ERRORS),
+            key_type=options.get('key_type', 'rsa'),
+            connection_pool=options.get('connection_pool', False),
+            # Options that tune the connection pool, connection_pool_idle_timeout and connection_pool_max_per_host
+            **{k: v for k, v in options.items() if k.startswith('connection_pool_')},
+            # Options that tune the certificate store, cert_store_size and cert_store_persist
+            **{k: v for k, v in options.items() if k.startswith('cert_store_')},
             **build_proxy_args(get_upstream_proxy(self.options)),
             # Options that are prefixed mitm_ are passed through to mitmproxy
             **{k[5:]: v for k, v in options.items() if k.startswith('mitm_')},
@@ -60,9 +96,34 @@ class MitmProxy:
 
         self.master.server = ProxyServer(ProxyConfig(mitmproxy_opts))
 
+        prewarm_certs = options.get('prewarm_certs')
+        if prewarm_certs:
+            # Either True for the hosts of earlier sessions, or a list of hosts
+            hosts = None if prewarm_certs is True else prewarm_certs
+            if hosts is not None and mitmproxy_opts.upstream_cert:
+                logger.warning(
+                    'Certificates are only prewarmed for a list of hosts when mitm_upstream_cert is False, '
+                    'prewarming those of earlier sessions instead'
+                )
+                hosts = None
+            self.master.server.config.certstore.prewarm(hosts)
+
         if options.get('disable_capture', False):
             self.scopes = ['$^']
 
+    @property
+    def scopes(self):
+        return self.scope_matcher.scopes
+
+    @scopes.setter
+    def scopes(self, scopes):
+        self.scope_matcher.scopes = scopes
+
+    @property
+    def connection_pool(self):
+        """The pool of idle server connections, if connections are pooled."""
+        return self.master.server.config.connection_pool
+
     def serve_forever(self):
         """Run the server."""
         asyncio.set_event_loop(self._event_loop)
@@ -77,13 +138,30 @@ class MitmProxy:
     def shutdown(self):
         """Shutdown the server and perform any cleanup."""
         self.master.shutdown()
+
+        if self.connection_pool is not None:
+            self.connection_pool.close()
+
+        if self.interceptor_executor is not None:
+            self.interceptor_executor.shutdown(wait=False)
+
         self.storage.cleanup()
 
     def _get_storage_args(self):
         storage_args = {
             'memory_only': self.options.get('request_storage') == 'memory',
+            'request_storage': self.options.get('request_storage'),
             'base_dir': self.options.get('request_storage_base_dir'),
             'maxsize': self.options.get('request_storage_max_size'),
+            'max_memory': self.options.get('request_storage_max_memory'),
+            'spill_threshold': self.options.get('request_storage_spill_threshold'),
+            'eviction': self.options.get('request_storage_eviction'),
+            'segment_size': self.options.get('request_storage_segment_size'),
+            'async_writes': self.options.get('request_storage_async', False),
+            'queue_size': self.options.get('request_storage_queue_size'),
+            'compress': self.options.get('request_storage_compress', False),
+            'compression_threshold': self.options.get('request_storage_compress_threshold'),
+            'compression_level': self.options.get('request_storage_compress_level'),
         }
 
         return storage_args
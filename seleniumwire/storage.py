@@ -1,15 +1,26 @@
+import copy
+import functools
+import hashlib
+import io
 import logging
+import mmap
 import os
 import pickle
+import queue
 import re
 import shutil
+import sqlite3
 import sys
 import tempfile
 import threading
+import time
 import uuid
+import weakref
 from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
-from typing import DefaultDict, Iterator, List, Optional, Union
+from typing import Any, Callable, DefaultDict, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import zstandard as zstd
 
 from seleniumwire.request import Request, Response, WebSocketMessage
 
@@ -19,31 +30,386 @@ log = logging.getLogger(__name__)
 REMOVE_DATA_OLDER_THAN_DAYS = 1
 
 
-def create(*, memory_only: bool = False, **kwargs):
+# The size at which the segment storage starts writing to a new segment file.
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+# The number of writes that can be queued before saving blocks, when writes are asynchronous.
+DEFAULT_QUEUE_SIZE = 1000
+
+# Bodies smaller than this are not worth compressing.
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+DEFAULT_COMPRESSION_LEVEL = 3
+
+# The number of locks that saving and discarding bodies is spread over by digest.
+BODY_LOCK_STRIPES = 64
+
+# Bodies of these content types are already compressed.
+COMPRESSED_CONTENT_TYPES = (
+    'image/',
+    'font/',
+    'audio/',
+    'video/',
+    'application/font-woff',
+    'application/gzip',
+    'application/x-font-woff',
+    'application/zip',
+    'application/zstd',
+)
+
+
+class BodyNotFoundError(LookupError):
+    """Raised when a lazily loaded body is accessed after its storage has discarded it."""
+
+
+def create(*, memory_only: bool = False, request_storage: Optional[str] = None, **kwargs):
     """Create a new storage instance.
 
     Args:
         memory_only: When True, an in-memory implementation will be used which stores
             request data in memory only and nothing on disk. Default False.
+        request_storage: The type of storage to use. Either 'memory', 'segment', 'sqlite'
+            or None for the default storage which writes a directory per request.
         kwargs: Any arguments to initialise the storage with:
             - base_dir: The base directory under which requests are stored
             - maxsize: The maximum number of requests the storage can hold
-    Returns: A request storage implementation, currently either RequestStorage (default)
-        or InMemoryRequestStorage when memory_only is set to True.
+            - max_memory: The number of body bytes the in-memory storage holds before spilling to disk
+            - spill_threshold: The size in bytes above which the in-memory storage spills a body straight to disk
+            - eviction: The order in which the in-memory storage spills bodies, 'fifo' or 'lru'
+            - segment_size: The size in bytes at which the segment storage
+                rolls over to a new segment file
+            - async_writes: Whether disk storage writes data on a background thread
+            - queue_size: The maximum number of writes queued for the background thread
+            - compress: Whether to compress bodies with zstandard before storing them
+            - compression_threshold: The size in bytes below which bodies are not compressed
+            - compression_level: The zstandard compression level
+    Returns: A request storage implementation, currently either RequestStorage (default),
+        SegmentRequestStorage when request_storage is 'segment', SqliteRequestStorage when
+        request_storage is 'sqlite', or InMemoryRequestStorage when memory_only is set to True.
     """
-    if memory_only:
+    compressor = None
+
+    if kwargs.get('compress'):
+        compressor = BodyCompressor(
+            threshold=kwargs.get('compression_threshold') or DEFAULT_COMPRESSION_THRESHOLD,
+            level=kwargs.get('compression_level') or DEFAULT_COMPRESSION_LEVEL,
+        )
+
+    if memory_only or request_storage == 'memory':
         log.info('Using in-memory request storage')
-        return InMemoryRequestStorage(base_dir=kwargs.get('base_dir'), maxsize=kwargs.get('maxsize'))
+        return InMemoryRequestStorage(
+            base_dir=kwargs.get('base_dir'),
+            maxsize=kwargs.get('maxsize'),
+            max_memory=kwargs.get('max_memory'),
+            spill_threshold=kwargs.get('spill_threshold'),
+            eviction=kwargs.get('eviction') or 'fifo',
+            compressor=compressor,
+        )
+
+    async_args = {
+        'async_writes': bool(kwargs.get('async_writes')),
+        'queue_size': kwargs.get('queue_size') or DEFAULT_QUEUE_SIZE,
+        'compressor': compressor,
+    }
+
+    if request_storage == 'segment':
+        log.info('Using segment request storage')
+        return SegmentRequestStorage(
+            base_dir=kwargs.get('base_dir'),
+            segment_size=kwargs.get('segment_size') or DEFAULT_SEGMENT_SIZE,
+            **async_args,
+        )
+
+    if request_storage == 'sqlite':
+        log.info('Using SQLite request storage')
+        return SqliteRequestStorage(base_dir=kwargs.get('base_dir'), **async_args)
 
     log.info('Using default request storage')
-    return RequestStorage(base_dir=kwargs.get('base_dir'))
+    return RequestStorage(base_dir=kwargs.get('base_dir'), **async_args)
+
+
+class BodyCompressor:
+    """Compresses bodies with zstandard before they are stored.
+
+    Small bodies, and bodies that are already compressed according to their
+    Content-Encoding or content type, are left as they are.
+    """
+
+    def __init__(self, threshold: int = DEFAULT_COMPRESSION_THRESHOLD, level: int = DEFAULT_COMPRESSION_LEVEL):
+        """Initialise a new BodyCompressor.
+
+        Args:
+            threshold: The size in bytes below which bodies are not compressed.
+            level: The zstandard compression level.
+        """
+        self.threshold = threshold
+        self.level = level
+
+    def accepts(self, obj: Union[Request, Response]) -> bool:
+        """Whether the body of the request or response is worth compressing."""
+        if len(obj.body) < self.threshold:
+            return False
+
+        if obj.headers.get('Content-Encoding', 'identity').strip().lower() not in ('', 'identity'):
+            return False
+
+        content_type = (obj.headers.get('Content-Type') or '').lower()
+
+        # SVG is text, so it compresses well
+        return 'svg' in content_type or not content_type.startswith(COMPRESSED_CONTENT_TYPES)
+
+    def compress(self, body: bytes) -> Optional[bytes]:
+        """Compress the body.
+
+        Returns: The compressed body, or None if compression did not make it smaller.
+        """
+        # Compressor objects aren't threadsafe, so use one per body
+        data = zstd.ZstdCompressor(level=self.level).compress(body)
+
+        return data if len(data) < len(body) else None
+
+
+def _decompress(data: bytes) -> bytes:
+    return zstd.ZstdDecompressor().decompress(data)
+
+
+class CompressedBody:
+    """Decompresses a body held in memory whenever it is accessed."""
+
+    # Holders don't keep the decompressed body, which would undo the compression.
+    retain = False
+
+    def __init__(self, data: bytes, touch: Optional[Callable[[], None]] = None):
+        self.data = data
+        # Called on each access, so that the storage can tell how recently the body was used.
+        self.touch = touch
+
+    def __call__(self) -> bytes:
+        if self.touch is not None:
+            self.touch()
+
+        return _decompress(self.data)
+
+    def __repr__(self):
+        return 'CompressedBody(<{} bytes>)'.format(len(self.data))
+
+
+class _TouchedBody:
+    """Hands out a body held in memory as it is, telling the storage whenever it is accessed."""
+
+    retain = False
+
+    def __init__(self, data: bytes, touch: Callable[[], None]):
+        self.data = data
+        self.touch = touch
+
+    def __call__(self) -> bytes:
+        self.touch()
+
+        return self.data
+
+    def __repr__(self):
+        return '_TouchedBody(<{} bytes>)'.format(len(self.data))
+
+
+class _LazyBody:
+    """A stored body that is read when it is first accessed, then decompressed if
+    it was stored compressed.
+
+    A storage detaches the bodies it has handed out before it discards what they
+    read, so that a request loaded earlier keeps its body.
+    """
+
+    # Whether the request or response holding the body keeps it once read, rather
+    # than reading it afresh on each access.
+    retain = True
+
+    def __init__(self, digest: Optional[str], compressed: bool):
+        self.digest = digest
+        self.compressed = compressed
+        # The body as stored, once it has been detached.
+        self._data: Optional[bytes] = None
+
+    def __call__(self) -> bytes:
+        data = self._data if self._data is not None else self._read()
+
+        return _decompress(data) if self.compressed else data
+
+    def detach(self) -> None:
+        """Read the body now, so that it can still be accessed once the storage has discarded it."""
+        if self._data is None:
+            self._data = self._read()
+
+    def _read(self) -> bytes:
+        raise NotImplementedError
+
+
+class MappedBody(_LazyBody):
+    """Loads a stored body from a file when it is first accessed.
+
+    The file is memory-mapped and only the slice holding the body is copied out.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        compressed: bool = False,
+        digest: Optional[str] = None,
+    ):
+        super().__init__(digest, compressed)
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    def _read(self) -> bytes:
+        end = None if self.length is None else self.offset + self.length
+
+        try:
+            with open(self.path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    data = m[self.offset : end]
+        except (FileNotFoundError, ValueError) as e:
+            # The file has been removed, or truncated to nothing so that it can't be mapped
+            raise BodyNotFoundError('The body in {} is no longer stored'.format(self.path)) from e
+
+        if self.length is not None and len(data) != self.length:
+            raise BodyNotFoundError('The body in {} is no longer stored'.format(self.path))
+
+        return data
+
+    def __repr__(self):
+        return 'MappedBody(path={!r}, offset={}, length={}, compressed={})'.format(
+            self.path, self.offset, self.length, self.compressed
+        )
+
+
+class SqliteBody(_LazyBody):
+    """Loads a body stored as a blob in a SQLite database when it is first accessed."""
+
+    def __init__(self, path: str, digest: str, compressed: bool = False):
+        super().__init__(digest, compressed)
+        self.path = path
+
+    def _read(self) -> bytes:
+        try:
+            db = sqlite3.connect(self.path)
+            try:
+                row = db.execute('SELECT data FROM bodies WHERE digest = ?', (self.digest,)).fetchone()
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            # The storage has been cleaned up
+            raise BodyNotFoundError('The body {} is no longer stored'.format(self.digest)) from e
+
+        if row is None or row[0] is None:
+            raise BodyNotFoundError('The body {} is no longer stored'.format(self.digest))
+
+        return bytes(row[0])
+
+    def __repr__(self):
+        return 'SqliteBody(path={!r}, digest={!r}, compressed={})'.format(self.path, self.digest, self.compressed)
+
+
+class _Loaders:
+    """The lazily loaded bodies that a storage has handed out and that are still in use."""
+
+    def __init__(self):
+        self._loaders: weakref.WeakSet = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def add(self, loader: Union[bytes, _LazyBody]) -> Union[bytes, _LazyBody]:
+        if isinstance(loader, _LazyBody):
+            with self._lock:
+                self._loaders.add(loader)
+
+        return loader
+
+    def detach(self, digests: Set[str]) -> None:
+        """Detach the loaders of the bodies with the supplied digests."""
+        with self._lock:
+            loaders = [loader for loader in self._loaders if loader.digest in digests]
+
+            for loader in loaders:
+                try:
+                    loader.detach()
+                except BodyNotFoundError:
+                    # Already gone, so accessing it will say so
+                    pass
+
+
+def _digest(body: bytes) -> str:
+    """The content address under which a body is stored."""
+    return hashlib.blake2b(body, digest_size=20).hexdigest()
+
+
+def _ratio(numerator: int, denominator: int) -> float:
+    return numerator / denominator if denominator else 1.0
+
+
+def _without_body(obj: Union[Request, Response]) -> Union[Request, Response]:
+    """Return a shallow copy of the request or response with the body removed,
+    so that it can be saved separately from the metadata.
+    """
+    obj = copy.copy(obj)
+    obj.body = b''
+    return obj
+
+
+def _query_matches(
+    request: Request,
+    host: Optional[str] = None,
+    method: Optional[str] = None,
+    status: Optional[int] = None,
+    since: Optional[datetime] = None,
+) -> bool:
+    """Whether the request matches all of the supplied query criteria."""
+    if host is not None and request.host != host:
+        return False
+    if method is not None and request.method.upper() != method.upper():
+        return False
+    if status is not None and (request.response is None or request.response.status_code != status):
+        return False
+    if since is not None and request.date < since:
+        return False
+    return True
+
+
+class _SharedBody:
+    """A body held once on behalf of every request and response with the same content."""
+
+    def __init__(
+        self, data: bytes, size: int, compressed: bool = False, touch: Optional[Callable[[], None]] = None
+    ):
+        # The body as stored, which may be compressed.
+        self.data: Optional[bytes] = data
+        # The size of the uncompressed body, and of the body as stored.
+        self.size = size
+        self.stored_size = len(data)
+        self.compressed = compressed
+        # What the holders are given as their body, which calls touch when accessed if supplied.
+        self.value: Union[bytes, CompressedBody, _TouchedBody]
+
+        if compressed:
+            self.value = CompressedBody(data, touch)
+        elif touch is not None:
+            self.value = _TouchedBody(data, touch)
+        else:
+            self.value = data
+        # The requests and responses holding this body, keyed by object id.
+        self.holders: Dict[int, Union[Request, Response]] = {}
+        # Set once the body is to be spilled to disk, from when it counts as spilled.
+        self.path: Optional[str] = None
+        # Set once the spilled body has been written, from when it is no longer held in memory.
+        self.spilled = False
 
 
 class _IndexedRequest:
-    def __init__(self, id: str, url: str, has_response: bool):
+    def __init__(self, id: str, url: str, has_response: bool, seq: int = 0):
         self.id = id
         self.url = url
         self.has_response = has_response
+        self.seq = seq
 
 
 class RequestStorage:
@@ -52,15 +418,35 @@ class RequestStorage:
     This implementation writes the request and response data to disk, but keeps an in-memory
     index for sequencing and fast retrieval.
 
+    Bodies are stored by content hash with reference counting, so identical bodies
+    (the same scripts, stylesheets and images fetched repeatedly) are only stored once.
+
+    When async_writes is set, data is pickled and written by a background thread so that
+    saving never waits on the disk. Data that is still queued is served from memory, so
+    requests can be read back as soon as they have been saved.
+
+    When a compressor is supplied, bodies it accepts are stored compressed and
+    decompressed again when they are first accessed.
+
     Instances are designed to be threadsafe.
     """
 
-    def __init__(self, base_dir: Optional[str] = None):
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        async_writes: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        compressor: Optional[BodyCompressor] = None,
+    ):
         """Initialises a new RequestStorage using an optional base directory.
 
         Args:
             base_dir: The directory where request and response data is stored.
                 If not specified, the system temp folder is used.
+            async_writes: Whether to write data on a background thread. Default False.
+            queue_size: The maximum number of queued writes when async_writes is set.
+                Saving blocks while the queue is full.
+            compressor: Optional compressor used to compress bodies before they are stored.
         """
         if base_dir is None:
             base_dir = tempfile.gettempdir()
@@ -72,12 +458,57 @@ class RequestStorage:
 
         # Index of requests received.
         self._index: List[_IndexedRequest] = []
+        # The same index entries keyed by request id for direct lookup.
+        self._index_by_id: Dict[str, _IndexedRequest] = {}
 
         # Sequences of websocket messages held against the
         # id of the originating websocket request.
         self._ws_messages: DefaultDict[str, List] = defaultdict(list)
 
         self._lock = threading.Lock()
+        # Signalled whenever a response is saved so that waiters wake immediately.
+        self._cond = threading.Condition(self._lock)
+        self._seq = 0
+
+        # Reference counts of stored bodies by digest, and the digest of the body
+        # saved against each request id and filename.
+        self._body_refcounts: Dict[str, int] = {}
+        self._body_refs: Dict[Tuple[str, str], str] = {}
+        # The size and stored size of each body that has been written, by digest.
+        self._body_sizes: Dict[str, Tuple[int, int]] = {}
+        self._body_bytes = 0
+        self._unique_body_bytes = 0
+        self._stored_body_bytes = 0
+        # Guards the body bookkeeping above.
+        self._body_lock = threading.Lock()
+        # Held by digest while a body is written or removed, so that identical bodies
+        # are written once and a body is never removed as it is saved again.
+        self._body_locks = [threading.Lock() for _ in range(BODY_LOCK_STRIPES)]
+
+        self._compressor = compressor
+        # The digests of the bodies that are stored compressed.
+        self._compressed_bodies: Set[str] = set()
+        # Loaders of stored bodies, detached before the bodies are discarded.
+        self._loaders = _Loaders()
+
+        # Data waiting to be written by the writer thread, keyed by request id and filename.
+        self._pending: Dict[Tuple[str, str], Any] = {}
+        self._pending_lock = threading.Lock()
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        # Held while a write is queued, so that none is queued once the writer is stopped.
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        # The number of writes queued, and the number the writer thread has finished.
+        self._submitted = 0
+        self._written = 0
+        self._written_cond = threading.Condition()
+
+        if async_writes:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._writer = threading.Thread(name='Selenium Wire Storage Writer', target=self._write_forever)
+            self._writer.daemon = True
+            self._writer.start()
 
     def save_request(self, request: Request) -> None:
         """Save a request to storage.
@@ -86,19 +517,209 @@ class RequestStorage:
             request: The request to save.
         """
         request_id = str(uuid.uuid4())
-        request_dir = self._get_request_dir(request_id)
-        os.mkdir(request_dir)
         request.id = request_id
 
-        self._save(request, request_dir, 'request')
+        self._submit(self._save, _without_body(request), request_id, 'request')
+        self._submit(
+            self._save_body, request.body, request_id, 'request_body', compressible=self._is_compressible(request)
+        )
 
-        with self._lock:
-            self._index.append(_IndexedRequest(id=request_id, url=request.url, has_response=False))
+        with self._cond:
+            self._seq += 1
+            indexed_request = _IndexedRequest(id=request_id, url=request.url, has_response=False, seq=self._seq)
+            self._index.append(indexed_request)
+            self._index_by_id[request_id] = indexed_request
+            self._cond.notify_all()
+
+    def _is_compressible(self, obj: Union[Request, Response]) -> bool:
+        return self._compressor is not None and self._compressor.accepts(obj)
+
+    def _submit(self, write: Callable, obj: Any, request_id: str, filename: str, **kwargs) -> None:
+        """Write the object now, or queue it for the writer thread when writes are asynchronous.
+
+        Writes arriving after the storage has been cleaned up are dropped.
+        """
+        if self._queue is None:
+            if not self._closed:
+                write(obj, request_id, filename, **kwargs)
+            return
 
-    def _save(self, obj: Union[Request, Response, dict], dirname: str, filename: str) -> None:
-        with open(os.path.join(dirname, filename), 'wb') as out:
+        with self._submit_lock:
+            if self._closed:
+                log.debug('Dropping %s for request %s saved after cleanup', filename, request_id)
+                return
+
+            with self._pending_lock:
+                self._pending[(request_id, filename)] = obj
+
+            self._queue.put((write, obj, request_id, filename, kwargs))
+            self._submitted += 1
+
+    def _write_forever(self) -> None:
+        while True:
+            item = self._queue.get()
+
+            if item is None:
+                return
+
+            write, obj, request_id, filename, kwargs = item
+
+            try:
+                write(obj, request_id, filename, **kwargs)
+            except Exception:
+                log.exception('Error writing %s for request %s', filename, request_id)
+
+            with self._pending_lock:
+                if self._pending.get((request_id, filename)) is obj:
+                    del self._pending[(request_id, filename)]
+
+            with self._written_cond:
+                self._written += 1
+                self._written_cond.notify_all()
+
+    def flush(self) -> None:
+        """Wait until the writes queued so far have been written to disk.
+
+        Writes queued while waiting are not waited for, so this returns even
+        while requests keep arriving.
+        """
+        if self._queue is None:
+            return
+
+        with self._submit_lock:
+            target = self._submitted
+
+        with self._written_cond:
+            self._written_cond.wait_for(lambda: self._written >= target)
+
+    def _stop_writer(self) -> None:
+        """Stop accepting writes and wait for the writer thread to write those already queued."""
+        with self._submit_lock:
+            if self._closed:
+                return
+
+            self._closed = True
+
+            if self._queue is not None:
+                self._queue.put(None)
+
+        if self._writer is not None:
+            self._writer.join()
+
+    def _read(self, request_id: str, filename: str) -> Optional[Union[Request, Response, dict]]:
+        """Load an object, taking it from the pending writes if it has not been written yet."""
+        with self._pending_lock:
+            obj = self._pending.get((request_id, filename))
+
+        if obj is not None:
+            # Loaded objects are modified, so don't hand out the one waiting to be written
+            return copy.copy(obj)
+
+        return self._load(request_id, filename)
+
+    def _read_body(self, request_id: str, filename: str) -> Union[bytes, MappedBody]:
+        with self._pending_lock:
+            body = self._pending.get((request_id, filename))
+
+        if body is not None:
+            return body
+
+        return self._get_body(request_id, filename)
+
+    def _save(self, obj: Union[Request, Response, dict], request_id: str, filename: str) -> None:
+        request_dir = self._get_request_dir(request_id)
+
+        if filename == 'request':
+            os.mkdir(request_dir)
+
+        with open(os.path.join(request_dir, filename), 'wb') as out:
             pickle.dump(obj, out)
 
+    def _save_body(self, body: bytes, request_id: str, filename: str, compressible: bool = False) -> Optional[str]:
+        """Save a body against the request id and filename.
+
+        The body is only written when no identical body is already stored, and is
+        compressed first when it is compressible and compression makes it smaller.
+
+        Returns: The digest of the body, or None if the body was empty.
+        """
+        if not body:
+            return None
+
+        digest = _digest(body)
+
+        with self._get_body_lock(digest):
+            with self._body_lock:
+                stored = digest in self._body_sizes
+
+            if not stored:
+                data = self._compressor.compress(body) if compressible else None
+                self._write_body(digest, body if data is None else data)
+
+            with self._body_lock:
+                if not stored:
+                    if data is None:
+                        data = body
+                    else:
+                        self._compressed_bodies.add(digest)
+
+                    self._body_sizes[digest] = (len(body), len(data))
+                    self._unique_body_bytes += len(body)
+                    self._stored_body_bytes += len(data)
+
+                self._body_refcounts[digest] = self._body_refcounts.get(digest, 0) + 1
+                self._body_refs[(request_id, filename)] = digest
+                self._body_bytes += len(body)
+
+        return digest
+
+    def _get_body_lock(self, digest: str) -> threading.Lock:
+        return self._body_locks[int(digest[:8], 16) % len(self._body_locks)]
+
+    def _get_body(self, request_id: str, filename: str) -> Union[bytes, Callable[[], bytes]]:
+        """Get a loader for the body saved against the request id and filename."""
+        with self._body_lock:
+            digest = self._body_refs.get((request_id, filename))
+            compressed = digest in self._compressed_bodies
+
+        if digest is None:
+            return b''
+
+        return self._loaders.add(self._load_body(digest, compressed))
+
+    def _write_body(self, digest: str, body: bytes) -> None:
+        with open(self._get_body_path(digest), 'wb') as out:
+            out.write(body)
+
+    def _load_body(self, digest: str, compressed: bool = False) -> Union[bytes, _LazyBody]:
+        return MappedBody(self._get_body_path(digest), compressed=compressed, digest=digest)
+
+    def _get_body_path(self, digest: str) -> str:
+        return os.path.join(self.session_dir, 'body-{}'.format(digest))
+
+    def _load(self, request_id: str, filename: str) -> Optional[Union[Request, Response, dict]]:
+        """Load the object saved against the request id and filename.
+
+        Returns None if nothing was saved or the object could not be unpickled.
+        """
+        try:
+            with open(os.path.join(self._get_request_dir(request_id), filename), 'rb') as f:
+                return self._unpickle(f)
+        except FileNotFoundError:
+            return None
+
+    def _discard(self, index: List[_IndexedRequest]) -> None:
+        """Remove the saved data of the requests in the supplied index."""
+        for indexed_request in index:
+            shutil.rmtree(self._get_request_dir(indexed_request.id), ignore_errors=True)
+
+    def _discard_body(self, digest: str) -> None:
+        """Remove the body with the supplied digest. Must be called with its body lock held."""
+        try:
+            os.remove(self._get_body_path(digest))
+        except OSError:
+            pass
+
     def save_response(self, request_id: str, response: Response) -> None:
         """Save a response to storage against a request with the specified id.
 
@@ -112,21 +733,31 @@ class RequestStorage:
             log.debug('Cannot save response as request %s is no longer stored', request_id)
             return
 
-        request_dir = self._get_request_dir(request_id)
-
-        self._save(response, request_dir, 'response')
+        self._submit(self._save, _without_body(response), request_id, 'response')
+        self._submit(
+            self._save_body, response.body, request_id, 'response_body', compressible=self._is_compressible(response)
+        )
 
-        indexed_request.has_response = True
+        with self._cond:
+            indexed_request.has_response = True
+            self._cond.notify_all()
 
     def _get_indexed_request(self, request_id: str) -> Optional[_IndexedRequest]:
         with self._lock:
-            index = self._index[:]
+            return self._index_by_id.get(request_id)
 
-        for indexed_request in index:
-            if indexed_request.id == request_id:
-                return indexed_request
+    def get_request(self, request_id: str) -> Optional[Request]:
+        """Load the request with the specified id.
 
-        return None
+        Args:
+            request_id: The id of the request.
+
+        Returns: The request, or None if no request with that id is stored.
+        """
+        if self._get_indexed_request(request_id) is None:
+            return None
+
+        return self._load_request(request_id)
 
     def save_ws_message(self, request_id: str, message: WebSocketMessage) -> None:
         """Save a websocket message against a request with the specified id.
@@ -151,9 +782,7 @@ class RequestStorage:
             log.debug('Cannot save HAR entry as request %s is no longer stored', request_id)
             return
 
-        request_dir = self._get_request_dir(request_id)
-
-        self._save(entry, request_dir, 'har_entry')
+        self._submit(self._save, entry, request_id, 'har_entry')
 
     def load_requests(self) -> List[Request]:
         """Load all previously saved requests known to the storage (known to its index).
@@ -178,35 +807,36 @@ class RequestStorage:
         return loaded
 
     def _load_request(self, request_id: str) -> Optional[Request]:
-        request_dir = self._get_request_dir(request_id)
+        request = self._read(request_id, 'request')
 
-        with open(os.path.join(request_dir, 'request'), 'rb') as req:
-            request = self._unpickle(req)
+        if request is None:
+            return None
 
-            if request is None:
-                return None
+        # Bodies are only read from disk when they are accessed
+        request._body = self._read_body(request_id, 'request_body')
 
-            ws_messages = self._ws_messages.get(request.id)
+        ws_messages = self._ws_messages.get(request.id)
 
-            if ws_messages:
-                # Attach any websocket messages for this request if we have them
-                request.ws_messages = ws_messages
+        if ws_messages:
+            # Attach any websocket messages for this request if we have them
+            request.ws_messages = ws_messages
 
-            try:
-                # Attach the response if there is one.
-                with open(os.path.join(request_dir, 'response'), 'rb') as res:
-                    response = self._unpickle(res)
-
-                    if response is not None:
-                        request.response = response
-
-                        # The certificate data has been stored on the response but we make
-                        # it available on the request which is a more logical location.
-                        if hasattr(response, 'cert'):
-                            request.cert = response.cert
-                            del response.cert
-            except (FileNotFoundError, EOFError):
-                pass
+        # Attach the response if there is one.
+        response = self._read(request_id, 'response')
+
+        if response is not None:
+            response._body = self._read_body(request_id, 'response_body')
+            request.response = response
+
+            # The certificate data has been stored on the response but we make
+            # it available on the request which is a more logical location.
+            if hasattr(response, 'cert'):
+                request.cert = response.cert
+                del response.cert
+
+        if self._get_indexed_request(request_id) is None:
+            # Cleared while it was loading, so its bodies may not have been detached
+            return None
 
         return request
 
@@ -251,17 +881,11 @@ class RequestStorage:
         entries = []
 
         for indexed_request in index:
-            request_dir = self._get_request_dir(indexed_request.id)
+            # HAR entries aren't necessarily saved with each request.
+            entry = self._read(indexed_request.id, 'har_entry')
 
-            try:
-                with open(os.path.join(request_dir, 'har_entry'), 'rb') as f:
-                    entry = self._unpickle(f)
-
-                    if entry is not None:
-                        entries.append(entry)
-            except FileNotFoundError:
-                # HAR entries aren't necessarily saved with each request.
-                pass
+            if entry is not None:
+                entries.append(entry)
 
         return entries
 
@@ -278,13 +902,54 @@ class RequestStorage:
 
     def clear_requests(self) -> None:
         """Clear all requests currently known to this storage."""
+        # Let queued writes land so that they are cleared too
+        self.flush()
+
         with self._lock:
             index = self._index[:]
             self._index.clear()
+            self._index_by_id.clear()
             self._ws_messages.clear()
 
-        for indexed_request in index:
-            shutil.rmtree(self._get_request_dir(indexed_request.id), ignore_errors=True)
+        # Release only the bodies of the cleared requests, since requests saved
+        # meanwhile may share them
+        released = set()
+
+        with self._body_lock:
+            for indexed_request in index:
+                for filename in ('request_body', 'response_body'):
+                    digest = self._body_refs.pop((indexed_request.id, filename), None)
+
+                    if digest is not None:
+                        self._body_refcounts[digest] -= 1
+                        self._body_bytes -= self._body_sizes[digest][0]
+
+                        if not self._body_refcounts[digest]:
+                            released.add(digest)
+
+        # Requests loaded before the clear keep their bodies
+        self._loaders.detach(released)
+        self._discard(index)
+
+        for digest in released:
+            with self._get_body_lock(digest):
+                with self._body_lock:
+                    if self._body_refcounts.get(digest) or digest not in self._body_sizes:
+                        # Saved again meanwhile
+                        continue
+
+                    del self._body_refcounts[digest]
+                    size, stored_size = self._body_sizes.pop(digest)
+                    self._compressed_bodies.discard(digest)
+                    self._unique_body_bytes -= size
+                    self._stored_body_bytes -= stored_size
+
+                self._discard_body(digest)
+
+        self._discard_unused()
+
+    def _discard_unused(self) -> None:
+        """Remove any storage that a clear has left unused."""
 
     def find(self, pat: str, check_response: bool = True) -> Optional[Request]:
         """Find the first request that matches the specified pattern.
@@ -310,6 +975,111 @@ class RequestStorage:
 
         return None
 
+    def wait_for(
+        self, pat: str, timeout: Union[int, float], check_response: bool = True
+    ) -> Optional[Request]:
+        """Wait up to the timeout for a request that matches the specified pattern.
+
+        Waiters are woken as soon as a request or response is saved. Each wake-up only
+        searches requests that arrived since the previous check, plus earlier matches
+        that were still waiting for their response. The search is made without holding
+        the lock that saving needs.
+
+        Args:
+            pat: A pattern that will be searched in the request URL.
+            timeout: The maximum time to wait in seconds.
+            check_response: Whether a matching request must also have a response.
+
+        Returns: The first matching request, or None if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        cursor = 0
+        matches: List[_IndexedRequest] = []
+
+        while True:
+            with self._lock:
+                new = []
+                for indexed_request in reversed(self._index):
+                    if indexed_request.seq <= cursor:
+                        break
+                    new.append(indexed_request)
+
+                # Including any requests cleared since
+                cursor = self._seq
+
+            matches.extend(r for r in reversed(new) if re.search(pat, r.url))
+
+            found = next((r for r in matches if r.has_response or not check_response), None)
+
+            if found is not None:
+                request = self._load_request(found.id)
+
+                if request is not None:
+                    return request
+
+                # Cleared since it matched, so wait for another
+                matches = [r for r in matches if self._get_indexed_request(r.id) is r]
+                continue
+
+            with self._cond:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+
+                # Anything saved since the search was made wakes no one, so look again
+                if self._seq == cursor and not any(r.has_response for r in matches):
+                    self._cond.wait(remaining)
+
+    def query(
+        self,
+        host: Optional[str] = None,
+        method: Optional[str] = None,
+        status: Optional[int] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Request]:
+        """Find the requests that match all of the supplied criteria.
+
+        Requests are returned in chronological order.
+
+        Args:
+            host: The request host, including any port, e.g. 'demo.opencart.com'.
+            method: The request method, e.g. 'POST'.
+            status: The response status code. Requests without a response never match.
+            since: Only match requests made at or after this time.
+
+        Returns: A list of matching requests.
+        """
+        return [
+            request
+            for request in self.iter_requests()
+            if request is not None and _query_matches(request, host, method, status, since)
+        ]
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Report the number of requests held by the storage and how well their bodies
+        deduplicate and compress.
+
+        Returns: A dictionary of counts, the ratio of body bytes saved to unique body bytes,
+            and the ratio of unique body bytes to the bytes actually stored.
+        """
+        # Bodies are only counted once they have been written
+        self.flush()
+
+        with self._lock:
+            requests = len(self._index)
+
+        with self._body_lock:
+            return {
+                'requests': requests,
+                'bodies': len(self._body_refcounts),
+                'compressed_bodies': len(self._compressed_bodies),
+                'body_bytes': self._body_bytes,
+                'unique_body_bytes': self._unique_body_bytes,
+                'stored_body_bytes': self._stored_body_bytes,
+                'dedup_ratio': _ratio(self._body_bytes, self._unique_body_bytes),
+                'compression_ratio': _ratio(self._unique_body_bytes, self._stored_body_bytes),
+            }
+
     def _get_request_dir(self, request_id: str) -> str:
         return os.path.join(self.session_dir, 'request-{}'.format(request_id))
 
@@ -319,6 +1089,7 @@ class RequestStorage:
         parent directory.
         """
         log.debug('Cleaning up %s', self.session_dir)
+        self._stop_writer()
         self.clear_requests()
         shutil.rmtree(self.session_dir, ignore_errors=True)
         try:
@@ -331,9 +1102,15 @@ class RequestStorage:
     def _cleanup_old_dirs(self) -> None:
         """Clean up and remove any old storage directories that were not previously
         cleaned up properly by cleanup().
+
+        Only storage directories are removed, since the home directory also holds
+        data kept between sessions, such as the response cache and certificates.
         """
         parent_dir = os.path.dirname(self.session_dir)
         for storage_dir in os.listdir(parent_dir):
+            if not storage_dir.startswith('storage-'):
+                continue
+
             storage_dir = os.path.join(parent_dir, storage_dir)
             try:
                 if (
@@ -346,34 +1123,431 @@ class RequestStorage:
                 pass
 
 
+class SegmentRequestStorage(RequestStorage):
+    """Persists request and response data to a small number of append-only segment files.
+
+    Records are appended to the active segment, which rolls over to a new file once it
+    reaches the segment size. An in-memory offset index locates each record, so loading
+    one is a single positioned read and clearing the storage removes the segments
+    rather than a directory per request.
+
+    Segment files are numbered in sequence and a number is never used twice, so a body
+    loaded before the storage was cleared can never read another record in its place.
+
+    Instances are designed to be threadsafe.
+    """
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        async_writes: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        compressor: Optional[BodyCompressor] = None,
+    ):
+        """Initialises a new SegmentRequestStorage using an optional base directory.
+
+        Args:
+            base_dir: The directory where request and response data is stored.
+                If not specified, the system temp folder is used.
+            segment_size: The size in bytes at which a new segment file is started.
+            async_writes: Whether to write data on a background thread. Default False.
+            queue_size: The maximum number of queued writes when async_writes is set.
+            compressor: Optional compressor used to compress bodies before they are stored.
+        """
+        super().__init__(base_dir=base_dir, async_writes=async_writes, queue_size=queue_size, compressor=compressor)
+
+        self._segment_size = segment_size
+        # File descriptors of the segments keyed by segment number.
+        self._segments: Dict[int, int] = {}
+        # The number of the segment being written to, and of the next segment.
+        self._segment = 0
+        self._next_segment = 0
+        self._position = 0
+        # Location (segment, offset, length) of each record keyed by request id and record name.
+        self._offsets: Dict[Tuple[str, str], Tuple[int, int, int]] = {}
+        self._segment_lock = threading.Lock()
+
+        self._open_segment()
+
+    def _open_segment(self) -> None:
+        segment = self._next_segment
+        self._next_segment += 1
+        flags = os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+        self._segments[segment] = os.open(self._get_segment_path(segment), flags)
+        self._segment = segment
+        self._position = 0
+
+    def _get_segment_path(self, segment: int) -> str:
+        return os.path.join(self.session_dir, 'segment-{:06d}.log'.format(segment))
+
+    def _save(self, obj: Union[Request, Response, dict], request_id: str, filename: str) -> None:
+        self._append(pickle.dumps(obj), request_id, filename)
+
+    def _write_body(self, digest: str, body: bytes) -> None:
+        self._append(body, digest, 'body')
+
+    def _append(self, data: bytes, request_id: str, filename: str) -> None:
+        with self._segment_lock:
+            if self._position > 0 and self._position + len(data) > self._segment_size:
+                self._open_segment()
+
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._segments[self._segment], view) :]
+
+            self._offsets[(request_id, filename)] = (self._segment, self._position, len(data))
+            self._position += len(data)
+
+    def _load(self, request_id: str, filename: str) -> Optional[Union[Request, Response, dict]]:
+        # The lock is held across the read so that a concurrent clear can't close the segment
+        with self._segment_lock:
+            try:
+                segment, offset, length = self._offsets[(request_id, filename)]
+                fd = self._segments[segment]
+            except KeyError:
+                return None
+
+            if hasattr(os, 'pread'):
+                data = os.pread(fd, length, offset)
+            else:
+                # Windows has no pread
+                os.lseek(fd, offset, os.SEEK_SET)
+                data = os.read(fd, length)
+
+        return self._unpickle(io.BytesIO(data))
+
+    def _load_body(self, digest: str, compressed: bool = False) -> Union[bytes, MappedBody]:
+        with self._segment_lock:
+            try:
+                segment, offset, length = self._offsets[(digest, 'body')]
+            except KeyError:
+                return b''
+
+        return MappedBody(self._get_segment_path(segment), offset, length, compressed, digest)
+
+    def _discard(self, index: List[_IndexedRequest]) -> None:
+        with self._segment_lock:
+            for indexed_request in index:
+                for filename in ('request', 'response', 'har_entry'):
+                    self._offsets.pop((indexed_request.id, filename), None)
+
+    def _discard_body(self, digest: str) -> None:
+        with self._segment_lock:
+            self._offsets.pop((digest, 'body'), None)
+
+    def _discard_unused(self) -> None:
+        """Remove the segments that no record is held in any more."""
+        with self._segment_lock:
+            if not self._segments:
+                # Cleaned up
+                return
+
+            used = {segment for segment, _, _ in self._offsets.values()}
+
+            if self._segment not in used and self._position > 0:
+                # Start afresh so that the segment written to so far can be removed
+                self._open_segment()
+
+            for segment in [segment for segment in self._segments if segment not in used and segment != self._segment]:
+                os.close(self._segments.pop(segment))
+                os.remove(self._get_segment_path(segment))
+
+    def cleanup(self) -> None:
+        self._stop_writer()
+
+        with self._segment_lock:
+            for fd in self._segments.values():
+                os.close(fd)
+
+            self._segments.clear()
+
+        super().cleanup()
+
+
+class SqliteRequestStorage(RequestStorage):
+    """Persists request and response data to a SQLite database.
+
+    Request metadata is held in indexed columns so that requests can be queried inside
+    the database, while the pickled objects and bodies are held as blobs. Each distinct
+    body is held once in the bodies table, and is only read when it is accessed.
+
+    Instances are designed to be threadsafe.
+    """
+
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        async_writes: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        compressor: Optional[BodyCompressor] = None,
+    ):
+        """Initialises a new SqliteRequestStorage using an optional base directory.
+
+        Args:
+            base_dir: The directory where the database is stored.
+                If not specified, the system temp folder is used.
+            async_writes: Whether to write data on a background thread. Default False.
+            queue_size: The maximum number of queued writes when async_writes is set.
+            compressor: Optional compressor used to compress bodies before they are stored.
+        """
+        super().__init__(base_dir=base_dir, async_writes=async_writes, queue_size=queue_size, compressor=compressor)
+
+        self._db_path = os.path.join(self.session_dir, 'requests.db')
+        self._db_lock = threading.Lock()
+        # Autocommit, since each write stands alone.
+        self._db: Optional[sqlite3.Connection] = sqlite3.connect(
+            self._db_path, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=OFF')
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS requests (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                host TEXT NOT NULL,
+                path TEXT NOT NULL,
+                method TEXT NOT NULL,
+                status INTEGER,
+                content_type TEXT,
+                request_size INTEGER NOT NULL DEFAULT 0,
+                response_size INTEGER NOT NULL DEFAULT 0,
+                date REAL NOT NULL,
+                response_date REAL,
+                request BLOB,
+                response BLOB,
+                request_body_digest TEXT,
+                response_body_digest TEXT,
+                har_entry BLOB
+            );
+            CREATE TABLE IF NOT EXISTS bodies (
+                digest TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS requests_host ON requests (host);
+            CREATE INDEX IF NOT EXISTS requests_path ON requests (path);
+            CREATE INDEX IF NOT EXISTS requests_method ON requests (method);
+            CREATE INDEX IF NOT EXISTS requests_status ON requests (status);
+            CREATE INDEX IF NOT EXISTS requests_content_type ON requests (content_type);
+            CREATE INDEX IF NOT EXISTS requests_date ON requests (date);
+            """
+        )
+
+    def _save(self, obj: Union[Request, Response, dict], request_id: str, filename: str) -> None:
+        blob = pickle.dumps(obj)
+
+        with self._db_lock:
+            if self._db is None:
+                # Cleaned up
+                return
+
+            if filename == 'request':
+                self._db.execute(
+                    'INSERT INTO requests (id, url, host, path, method, date, request) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (request_id, obj.url, obj.host, obj.path, obj.method.upper(), obj.date.timestamp(), blob),
+                )
+            elif filename == 'response':
+                self._db.execute(
+                    'UPDATE requests SET status = ?, content_type = ?, response_date = ?, response = ? WHERE id = ?',
+                    (obj.status_code, obj.headers.get('Content-Type'), obj.date.timestamp(), blob, request_id),
+                )
+            else:
+                self._db.execute('UPDATE requests SET {} = ? WHERE id = ?'.format(filename), (blob, request_id))
+
+    def _save_body(self, body: bytes, request_id: str, filename: str, compressible: bool = False) -> Optional[str]:
+        digest = super()._save_body(body, request_id, filename, compressible)
+
+        if digest is not None:
+            size_column = 'request_size' if filename == 'request_body' else 'response_size'
+
+            with self._db_lock:
+                if self._db is None:
+                    # Cleaned up
+                    return digest
+
+                self._db.execute(
+                    'UPDATE requests SET {}_digest = ?, {} = ? WHERE id = ?'.format(filename, size_column),
+                    (digest, len(body), request_id),
+                )
+
+        return digest
+
+    def _write_body(self, digest: str, body: bytes) -> None:
+        with self._db_lock:
+            if self._db is None:
+                # Cleaned up
+                return
+
+            self._db.execute('INSERT OR IGNORE INTO bodies (digest, data) VALUES (?, ?)', (digest, body))
+
+    def _load(self, request_id: str, filename: str) -> Optional[Union[Request, Response, dict]]:
+        with self._db_lock:
+            if self._db is None:
+                # Cleaned up
+                return None
+
+            row = self._db.execute(
+                'SELECT {} FROM requests WHERE id = ?'.format(filename), (request_id,)
+            ).fetchone()
+
+        if row is None or row[0] is None:
+            return None
+
+        return self._unpickle(io.BytesIO(row[0]))
+
+    def _load_body(self, digest: str, compressed: bool = False) -> Union[bytes, SqliteBody]:
+        return SqliteBody(self._db_path, digest, compressed)
+
+    def _discard(self, index: List[_IndexedRequest]) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.executemany('DELETE FROM requests WHERE id = ?', [(r.id,) for r in index])
+
+    def _discard_body(self, digest: str) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute('DELETE FROM bodies WHERE digest = ?', (digest,))
+
+    def query(
+        self,
+        host: Optional[str] = None,
+        method: Optional[str] = None,
+        status: Optional[int] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Request]:
+        """Find the requests that match all of the supplied criteria, filtering inside
+        the database. See RequestStorage.query().
+        """
+        clauses, params = [], []
+
+        if host is not None:
+            clauses.append('host = ?')
+            params.append(host)
+        if method is not None:
+            clauses.append('method = ?')
+            params.append(method.upper())
+        if status is not None:
+            clauses.append('status = ?')
+            params.append(status)
+        if since is not None:
+            clauses.append('date >= ?')
+            params.append(since.timestamp())
+
+        sql = 'SELECT id FROM requests'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY rowid'
+
+        # Queued writes must reach the database before it can be queried
+        self.flush()
+
+        with self._db_lock:
+            if self._db is None:
+                # Cleaned up
+                return []
+
+            ids = [row[0] for row in self._db.execute(sql, params)]
+
+        requests = (self._load_request(request_id) for request_id in ids)
+
+        return [request for request in requests if request is not None]
+
+    def cleanup(self) -> None:
+        self._stop_writer()
+
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+        super().cleanup()
+
+
 class InMemoryRequestStorage:
     """Keeps request and response data in memory only.
 
     By default there is no limit on the number of requests that will be stored. This can
     be adjusted with the 'maxsize' attribute when creating a new instance.
 
+    Identical bodies are held once and shared between the requests and responses that
+    carry them, with reference counting so that a body is released with its last holder.
+
+    Request and response bodies can also be held to a byte budget with the 'max_memory'
+    and 'spill_threshold' attributes. Bodies beyond the budget are moved to files on disk
+    and read back whenever they are accessed, so that they stay within the budget.
+
+    When a compressor is supplied, bodies it accepts are held compressed and are
+    decompressed whenever they are accessed. The budget applies to the compressed size.
+
+    With 'lru' eviction, a body counts as used when it is read, and when a request
+    holding it is returned by the storage, including when iterating over the requests.
+
     Instances are designed to be threadsafe.
     """
 
-    def __init__(self, base_dir: Optional[str] = None, maxsize: Optional[int] = None):
+    def __init__(
+        self,
+        base_dir: Optional[str] = None,
+        maxsize: Optional[int] = None,
+        max_memory: Optional[int] = None,
+        spill_threshold: Optional[int] = None,
+        eviction: str = 'fifo',
+        compressor: Optional[BodyCompressor] = None,
+    ):
         """Initialise a new InMemoryRequestStorage.
 
         Args:
-            base_dir: The directory where certificate data is stored.
+            base_dir: The directory where certificate data and spilled bodies are stored.
                 If not specified, the system temp folder is used.
             maxsize: The maximum number of requests to store. Default no limit.
                 When this attribute is set and the storage reaches the specified maximum
                 size, old requests are discarded sequentially as new requests arrive.
+            max_memory: The maximum number of body bytes to hold in memory. Default no limit.
+                When exceeded, bodies are spilled to disk in the order set by eviction.
+            spill_threshold: Bodies larger than this many bytes are spilled to disk
+                as soon as they are saved. Default no threshold.
+            eviction: Either 'fifo' to spill the oldest bodies first, or 'lru' to spill
+                the least recently used bodies first. Default 'fifo'.
+            compressor: Optional compressor used to compress bodies before they are held.
         """
         if base_dir is None:
             base_dir = tempfile.gettempdir()
 
+        if eviction not in ('fifo', 'lru'):
+            raise ValueError('Unknown eviction policy: {}'.format(eviction))
+
         self.home_dir: str = os.path.join(base_dir, '.seleniumwire')
 
         self._maxsize = sys.maxsize if maxsize is None else maxsize
         # OrderedDict doesn't support type hints before 3.7.2
         self._requests = OrderedDict()  # type: ignore
         self._lock = threading.Lock()
+        # Signalled whenever a response is saved so that waiters wake immediately.
+        self._cond = threading.Condition(self._lock)
+        self._seq = 0
+
+        self._max_memory = sys.maxsize if max_memory is None else max_memory
+        self._spill_threshold = sys.maxsize if spill_threshold is None else spill_threshold
+        self._eviction = eviction
+        self._compressor = compressor
+        # Created when the first body is spilled.
+        self._spill_dir: str = os.path.join(self.home_dir, 'storage-{}'.format(str(uuid.uuid4())))
+        # Bodies keyed by digest.
+        self._bodies: Dict[str, _SharedBody] = {}
+        # The digest and holder of the body of each request and response, keyed by
+        # request id and 'request' or 'response'.
+        self._body_refs: Dict[Tuple[str, str], Tuple[str, Union[Request, Response]]] = {}
+        # Digests of the bodies held in memory, in the order they will be spilled.
+        self._resident = OrderedDict()  # type: ignore
+        self._resident_bytes = 0
+        self._spilled_bytes = 0
+        # Body bytes saved, counting each copy of a shared body.
+        self._body_bytes = 0
+        # Uncompressed body bytes, counting each shared body once.
+        self._unique_body_bytes = 0
+        # Loaders of spilled bodies, detached before the spill files are removed.
+        self._loaders = _Loaders()
 
     def save_request(self, request: Request) -> None:
         """Save a request to storage.
@@ -382,16 +1556,239 @@ class InMemoryRequestStorage:
             request: The request to save.
         """
         request.id = str(uuid.uuid4())
+        released, spills = [], []
 
         with self._lock:
             if self._maxsize > 0:
-                while len(self._requests) >= self._maxsize:
-                    self._requests.popitem(last=False)
+                released = self._evict(self._maxsize - 1)
 
+                self._seq += 1
                 self._requests[request.id] = {
                     'request': request,
+                    'seq': self._seq,
                 }
 
+                spills = self._track(request.id, 'request', request)
+                self._cond.notify_all()
+
+        self._discard_spilled(released)
+        self._write_spills(spills)
+
+    def _evict(self, size: int) -> List[Tuple[str, str]]:
+        """Discard the oldest requests until no more than size are held. Must be called
+        with the lock held.
+
+        Returns: The digest and path of each spilled body that is no longer held.
+        """
+        released = []
+
+        while len(self._requests) > size:
+            request_id = next(iter(self._requests))
+            del self._requests[request_id]
+            released += self._untrack(request_id)
+
+        return released
+
+    def _track(self, request_id: str, kind: str, obj: Union[Request, Response]) -> List[Tuple[str, _SharedBody]]:
+        """Share the body of a newly saved request or response with any identical body
+        already held, and pick the bodies to spill to disk to stay within the memory budget.
+        Must be called with the lock held.
+
+        Returns: The digest and body of each body to spill, to be written by _write_spills().
+        """
+        body = obj.body
+        spills: List[Tuple[str, _SharedBody]] = []
+
+        if not body:
+            return spills
+
+        digest = _digest(body)
+        shared = self._bodies.get(digest)
+
+        if shared is None:
+            data = None
+
+            if self._compressor is not None and self._compressor.accepts(obj):
+                data = self._compressor.compress(body)
+
+            touch = functools.partial(self._touch_body, digest) if self._eviction == 'lru' else None
+
+            if data is None:
+                shared = _SharedBody(body, len(body), touch=touch)
+            else:
+                shared = _SharedBody(data, len(body), compressed=True, touch=touch)
+
+            self._bodies[digest] = shared
+            self._unique_body_bytes += shared.size
+
+            if shared.stored_size > self._spill_threshold:
+                spills.append(self._spill(digest, shared))
+            else:
+                self._resident[digest] = None
+                self._resident_bytes += shared.stored_size
+
+        shared.holders[id(obj)] = obj
+        obj._body = self._load_spilled(digest, shared) if shared.spilled else shared.value
+        self._body_refs[(request_id, kind)] = (digest, obj)
+        self._body_bytes += shared.size
+
+        while self._resident_bytes > self._max_memory and self._resident:
+            digest, _ = self._resident.popitem(last=False)
+            shared = self._bodies[digest]
+            self._resident_bytes -= shared.stored_size
+            spills.append(self._spill(digest, shared))
+
+        return spills
+
+    def _spill(self, digest: str, shared: _SharedBody) -> Tuple[str, _SharedBody]:
+        # Unique to this spill, so that removing the file of a released body never
+        # removes the file of the same body saved and spilled again since
+        shared.path = os.path.join(self._spill_dir, '{}-{}'.format(digest, uuid.uuid4().hex))
+        self._spilled_bytes += shared.stored_size
+
+        return digest, shared
+
+    def _write_spills(self, spills: List[Tuple[str, _SharedBody]]) -> None:
+        """Write spilled bodies to disk and give their holders loaders in place of the
+        bodies held in memory. Must be called without the lock held.
+        """
+        for digest, shared in spills:
+            try:
+                os.makedirs(self._spill_dir, exist_ok=True)
+
+                with open(shared.path, 'wb') as out:
+                    out.write(shared.data)
+            except OSError:
+                log.exception('Error spilling a body to %s', shared.path)
+
+                with self._lock:
+                    if self._bodies.get(digest) is shared:
+                        # Hold it in memory again, to be spilled with the next save
+                        self._spilled_bytes -= shared.stored_size
+                        self._resident[digest] = None
+                        self._resident_bytes += shared.stored_size
+                        shared.path = None
+
+                continue
+
+            with self._lock:
+                held = self._bodies.get(digest) is shared
+
+                if held:
+                    for holder in shared.holders.values():
+                        # Leave alone any holder whose body has since been replaced
+                        if holder._body is shared.value:
+                            holder._body = self._load_spilled(digest, shared)
+
+                    shared.data = None
+                    shared.value = b''
+                    shared.spilled = True
+
+            if not held:
+                # Released while it was being written
+                try:
+                    os.remove(shared.path)
+                except OSError:
+                    pass
+
+    def _load_spilled(self, digest: str, shared: _SharedBody) -> MappedBody:
+        body = MappedBody(shared.path, compressed=shared.compressed, digest=digest)
+        # Read afresh on each access, so that the body stays on disk as accounted for
+        body.retain = False
+
+        return self._loaders.add(body)
+
+    def _discard_spilled(self, spilled: List[Tuple[str, str]]) -> None:
+        """Remove the files of spilled bodies that are no longer held, once any of them
+        still in use elsewhere have been detached. Must be called without the lock held.
+        """
+        if not spilled:
+            return
+
+        self._loaders.detach({digest for digest, _ in spilled})
+
+        for _, path in spilled:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _untrack(self, request_id: str) -> List[Tuple[str, str]]:
+        """Release the bodies of a discarded request. Must be called with the lock held.
+
+        Returns: The digest and path of each spilled body that is no longer held.
+        """
+        released = []
+
+        for kind in ('request', 'response'):
+            try:
+                digest, holder = self._body_refs.pop((request_id, kind))
+            except KeyError:
+                continue
+
+            shared = self._bodies[digest]
+            del shared.holders[id(holder)]
+            self._body_bytes -= shared.size
+
+            if shared.holders:
+                continue
+
+            # That was the last holder, so release the body
+            del self._bodies[digest]
+            self._unique_body_bytes -= shared.size
+
+            if shared.path is None:
+                del self._resident[digest]
+                self._resident_bytes -= shared.stored_size
+            else:
+                self._spilled_bytes -= shared.stored_size
+
+                # A body still being written is removed by its writer
+                if shared.spilled:
+                    released.append((digest, shared.path))
+
+        return released
+
+    def _touch(self, request_id: str) -> None:
+        """Mark the bodies of a request as recently used. Must be called with the lock held."""
+        if self._eviction == 'lru':
+            for kind in ('request', 'response'):
+                digest, _ = self._body_refs.get((request_id, kind), (None, None))
+
+                if digest in self._resident:
+                    self._resident.move_to_end(digest)
+
+    def _touch_body(self, digest: str) -> None:
+        """Mark a body as recently used as it is read. Must be called without the lock held."""
+        with self._lock:
+            if digest in self._resident:
+                self._resident.move_to_end(digest)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Report how much body data is held in memory, how much has been spilled to disk
+        and how well bodies deduplicate and compress.
+
+        Returns: A dictionary of counts, the ratio of body bytes saved to unique body bytes,
+            and the ratio of unique body bytes to the bytes actually stored.
+        """
+        with self._lock:
+            stored_body_bytes = self._resident_bytes + self._spilled_bytes
+
+            return {
+                'requests': len(self._requests),
+                'bodies': len(self._bodies),
+                'compressed_bodies': sum(1 for shared in self._bodies.values() if shared.compressed),
+                'body_bytes': self._body_bytes,
+                'unique_body_bytes': self._unique_body_bytes,
+                'stored_body_bytes': stored_body_bytes,
+                'dedup_ratio': _ratio(self._body_bytes, self._unique_body_bytes),
+                'compression_ratio': _ratio(self._unique_body_bytes, stored_body_bytes),
+                'resident_bytes': self._resident_bytes,
+                'resident_bodies': len(self._resident),
+                'spilled_bytes': self._spilled_bytes,
+                'spilled_bodies': len(self._bodies) - len(self._resident),
+            }
+
     def save_response(self, request_id: str, response: Response) -> None:
         """Save a response to storage against a request with the specified id.
 
@@ -402,15 +1799,25 @@ class InMemoryRequestStorage:
             request_id: The id of the original request.
             response: The response to save.
         """
-        request = self._get_request(request_id)
+        request = self.get_request(request_id)
 
         if request is not None:
-            request.response = response
-            # The certificate data has been stored on the response but we make
-            # it available on the request which is a more logical location.
-            if hasattr(response, 'cert'):
-                request.cert = response.cert
-                del response.cert
+            spills = []
+
+            with self._cond:
+                request.response = response
+                # The certificate data has been stored on the response but we make
+                # it available on the request which is a more logical location.
+                if hasattr(response, 'cert'):
+                    request.cert = response.cert
+                    del response.cert
+
+                if request_id in self._requests:
+                    spills = self._track(request_id, 'response', response)
+
+                self._cond.notify_all()
+
+            self._write_spills(spills)
         else:
             log.debug('Cannot save response as request %s is no longer stored' % request_id)
 
@@ -421,7 +1828,7 @@ class InMemoryRequestStorage:
             request_id: The id of the original handshake request.
             message: The websocket message to save.
         """
-        request = self._get_request(request_id)
+        request = self.get_request(request_id)
 
         if request is not None:
             request.ws_messages.append(message)
@@ -440,14 +1847,23 @@ class InMemoryRequestStorage:
             except KeyError:
                 log.debug('Cannot save HAR entry as request %s is no longer stored', request_id)
 
-    def _get_request(self, request_id: str) -> Optional[Request]:
-        """Get a request with the specified id or None if no request found."""
+    def get_request(self, request_id: str) -> Optional[Request]:
+        """Get the request with the specified id.
+
+        Args:
+            request_id: The id of the request.
+
+        Returns: The request, or None if no request with that id is stored.
+        """
         with self._lock:
             try:
-                return self._requests[request_id]['request']
+                request = self._requests[request_id]['request']
             except KeyError:
                 return None
 
+            self._touch(request_id)
+            return request
+
     def load_requests(self) -> List[Request]:
         """Load all previously saved requests.
 
@@ -460,7 +1876,12 @@ class InMemoryRequestStorage:
         Returns: A list of request objects.
         """
         with self._lock:
-            return [v['request'] for v in self._requests.values()]
+            requests = [v['request'] for v in self._requests.values()]
+
+            for request in requests:
+                self._touch(request.id)
+
+            return requests
 
     def load_last_request(self) -> Optional[Request]:
         """Load the last saved request.
@@ -470,10 +1891,13 @@ class InMemoryRequestStorage:
         """
         with self._lock:
             try:
-                return next(reversed(self._requests.values()))['request']
+                request = next(reversed(self._requests.values()))['request']
             except (StopIteration, KeyError):
                 return None
 
+            self._touch(request.id)
+            return request
+
     def load_har_entries(self) -> List[dict]:
         """Load all previously saved HAR entries.
 
@@ -491,12 +1915,28 @@ class InMemoryRequestStorage:
             values = list(self._requests.values())
 
         for v in values:
-            yield v['request']
+            request = v['request']
+
+            with self._lock:
+                self._touch(request.id)
+
+            yield request
 
     def clear_requests(self) -> None:
         """Clear all previously saved requests."""
         with self._lock:
+            spilled = [(digest, shared.path) for digest, shared in self._bodies.items() if shared.spilled]
             self._requests.clear()
+            self._bodies.clear()
+            self._body_refs.clear()
+            self._resident.clear()
+            self._resident_bytes = 0
+            self._spilled_bytes = 0
+            self._body_bytes = 0
+            self._unique_body_bytes = 0
+
+        # Requests held elsewhere keep their bodies
+        self._discard_spilled(spilled)
 
     def find(self, pat: str, check_response: bool = True) -> Optional[Request]:
         """Find the first request that matches the specified pattern.
@@ -518,10 +1958,68 @@ class InMemoryRequestStorage:
 
                 if re.search(pat, request.url):
                     if (check_response and request.response) or not check_response:
+                        self._touch(request.id)
                         return request
 
         return None
 
+    def wait_for(
+        self, pat: str, timeout: Union[int, float], check_response: bool = True
+    ) -> Optional[Request]:
+        """Wait up to the timeout for a request that matches the specified pattern.
+
+        Waiters are woken as soon as a request or response is saved. Each wake-up only
+        searches requests that arrived since the previous check, plus earlier matches
+        that were still waiting for their response.
+
+        Args:
+            pat: A pattern that will be searched in the request URL.
+            timeout: The maximum time to wait in seconds.
+            check_response: Whether a matching request must also have a response.
+
+        Returns: The first matching request, or None if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        cursor = 0
+        matches: List[Request] = []
+
+        with self._cond:
+            while True:
+                new = []
+                for v in reversed(self._requests.values()):
+                    if v['seq'] <= cursor:
+                        break
+                    new.append(v)
+
+                if new:
+                    cursor = new[0]['seq']
+                    matches.extend(v['request'] for v in reversed(new) if re.search(pat, v['request'].url))
+
+                for request in matches:
+                    if (check_response and request.response) or not check_response:
+                        self._touch(request.id)
+                        return request
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+
+                self._cond.wait(remaining)
+
+    def query(
+        self,
+        host: Optional[str] = None,
+        method: Optional[str] = None,
+        status: Optional[int] = None,
+        since: Optional[datetime] = None,
+    ) -> List[Request]:
+        """Find the requests that match all of the supplied criteria, as RequestStorage.query()."""
+        with self._lock:
+            requests = [v['request'] for v in self._requests.values()]
+
+        return [request for request in requests if _query_matches(request, host, method, status, since)]
+
     def cleanup(self) -> None:
         """Clear all previously saved requests."""
         self.clear_requests()
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
@@ -1,13 +1,18 @@
+import collections
 import contextlib
 import datetime
+import hashlib
 import ipaddress
 import os
 import ssl
 import sys
+import tempfile
+import threading
 import time
 import typing
 
 import OpenSSL
+from cryptography.hazmat.primitives.asymmetric import ec
 from pyasn1.codec.der.decoder import decode
 from pyasn1.error import PyAsn1Error
 from pyasn1.type import char, constraint, namedtype, tag, univ
@@ -18,6 +23,9 @@ from seleniumwire.thirdparty.mitmproxy.coretypes import serializable
 DEFAULT_EXP = 94608000  # = 60 * 60 * 24 * 365 * 3 = 3 years
 DEFAULT_EXP_DUMMY_CERT = 31536000  # = 60 * 60 * 24 * 365 = 1 year
 
+# "ecdsa" keys are on the P-256 curve. Signing with them is far cheaper than with RSA keys.
+KEY_TYPES = ("rsa", "ecdsa")
+
 # Generated with "openssl dhparam". It's too slow to generate this on startup.
 DEFAULT_DHPARAM = b"""
 -----BEGIN DH PARAMETERS-----
@@ -36,9 +44,22 @@ rD693XKIHUCWOjMh1if6omGXKHH40QuME2gNa50+YPn1iYDl88uDbbMCAQI=
 """
 
 
-def create_ca(organization, cn, exp, key_size):
+def create_key(key_type, key_size):
+    """
+        Generates a private key.
+
+        key_type: One of KEY_TYPES.
+        key_size: The size of an RSA key in bits.
+    """
+    if key_type == "ecdsa":
+        return OpenSSL.crypto.PKey.from_cryptography_key(ec.generate_private_key(ec.SECP256R1()))
     key = OpenSSL.crypto.PKey()
     key.generate_key(OpenSSL.crypto.TYPE_RSA, key_size)
+    return key
+
+
+def create_ca(organization, cn, exp, key_size, key_type="rsa"):
+    key = create_key(key_type, key_size)
     cert = OpenSSL.crypto.X509()
     cert.set_serial_number(int(time.time() * 10000))
     cert.set_version(2)
@@ -80,7 +101,7 @@ def create_ca(organization, cn, exp, key_size):
     return key, cert
 
 
-def dummy_cert(privkey, cacert, commonname, sans, organization):
+def dummy_cert(privkey, cacert, commonname, sans, organization, key=None):
     """
         Generates a dummy certificate.
 
@@ -89,6 +110,7 @@ def dummy_cert(privkey, cacert, commonname, sans, organization):
         commonname: Common name for the generated certificate.
         sans: A list of Subject Alternate Names.
         organization: Organization name for the generated certificate.
+        key: Key for the generated certificate. Defaults to the key of the CA.
 
         Returns cert if operation succeeded, None if not.
     """
@@ -131,7 +153,7 @@ def dummy_cert(privkey, cacert, commonname, sans, organization):
             b"serverAuth,clientAuth"
         )
     ])
-    cert.set_pubkey(cacert.get_pubkey())
+    cert.set_pubkey(key if key is not None else cacert.get_pubkey())
     cert.sign(privkey, "sha256")
     return Cert(cert)
 
@@ -152,28 +174,40 @@ TCertId = typing.Union[TCustomCertId, TGeneratedCertId]
 class CertStore:
 
     """
-        Implements an in-memory certificate store.
+        Implements a certificate store.
+
+        Generated certificates are kept in memory up to store_cap, the least
+        recently used being dropped first. They are also saved to cert_dir if
+        given, so that later stores load them rather than generate them again.
     """
     STORE_CAP = 100
+    # Saved certificates are generated again this long before they expire.
+    RENEW_BEFORE = datetime.timedelta(days=1)
 
     def __init__(
             self,
             default_privatekey,
             default_ca,
             default_chain_file,
-            dhparams):
+            dhparams,
+            store_cap: int = STORE_CAP,
+            cert_dir: typing.Optional[str] = None,
+            leaf_key=None):
         self.default_privatekey = default_privatekey
         self.default_ca = default_ca
         self.default_chain_file = default_chain_file
         self.dhparams = dhparams
-        self.certs: typing.Dict[TCertId, CertStoreEntry] = {}
-        self.expire_queue = []
-
-    def expire(self, entry):
-        self.expire_queue.append(entry)
-        if len(self.expire_queue) > self.STORE_CAP:
-            d = self.expire_queue.pop(0)
-            self.certs = {k: v for k, v in self.certs.items() if v != d}
+        self.store_cap = store_cap
+        self.cert_dir = cert_dir
+        # The key of generated certs
+        self.leaf_key = leaf_key if leaf_key is not None else default_privatekey
+        # Certs added to the store, by name
+        self.certs: typing.Dict[TCustomCertId, CertStoreEntry] = {}
+        # Generated certs, least recently used first
+        self.generated: typing.Dict[TGeneratedCertId, CertStoreEntry] = collections.OrderedDict()
+        # Certs being generated, so that other threads wait for them rather than generate them too
+        self._pending: typing.Dict[TGeneratedCertId, threading.Event] = {}
+        self._lock = threading.Lock()
 
     @staticmethod
     def load_dhparam(path):
@@ -196,10 +230,28 @@ class CertStore:
             return dh
 
     @classmethod
-    def from_store(cls, path, basename, key_size, passphrase: typing.Optional[bytes] = None):
+    def from_store(
+            cls,
+            path,
+            basename,
+            key_size,
+            passphrase: typing.Optional[bytes] = None,
+            store_cap: int = STORE_CAP,
+            persist: bool = False,
+            key_type: str = "rsa"):
+        """
+            Loads the CA from path, creating it if it does not exist.
+
+            persist: Save generated certs under path. They are kept apart for each CA
+            and key, as certs signed by one CA are of no use with another.
+
+            key_type: The type of key for a CA that is created, and for generated certs.
+            Generated certs take the key of the CA if it is of that type. Otherwise they
+            share a key of their own, which is created in path if it does not exist.
+        """
         ca_path = os.path.join(path, basename + "-ca.pem")
         if not os.path.exists(ca_path):
-            key, ca = cls.create_store(path, basename, key_size)
+            key, ca = cls.create_store(path, basename, key_size, key_type=key_type)
         else:
             with open(ca_path, "rb") as f:
                 raw = f.read()
@@ -212,7 +264,33 @@ class CertStore:
                 passphrase)
         dh_path = os.path.join(path, basename + "-dhparam.pem")
         dh = cls.load_dhparam(dh_path)
-        return cls(key, ca, ca_path, dh)
+        leaf_key = key
+        if key_type == "ecdsa" and key.type() != OpenSSL.crypto.TYPE_EC:
+            # The CA still signs the certs, but clients make handshakes with the leaf key
+            leaf_key = cls.load_leaf_key(os.path.join(path, basename + "-leaf-ecdsa.pem"), key_type, key_size)
+        cert_dir = None
+        if persist:
+            leaf_public_key = OpenSSL.crypto.dump_publickey(OpenSSL.crypto.FILETYPE_ASN1, leaf_key)
+            store_id = hashlib.sha256(ca.digest("sha256") + leaf_public_key).hexdigest()[:16]
+            cert_dir = os.path.join(path, basename + "-certs", store_id)
+        return cls(key, ca, ca_path, dh, store_cap, cert_dir, leaf_key)
+
+    @staticmethod
+    def load_leaf_key(path, key_type, key_size):
+        """
+            Loads the key for generated certs from path, creating it if it does not exist.
+        """
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return OpenSSL.crypto.load_privatekey(OpenSSL.crypto.FILETYPE_PEM, f.read())
+
+        key = create_key(key_type, key_size)
+        with CertStore.umask_secret():
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(OpenSSL.crypto.dump_privatekey(OpenSSL.crypto.FILETYPE_PEM, key))
+        os.replace(tmp, path)
+        return key
 
     @staticmethod
     @contextlib.contextmanager
@@ -230,14 +308,14 @@ class CertStore:
             os.umask(original_umask)
 
     @staticmethod
-    def create_store(path, basename, key_size, organization=None, cn=None, expiry=DEFAULT_EXP):
+    def create_store(path, basename, key_size, organization=None, cn=None, expiry=DEFAULT_EXP, key_type="rsa"):
         if not os.path.exists(path):
             os.makedirs(path)
 
         organization = organization or basename
         cn = cn or basename
 
-        key, ca = create_ca(organization=organization, cn=cn, exp=expiry, key_size=key_size)
+        key, ca = create_ca(organization=organization, cn=cn, exp=expiry, key_size=key_size, key_type=key_type)
         # Dump the CA plus private key
         with CertStore.umask_secret(), open(os.path.join(path, basename + "-ca.pem"), "wb") as f:
             f.write(
@@ -341,13 +419,12 @@ class CertStore:
             organization: Organization name for the generated certificate.
         """
 
-        potential_keys: typing.List[TCertId] = []
+        potential_keys: typing.List[TCustomCertId] = []
         if commonname:
             potential_keys.extend(self.asterisk_forms(commonname))
         for s in sans:
             potential_keys.extend(self.asterisk_forms(s))
         potential_keys.append(b"*")
-        potential_keys.append((commonname, tuple(sans)))
 
         name = next(
             filter(lambda key: key in self.certs, potential_keys),
@@ -356,20 +433,148 @@ class CertStore:
         if name:
             entry = self.certs[name]
         else:
-            entry = CertStoreEntry(
-                cert=dummy_cert(
-                    self.default_privatekey,
-                    self.default_ca,
-                    commonname,
-                    sans,
-                    organization),
-                privatekey=self.default_privatekey,
-                chain_file=self.default_chain_file)
-            self.certs[(commonname, tuple(sans))] = entry
-            self.expire(entry)
+            # The SANs are sorted so that a cert is found whatever order they are given in
+            entry = self._get_generated((commonname, tuple(sorted(sans))), organization)
 
         return entry.cert, entry.privatekey, entry.chain_file
 
+    def prewarm(self, hosts: typing.Optional[typing.Iterable[typing.Union[str, bytes]]] = None) -> threading.Thread:
+        """
+            Gets certs ready in a background thread, so that connections do not wait for them.
+
+            hosts: Hosts to generate certs for, as they are found for connections when the
+            upstream_cert option is off. With it on, certs mirror the upstream cert, which is
+            only known once connected, so certs generated for hosts would not be used.
+            By default the certs saved by earlier stores are loaded instead, most recently
+            used first, up to the size of the store.
+
+            Returns the thread, which has been started.
+        """
+        if hosts is None:
+            target = self._load_saved
+        else:
+            names = [h.encode("idna") if isinstance(h, str) else h for h in hosts]
+
+            def target():
+                for name in names:
+                    # Keyed as TlsLayer._find_cert() finds them, from the host and the same SNI
+                    self.get_cert(name, [name])
+
+        thread = threading.Thread(target=target, name="CertStore prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def _get_generated(self, key: TGeneratedCertId, organization: typing.Optional[bytes]) -> CertStoreEntry:
+        while True:
+            with self._lock:
+                entry = self.generated.get(key)
+                if entry is not None:
+                    self.generated.move_to_end(key)
+                    return entry
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+
+        try:
+            cert = self._load(key)
+            if cert is None:
+                commonname, sans = key
+                cert = dummy_cert(
+                    self.default_privatekey, self.default_ca, commonname, list(sans), organization, self.leaf_key
+                )
+                self._save(key, cert)
+            entry = CertStoreEntry(cert, self.leaf_key, self.default_chain_file)
+            self._add_generated(key, entry)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+        return entry
+
+    def _add_generated(self, key: TGeneratedCertId, entry: CertStoreEntry, recent: bool = True) -> None:
+        with self._lock:
+            if key in self.generated:
+                return
+            self.generated[key] = entry
+            if not recent:
+                self.generated.move_to_end(key, last=False)
+            while len(self.generated) > self.store_cap:
+                self.generated.popitem(last=False)
+
+    def _cert_path(self, key: TGeneratedCertId) -> str:
+        return os.path.join(self.cert_dir, hashlib.sha256(repr(key).encode()).hexdigest() + ".pem")
+
+    def _save(self, key: TGeneratedCertId, cert: "Cert") -> None:
+        if self.cert_dir is None:
+            return
+        commonname, sans = key
+        # The names the cert was generated for precede it, so that it can be found again on loading
+        header = b"".join([b"CN: %s\n" % commonname] if commonname else [])
+        header += b"".join(b"SAN: %s\n" % s for s in sans)
+        try:
+            os.makedirs(self.cert_dir, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cert_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(header + cert.to_pem())
+            os.replace(tmp, self._cert_path(key))
+        except OSError:
+            # The cert will be generated again by later stores
+            pass
+
+    def _load(self, key: TGeneratedCertId) -> typing.Optional["Cert"]:
+        if self.cert_dir is None:
+            return None
+        path = self._cert_path(key)
+        saved = self._read(path)
+        if saved is None or saved[0] != key:
+            return None
+        try:
+            # Loaded certs are the recently used ones to prewarm with
+            os.utime(path)
+        except OSError:
+            pass
+        return saved[1]
+
+    def _read(self, path: str) -> typing.Optional[typing.Tuple[TGeneratedCertId, "Cert"]]:
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            header, _, pem = raw.partition(b"-----BEGIN")
+            cert = Cert.from_pem(b"-----BEGIN" + pem)
+        except (OSError, OpenSSL.crypto.Error, ValueError):
+            return None
+        if cert.notafter - datetime.datetime.utcnow() < self.RENEW_BEFORE:
+            return None
+        commonname = None
+        sans = []
+        for line in header.splitlines():
+            name, _, value = line.partition(b": ")
+            if name == b"CN":
+                commonname = value
+            elif name == b"SAN":
+                sans.append(value)
+        return (commonname, tuple(sans)), cert
+
+    def _load_saved(self) -> None:
+        if self.cert_dir is None:
+            return
+        try:
+            with os.scandir(self.cert_dir) as it:
+                files = [(e.stat().st_mtime, e.path) for e in it if e.name.endswith(".pem")]
+        except OSError:
+            return
+        files.sort(reverse=True)
+        for _, path in files[:self.store_cap]:
+            saved = self._read(path)
+            if saved is not None:
+                key, cert = saved
+                entry = CertStoreEntry(cert, self.leaf_key, self.default_chain_file)
+                # Certs used since the store was created stay the most recently used
+                self._add_generated(key, entry, recent=False)
+
 
 class _GeneralName(univ.Choice):
     # We only care about dNSName and iPAddress
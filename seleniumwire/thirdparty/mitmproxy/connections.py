@@ -191,6 +191,8 @@ class ServerConnection(tcp.TCPClient, stateobject.StateObject):
         self.timestamp_end = None
         self.timestamp_tcp_setup = None
         self.timestamp_tls_setup = None
+        # Whether the last exchange left the connection idle and fit to be pooled.
+        self.reusable = False
 
     def connected(self):
         return bool(self.connection) and not self.finished
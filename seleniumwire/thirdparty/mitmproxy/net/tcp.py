@@ -99,12 +99,25 @@ class Writer(_FileLike):
 
 
 class Reader(_FileLike):
+    """
+        Reads from a socket, a pyOpenSSL connection or a file.
+
+        Nothing is read ahead of what is asked for, as the proxy layers that
+        take over a connection select on the socket itself. Lines are found by
+        peeking at the socket rather than reading it a byte at a time.
+    """
+
+    def __init__(self, o):
+        super().__init__(o)
+        # Reused for every read and peek, so that data is received into it rather than into new bytes
+        self._buffer = bytearray(self.BLOCKSIZE)
+        self._view = memoryview(self._buffer)
 
     def read(self, length):
         """
             If length is -1, we read until connection closes.
         """
-        result = b''
+        result = bytearray()
         start = time.time()
         while length == -1 or length > 0:
             if length == -1 or length > self.BLOCKSIZE:
@@ -112,7 +125,7 @@ class Reader(_FileLike):
             else:
                 rlen = length
             try:
-                data = self.o.read(rlen)
+                received = self._read_into(self._view[:rlen])
             except SSL.ZeroReturnError:
                 # TLS connection was shut down cleanly
                 break
@@ -140,29 +153,63 @@ class Reader(_FileLike):
             except SSL.Error as e:
                 raise exceptions.TlsException(str(e))
             self.first_byte_timestamp = self.first_byte_timestamp or time.time()
-            if not data:
+            if not received:
                 break
-            result += data
+            result += self._view[:received]
             if length != -1:
-                length -= len(data)
+                length -= received
+        result = bytes(result)
         self.add_log(result)
         return result
 
+    def _read_into(self, buffer):
+        if isinstance(self.o, SSL.Connection):
+            return self.o.recv_into(buffer, len(buffer))
+        if hasattr(self.o, "readinto"):
+            return self.o.readinto(buffer)
+        data = self.o.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
     def readline(self, size=None):
-        result = b''
-        bytes_read = 0
-        while True:
-            if size is not None and bytes_read >= size:
+        result = bytearray()
+        while size is None or len(result) < size:
+            rlen = self.BLOCKSIZE if size is None else min(self.BLOCKSIZE, size - len(result))
+            available = self._peek_into_buffer(rlen)
+            if available:
+                # Read up to and including the end of the line, or all that is available
+                data = self.read(self._buffer.find(b"\n", 0, available) + 1 or available)
+            else:
+                # Wait for a byte, which also tells a closed connection from an error
+                data = self.read(1)
+            if not data:
                 break
-            ch = self.read(1)
-            bytes_read += 1
-            if not ch:
+            result += data
+            if data.endswith(b"\n"):
                 break
-            else:
-                result += ch
-                if ch == b'\n':
-                    break
-        return result
+        return bytes(result)
+
+    def _peek_into_buffer(self, length):
+        """
+            Peeks at up to the next length bytes that can be read, into the buffer.
+
+            Returns:
+                The number of bytes, which is 0 if the file object cannot be peeked
+                into or nothing could be peeked without an error.
+        """
+        try:
+            if isinstance(self.o, socket_fileobject):
+                return self.o._sock.recv_into(self._view, length, socket.MSG_PEEK)
+            elif isinstance(self.o, SSL.Connection):
+                return self.o.recv_into(self._view, length, socket.MSG_PEEK)
+        except socket.timeout:
+            raise exceptions.TcpTimeout()
+        except socket.error as e:
+            raise exceptions.TcpDisconnect(str(e))
+        except SSL.Error:
+            # Reading reports the error, or waits if OpenSSL wants more data
+            pass
+        return 0
 
     def safe_read(self, length):
         """
@@ -363,6 +410,8 @@ class TCPClient(_Connection):
         self.server_certs = []
         self.sni = None
         self.spoof_source_address = spoof_source_address
+        self.context_cache = None
+        self.session_key = None
 
     @property
     def ssl_verification_error(self) -> Optional[exceptions.InvalidCertificateException]:
@@ -378,30 +427,59 @@ class TCPClient(_Connection):
             else:
                 close_socket(self.connection)
 
-    def convert_to_tls(self, sni=None, alpn_protos=None, **sslctx_kwargs):
-        context = tls.create_client_context(
-            alpn_protos=alpn_protos,
-            sni=sni,
-            **sslctx_kwargs
-        )
+    def convert_to_tls(self, sni=None, alpn_protos=None, context_cache=None, **sslctx_kwargs):
+        """
+        Convert connection to SSL.
+        For a list of parameters, see tls.create_client_context(...)
+
+        A context_cache reuses a context created by an earlier connection with the same
+        parameters, and resumes the session negotiated by an earlier connection to the server.
+        """
+        if context_cache is None:
+            context = tls.create_client_context(alpn_protos=alpn_protos, **sslctx_kwargs)
+        else:
+            context, context_key = context_cache.client_context(alpn_protos=alpn_protos, **sslctx_kwargs)
+            self.context_cache = context_cache
+            self.session_key = (context_key, self.address, sni)
+
         sock = self.connection
-        self.connection = SSL.Connection(context, self.connection)
+        self.connection = tls.create_client_connection(context, sock, sni, self.address)
         if sni:
             self.sni = sni
-            self.connection.set_tlsext_host_name(sni.encode("idna"))
-        self.connection.set_connect_state()
+
+        if self.session_key is not None:
+            session = context_cache.get_session(self.session_key)
+            if session is not None:
+                self.connection.set_session(session)
+
         do_ssl_handshake(sock, self.connection)
 
         self.cert = certs.Cert(self.connection.get_peer_certificate())
 
         # Keep all server certificates in a list
-        for i in self.connection.get_peer_cert_chain():
+        for i in self.connection.get_peer_cert_chain() or []:
             self.server_certs.append(certs.Cert(i))
 
         self.tls_established = True
         self.rfile.set_descriptor(self.connection)
         self.wfile.set_descriptor(self.connection)
 
+        # TLS 1.3 servers send the session only after the handshake, which is read with the
+        # response. Those sessions are saved when the connection is finished instead.
+        if self.connection.get_protocol_version_name() != "TLSv1.3":
+            self.save_session()
+
+    def save_session(self):
+        """Save the TLS session of the connection for later connections to the server to resume."""
+        if self.session_key is not None and self.tls_established:
+            session = self.connection.get_session()
+            if session is not None:
+                self.context_cache.put_session(self.session_key, session)
+
+    def finish(self):
+        self.save_session()
+        super().finish()
+
     def makesocket(self, family, type, proto):
         # some parties (cuckoo sandbox) need to hook this
         return socket.socket(family, type, proto)
@@ -455,6 +533,9 @@ class TCPClient(_Connection):
                 'Error connecting to "%s": %s' %
                 (self.address[0], err)
             )
+        # Writes are buffered and flushed whole. Left to Nagle's algorithm, a resumed TLS 1.2
+        # handshake holds back the first request until the server acknowledges the handshake.
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.connection = connection
         self.source_address = connection.getsockname()
         self.ip_address = connection.getpeername()
@@ -517,18 +598,27 @@ class BaseHandler(_Connection):
         self.server = server
         self.clientcert = None
 
-    def convert_to_tls(self, cert, key, **sslctx_kwargs):
+    def convert_to_tls(self, cert, key, context_cache=None, **sslctx_kwargs):
         """
         Convert connection to SSL.
         For a list of parameters, see tls.create_server_context(...)
+
+        A context_cache reuses a context created by an earlier connection with the same parameters,
+        which lets clients resume the sessions they negotiated with it.
         """
 
-        context = tls.create_server_context(
-            cert=cert,
-            key=key,
-            **sslctx_kwargs)
+        if context_cache is None:
+            context = tls.create_server_context(
+                cert=cert,
+                key=key,
+                **sslctx_kwargs)
+        else:
+            context = context_cache.server_context(cert=cert, key=key, **sslctx_kwargs)
         sock = self.connection
         self.connection = SSL.Connection(context, self.connection)
+        if context_cache is not None:
+            # A cached context selects ALPN with the callback of the connection
+            self.connection.set_app_data(sslctx_kwargs.get("alpn_select_callback"))
         self.connection.set_accept_state()
         try:
             do_ssl_handshake(sock, self.connection)
@@ -650,6 +740,8 @@ class TCPServer:
                 r, w_, e_ = select.select([self.socket], [], [], poll_interval)
                 if self.socket in r:
                     connection, client_address = self.socket.accept()
+                    # As with server connections, writes are buffered and flushed whole
+                    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                     t = basethread.BaseThread(
                         "TCPConnectionHandler (%s: %s:%s -> %s:%s)" % (
                             self.__class__.__name__,
@@ -2,6 +2,7 @@
 # then add options to disable certain methods
 # https://bugs.launchpad.net/pyopenssl/+bug/1020632/comments/3
 import binascii
+import collections
 import io
 import os
 import struct
@@ -224,61 +225,91 @@ def _create_ssl_context(
     return context
 
 
+def _verify_server_cert(
+        conn: SSL.Connection,
+        x509: SSL.X509,
+        errno: int,
+        depth: int,
+        is_cert_verified: bool
+) -> bool:
+    # The server name and address are kept with the connection,
+    # so that a context can be shared by connections to any server.
+    sni, address = conn.get_app_data() or (None, None)
+
+    if is_cert_verified and depth == 0 and not sni:
+        conn.cert_error = exceptions.InvalidCertificateException(
+            f"Certificate verification error for {address}: Cannot validate hostname, SNI missing."
+        )
+        is_cert_verified = False
+    elif is_cert_verified:
+        pass
+    else:
+        conn.cert_error = exceptions.InvalidCertificateException(
+            "Certificate verification error for {}: {} (errno: {}, depth: {})".format(
+                sni,
+                SSL._ffi.string(SSL._lib.X509_verify_cert_error_string(errno)).decode(),
+                errno,
+                depth
+            )
+        )
+
+    # SSL_VERIFY_NONE: The handshake will be continued regardless of the verification result.
+    return is_cert_verified
+
+
 def create_client_context(
         cert: str = None,
-        sni: str = None,
-        address: str = None,
         verify: int = SSL.VERIFY_NONE,
         **sslctx_kwargs
 ) -> SSL.Context:
     """
+    Creates an SSL Context for connections to servers. The context is not specific to
+    a server: connections are made with it by create_client_connection.
+
     Args:
         cert: Path to a file containing both client cert and private key.
-        sni: Server Name Indication. Required for VERIFY_PEER
-        address: server address, used for expressive error messages only
         verify: A bit field consisting of OpenSSL.SSL.VERIFY_* values
     """
-
-    if sni is None and verify != SSL.VERIFY_NONE:
-        raise exceptions.TlsException("Cannot validate certificate hostname without SNI")
-
-    def verify_callback(
-            conn: SSL.Connection,
-            x509: SSL.X509,
-            errno: int,
-            depth: int,
-            is_cert_verified: bool
-    ) -> bool:
-        if is_cert_verified and depth == 0 and not sni:
-            conn.cert_error = exceptions.InvalidCertificateException(
-                f"Certificate verification error for {address}: Cannot validate hostname, SNI missing."
-            )
-            is_cert_verified = False
-        elif is_cert_verified:
-            pass
-        else:
-            conn.cert_error = exceptions.InvalidCertificateException(
-                "Certificate verification error for {}: {} (errno: {}, depth: {})".format(
-                    sni,
-                    SSL._ffi.string(SSL._lib.X509_verify_cert_error_string(errno)).decode(),
-                    errno,
-                    depth
-                )
-            )
-
-        # SSL_VERIFY_NONE: The handshake will be continued regardless of the verification result.
-        return is_cert_verified
-
     context = _create_ssl_context(
         verify=verify,
-        verify_callback=verify_callback,
+        verify_callback=_verify_server_cert,
         **sslctx_kwargs,
     )
 
+    # Client Certs
+    if cert:
+        try:
+            context.use_privatekey_file(cert)
+            context.use_certificate_chain_file(cert)
+        except SSL.Error as v:
+            raise exceptions.TlsException("SSL client certificate error: %s" % str(v))
+    return context
+
+
+def create_client_connection(
+        context: SSL.Context,
+        sock,
+        sni: str = None,
+        address: str = None,
+) -> SSL.Connection:
+    """
+    Args:
+        context: A context created by create_client_context
+        sock: The socket connected to the server
+        sni: Server Name Indication. Required for VERIFY_PEER
+        address: server address, used for expressive error messages only
+    """
+
+    if sni is None and context.get_verify_mode() != SSL.VERIFY_NONE:
+        raise exceptions.TlsException("Cannot validate certificate hostname without SNI")
+
+    conn = SSL.Connection(context, sock)
+    conn.set_app_data((sni, address))
+
     if sni:
-        # Manually enable hostname verification on the context object.
+        # Manually enable hostname verification on the connection object.
         # https://wiki.openssl.org/index.php/Hostname_validation
-        param = SSL._lib.SSL_CTX_get0_param(context._context)
+        param = SSL._lib.SSL_get0_param(conn._ssl)
         # Matching on the CN is disabled in both Chrome and Firefox, so we disable it, too.
         # https://www.chromestatus.com/feature/4981025180483584
         SSL._lib.X509_VERIFY_PARAM_set_hostflags(
@@ -288,15 +319,10 @@ def create_client_context(
         SSL._openssl_assert(
             SSL._lib.X509_VERIFY_PARAM_set1_host(param, sni.encode("idna"), 0) == 1
         )
+        conn.set_tlsext_host_name(sni.encode("idna"))
 
-    # Client Certs
-    if cert:
-        try:
-            context.use_privatekey_file(cert)
-            context.use_certificate_chain_file(cert)
-        except SSL.Error as v:
-            raise exceptions.TlsException("SSL client certificate error: %s" % str(v))
-    return context
+    conn.set_connect_state()
+    return conn
 
 
 def accept_all(
@@ -371,6 +397,161 @@ def create_server_context(
     return context
 
 
+def _select_alpn_with_app_data(conn: SSL.Connection, options):
+    # Lets connections that share a context each select the protocol with their own callback,
+    # which is kept with the connection.
+    return conn.get_app_data()(conn, options)
+
+
+class ContextCache:
+    """
+    Caches SSL contexts by the arguments they are created with, so that each is created
+    once rather than for every connection. Creating a context that verifies servers means
+    loading the trusted CA certificates, which takes far longer than the handshake itself.
+
+    The TLS sessions negotiated with servers are cached too, so that later connections
+    to a server can resume a session rather than make a full handshake.
+
+    Instances are threadsafe.
+    """
+
+    def __init__(self, max_contexts: int = 64, max_sessions: int = 1024) -> None:
+        self.max_contexts = max_contexts
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._contexts: typing.Dict[tuple, SSL.Context] = collections.OrderedDict()
+        self._sessions: typing.Dict[tuple, SSL.Session] = collections.OrderedDict()
+        self._context_hits = 0
+        self._context_misses = 0
+        self._session_hits = 0
+        self._session_misses = 0
+
+    def client_context(self, **kwargs) -> typing.Tuple[SSL.Context, tuple]:
+        """
+        Get a context for connections to servers. For a list of parameters,
+        see create_client_context(...)
+
+        Returns:
+            The context, and the key of the context, which is part of the key
+            of the sessions negotiated with it.
+        """
+        key = ("client",) + _hashable_kwargs(kwargs)
+        return self._get_context(key, lambda: create_client_context(**kwargs)), key
+
+    def server_context(
+            self,
+            cert: typing.Union[certs.Cert, str],
+            key: SSL.PKey,
+            extra_chain_certs: typing.Iterable[certs.Cert] = None,
+            alpn_select_callback=None,
+            **kwargs
+    ) -> SSL.Context:
+        """
+        Get a context for connections from clients. For a list of parameters,
+        see create_server_context(...)
+
+        An alpn_select_callback is not part of the context, as it is usually specific
+        to a connection. It has to be set as the app data of each connection instead.
+        """
+        context_key = ("server",) + _hashable_kwargs(dict(
+            kwargs,
+            cert=cert.digest("sha256") if isinstance(cert, certs.Cert) else cert,
+            key=key,
+            extra_chain_certs=tuple(c.digest("sha256") for c in extra_chain_certs or ()),
+            alpn_select_callback=alpn_select_callback is not None,
+        ))
+
+        def create():
+            return create_server_context(
+                cert,
+                key,
+                extra_chain_certs=extra_chain_certs,
+                alpn_select_callback=_select_alpn_with_app_data if alpn_select_callback else None,
+                **kwargs
+            )
+
+        return self._get_context(context_key, create)
+
+    def get_session(self, key: tuple) -> typing.Optional[SSL.Session]:
+        """
+        Get the session last negotiated with a server.
+
+        Args:
+            key: The key of the context, and the address and SNI of the server.
+        """
+        with self._lock:
+            session = self._sessions.get(key)
+
+            if session is None:
+                self._session_misses += 1
+            else:
+                self._session_hits += 1
+                self._sessions.move_to_end(key)
+
+            return session
+
+    def put_session(self, key: tuple, session: SSL.Session) -> None:
+        with self._lock:
+            self._sessions[key] = session
+            self._sessions.move_to_end(key)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._contexts.clear()
+            self._sessions.clear()
+
+    def stats(self) -> dict:
+        """
+        Report how often contexts and sessions were reused.
+
+        Returns:
+            A dictionary with the keys 'contexts', 'context_hits', 'context_misses',
+            'sessions', 'session_hits' and 'session_misses'. A session hit is a session
+            offered to a server for resumption, which the server may still decline.
+        """
+        with self._lock:
+            return {
+                'contexts': len(self._contexts),
+                'context_hits': self._context_hits,
+                'context_misses': self._context_misses,
+                'sessions': len(self._sessions),
+                'session_hits': self._session_hits,
+                'session_misses': self._session_misses,
+            }
+
+    def _get_context(self, key: tuple, create: typing.Callable[[], SSL.Context]) -> SSL.Context:
+        with self._lock:
+            context = self._contexts.get(key)
+
+            if context is not None:
+                self._context_hits += 1
+                self._contexts.move_to_end(key)
+                return context
+
+            self._context_misses += 1
+
+        # Created outside the lock, as creating a context can take a while. Should two
+        # threads create the same context at once, the last one created is kept.
+        context = create()
+
+        with self._lock:
+            self._contexts[key] = context
+
+            while len(self._contexts) > self.max_contexts:
+                self._contexts.popitem(last=False)
+
+        return context
+
+
+def _hashable_kwargs(kwargs: dict) -> tuple:
+    return tuple(sorted(
+        (k, tuple(v) if isinstance(v, list) else v) for k, v in kwargs.items()
+    ))
+
+
 def is_tls_record_magic(d):
     """
     Returns:
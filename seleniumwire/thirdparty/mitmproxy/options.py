@@ -2,7 +2,7 @@ import os
 import tempfile
 from typing import Optional, Sequence
 
-from seleniumwire.thirdparty.mitmproxy import optmanager
+from seleniumwire.thirdparty.mitmproxy import certs, optmanager
 from seleniumwire.thirdparty.mitmproxy.net import tls
 
 CONF_DIR = os.path.join(tempfile.gettempdir(), '.seleniumwire')
@@ -192,6 +192,25 @@ class Options(optmanager.OptManager):
             TLS key size for certificates and CA.
             """
         )
+        self.add_option(
+            "key_type", str, "rsa",
+            """
+            TLS key type for certificates, and for a CA that is created.
+            ecdsa keys make handshakes with clients much cheaper.
+            """,
+            choices=list(certs.KEY_TYPES),
+        )
+        self.add_option(
+            "cert_store_size", int, 100,
+            "Number of generated certificates kept in memory."
+        )
+        self.add_option(
+            "cert_store_persist", bool, True,
+            """
+            Save generated certificates in the confdir, so that they are
+            loaded by later sessions rather than generated again.
+            """
+        )
         self.add_option(
             "relax_http_form_validation", bool, False,
             """
@@ -205,5 +224,20 @@ class Options(optmanager.OptManager):
             False to log at error level with full tracebacks.
             """
         )
+        self.add_option(
+            "connection_pool", bool, False,
+            """
+            Keep idle server connections open so that they can be reused
+            by other client connections. Regular mode only.
+            """
+        )
+        self.add_option(
+            "connection_pool_idle_timeout", int, 30,
+            "Seconds an idle server connection is kept open in the pool."
+        )
+        self.add_option(
+            "connection_pool_max_per_host", int, 6,
+            "Maximum number of idle server connections kept open to each host."
+        )
 
         self.update(**kwargs)
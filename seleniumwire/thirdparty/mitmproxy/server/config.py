@@ -7,6 +7,13 @@ from OpenSSL import crypto
 from seleniumwire.thirdparty.mitmproxy import certs, exceptions
 from seleniumwire.thirdparty.mitmproxy import options as moptions
 from seleniumwire.thirdparty.mitmproxy.net import server_spec
+from seleniumwire.thirdparty.mitmproxy.net import tls
+from seleniumwire.thirdparty.mitmproxy.server import pool
+
+# The options the certstore is created from
+CERTSTORE_OPTIONS = {
+    "confdir", "key_size", "key_type", "cert_passphrase", "certs", "cert_store_size", "cert_store_persist"
+}
 
 
 class HostMatcher:
@@ -37,6 +44,8 @@ class ProxyConfig:
         self.check_filter: typing.Optional[HostMatcher] = None
         self.check_tcp: typing.Optional[HostMatcher] = None
         self.upstream_server: typing.Optional[server_spec.ServerSpec] = None
+        self.connection_pool: typing.Optional[pool.ConnectionPool] = None
+        self.context_cache = tls.ContextCache()
         self.configure(options, set(options.keys()))
         options.changed.connect(self.configure)
 
@@ -54,6 +63,26 @@ class ProxyConfig:
         if "tcp_hosts" in updated:
             self.check_tcp = HostMatcher("tcp", options.tcp_hosts)
 
+        # Recreating the certstore would lose the certs it has generated
+        if CERTSTORE_OPTIONS & set(updated):
+            self.configure_certstore(options)
+
+        m = options.mode
+        if m.startswith("upstream:") or m.startswith("reverse:"):
+            _, spec = server_spec.parse_with_mode(options.mode)
+            self.upstream_server = spec
+
+        # Connections are only pooled when they go directly to the server
+        if options.connection_pool and m == "regular":
+            if self.connection_pool is None:
+                self.connection_pool = pool.ConnectionPool()
+            self.connection_pool.idle_timeout = options.connection_pool_idle_timeout
+            self.connection_pool.max_per_host = options.connection_pool_max_per_host
+        elif self.connection_pool is not None:
+            self.connection_pool.close()
+            self.connection_pool = None
+
+    def configure_certstore(self, options: moptions.Options) -> None:
         certstore_path = os.path.expanduser(options.confdir)
         if not os.path.exists(os.path.dirname(certstore_path)):
             raise exceptions.OptionsError(
@@ -66,8 +95,13 @@ class ProxyConfig:
             certstore_path,
             moptions.CONF_BASENAME,
             key_size,
-            passphrase
+            passphrase,
+            store_cap=options.cert_store_size,
+            persist=options.cert_store_persist,
+            key_type=options.key_type,
         )
+        # Cached contexts hold the certificates of the certstore being replaced
+        self.context_cache.clear()
 
         for c in options.certs:
             parts = c.split("=", 1)
@@ -85,7 +119,3 @@ class ProxyConfig:
                 raise exceptions.OptionsError(
                     "Invalid certificate format: %s" % cert
                 )
-        m = options.mode
-        if m.startswith("upstream:") or m.startswith("reverse:"):
-            _, spec = server_spec.parse_with_mode(options.mode)
-            self.upstream_server = spec
@@ -0,0 +1,169 @@
+import threading
+import time
+import typing
+
+from seleniumwire.thirdparty.mitmproxy import connections
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+
+PoolKey = typing.Tuple[str, int, bool, typing.Optional[str], typing.Optional[tuple]]
+
+
+class ConnectionPool:
+    """
+    Keeps idle server connections open so that they can be reused by any client connection,
+    saving a TCP and TLS handshake with the server each time.
+
+    Connections are pooled by host, port, whether TLS is established, the SNI it was
+    established with, and the upstream proxy they go through. Connections are closed
+    once they have been idle for longer than the idle timeout, and no more than
+    max_per_host idle connections are kept for each.
+
+    Instances are threadsafe.
+    """
+
+    def __init__(self, idle_timeout: float = 30, max_per_host: int = 6) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        # Idle connections and the time they were released, most recently released last.
+        self._idle: typing.Dict[PoolKey, typing.List[typing.Tuple[connections.ServerConnection, float]]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+
+    @staticmethod
+    def key(address, tls: bool, sni: typing.Optional[str], via=None) -> PoolKey:
+        return address[0], address[1], tls, sni if tls else None, via
+
+    def checkout(self, key: PoolKey) -> typing.Optional[connections.ServerConnection]:
+        """
+        Take an idle connection from the pool.
+
+        Returns:
+            The connection, or None if there is no idle connection that is still open.
+        """
+        now = time.monotonic()
+        conn = None
+        closed = []
+
+        with self._lock:
+            idle = self._idle.get(key, [])
+
+            while idle:
+                c, released = idle.pop()
+
+                if now - released > self.idle_timeout or not _is_idle(c):
+                    closed.append(c)
+                else:
+                    conn = c
+                    break
+
+            if not idle:
+                self._idle.pop(key, None)
+
+            if conn is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+
+            self._evicted += len(closed)
+
+        for c in closed:
+            _close(c)
+
+        return conn
+
+    def release(self, conn: connections.ServerConnection) -> bool:
+        """
+        Return a connection to the pool if it is idle and there is room for it.
+
+        Returns:
+            True if the connection was pooled, or False if it should be closed.
+        """
+        if not conn.reusable or type(conn) is not connections.ServerConnection or not conn.connected():
+            return False
+
+        via = conn.via.address if conn.via else None
+        key = self.key(conn.address, conn.tls_established, conn.sni, via)
+        now = time.monotonic()
+        pooled = False
+
+        with self._lock:
+            expired = self._expire(now)
+            idle = self._idle.setdefault(key, [])
+
+            if len(idle) < self.max_per_host:
+                idle.append((conn, now))
+                pooled = True
+
+        for c in expired:
+            _close(c)
+
+        return pooled
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            conns = [c for idle in self._idle.values() for c, _ in idle]
+            self._idle.clear()
+
+        for c in conns:
+            _close(c)
+
+    def stats(self) -> dict:
+        """
+        Report how often server connections were reused.
+
+        Returns:
+            A dictionary with the keys 'hits', 'misses', 'hit_rate', 'idle' and 'evicted'.
+        """
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / total if total else 0.0,
+                'idle': sum(len(idle) for idle in self._idle.values()),
+                'evicted': self._evicted,
+            }
+
+    def _expire(self, now: float) -> typing.List[connections.ServerConnection]:
+        expired = []
+
+        for key in list(self._idle):
+            idle = self._idle[key]
+            keep = [(c, t) for c, t in idle if now - t <= self.idle_timeout]
+
+            if len(keep) < len(idle):
+                expired.extend(c for c, t in idle if now - t > self.idle_timeout)
+
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+
+        self._evicted += len(expired)
+
+        return expired
+
+
+def _is_idle(conn: connections.ServerConnection) -> bool:
+    """
+    Whether a pooled connection is still open with nothing to read. A server that has
+    closed the connection makes it readable, as would any unexpected data.
+    """
+    if not conn.connected():
+        return False
+
+    try:
+        return not tcp.ssl_read_select([conn.connection], 0)
+    except (OSError, ValueError):
+        return False
+
+
+def _close(conn: connections.ServerConnection) -> None:
+    try:
+        conn.finish()
+    except Exception:
+        pass
+    conn.close()
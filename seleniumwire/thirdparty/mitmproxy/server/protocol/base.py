@@ -149,16 +149,49 @@ class ServerConnectionMixin:
     def disconnect(self):
         """
         Deletes (and closes) an existing server connection.
+        An idle connection is handed to the connection pool instead of being closed, if there is one.
         Must not be called if there is no existing connection.
         """
-        self.log("serverdisconnect", "debug", [repr(self.server_conn.address)])
         address = self.server_conn.address
-        self.server_conn.finish()
-        self.server_conn.close()
-        self.channel.tell("serverdisconnect", self.server_conn)
+        pool = self.config.connection_pool
+
+        if pool is not None and pool.release(self.server_conn):
+            self.log("serverdisconnect (pooled)", "debug", [repr(address)])
+        else:
+            self.log("serverdisconnect", "debug", [repr(address)])
+            self.server_conn.finish()
+            self.server_conn.close()
+            self.channel.tell("serverdisconnect", self.server_conn)
 
         self.server_conn = self.__make_server_conn(address)
 
+    def reuse_server_connection(self, tls, sni):
+        """
+        Takes an idle connection to the server address from the connection pool, in place of
+        establishing a new one. Must not be called if there is an existing connection.
+
+        Args:
+            tls: Whether the connection must have TLS established.
+            sni: The Server Name Indication TLS must have been established with.
+
+        Returns:
+            True if a pooled connection is now the server connection.
+        """
+        pool = self.config.connection_pool
+
+        if pool is None or type(self.server_conn) is not connections.ServerConnection or not self.server_conn.address:
+            return False
+
+        conn = pool.checkout(pool.key(self.server_conn.address, tls, sni))
+
+        if conn is None:
+            return False
+
+        self.log("serverconnect (pooled)", "debug", [repr(conn.address)])
+        self.server_conn = conn
+
+        return True
+
     def connect(self):
         """
         Establishes a server connection.
@@ -9,6 +9,7 @@ import h2.exceptions
 from seleniumwire.thirdparty.mitmproxy import connections  # noqa
 from seleniumwire.thirdparty.mitmproxy import exceptions, flow, http
 from seleniumwire.thirdparty.mitmproxy.net import websockets
+from seleniumwire.thirdparty.mitmproxy.net.http import http1
 from seleniumwire.thirdparty.mitmproxy.server.protocol import base
 from seleniumwire.thirdparty.mitmproxy.server.protocol.websocket import WebSocketLayer
 from seleniumwire.thirdparty.mitmproxy.utils import strutils
@@ -362,7 +363,9 @@ class HttpLayer(base.Layer):
                 # allow inline scripts to manipulate the client handshake
                 self.channel.ask("websocket_handshake", f)
 
-            if not f.response:
+            from_server = not f.response
+
+            if from_server:
                 self.establish_server_connection(
                     f.request.host,
                     f.request.port,
@@ -370,6 +373,8 @@ class HttpLayer(base.Layer):
                 )
 
                 def get_response():
+                    # The connection is busy until the exchange completes
+                    self.server_conn.reusable = False
                     self.send_request_headers(f.request)
 
                     if f.request.stream:
@@ -463,6 +468,10 @@ class HttpLayer(base.Layer):
                 self.send_response_body(f.response, chunks)
                 f.response.timestamp_end = time.time()
 
+            if from_server:
+                # The server connection is idle again and may be handed on to another client connection
+                self.server_conn.reusable = self._server_conn_reusable(f)
+
             if self.check_close_connection(f):
                 return False
 
@@ -529,8 +538,8 @@ class HttpLayer(base.Layer):
             if address != self.server_conn.address or tls != self.server_tls:
                 self.set_server(address)
                 self.set_server_tls(tls, address[0])
-            # Establish connection is necessary.
-            if not self.server_conn.connected():
+            # Establish connection is necessary, unless there is an idle one in the pool.
+            if not self.server_conn.connected() and not self.reuse_server_connection(tls, self.server_sni):
                 self.connect()
         else:
             if not self.server_conn.connected():
@@ -538,6 +547,20 @@ class HttpLayer(base.Layer):
             if tls:
                 raise exceptions.HttpProtocolException("Cannot change scheme in upstream mitmproxy mode.")
 
+    def _server_conn_reusable(self, f):
+        """Whether the server connection can be used for another exchange once this one has completed."""
+        if self.config.connection_pool is None or f.request.is_http2 or f.response.status_code == 101:
+            return False
+
+        if self.server_conn.get_alpn_proto_negotiated() == b"h2":
+            return False
+
+        return not (
+            http1.connection_close(f.request.http_version, f.request.headers) or
+            http1.connection_close(f.response.http_version, f.response.headers) or
+            http1.expected_http_body_size(f.request, f.response) == -1
+        )
+
     def should_bypass_upstream_proxy(self, request):
         """Whether we should bypass any upstream proxy.
 
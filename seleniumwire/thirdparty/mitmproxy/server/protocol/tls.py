@@ -354,8 +354,9 @@ class TlsLayer(base.Layer):
 
     def _establish_tls_with_client_and_server(self):
         try:
-            self.ctx.connect()
-            self._establish_tls_with_server()
+            if self.server_conn.connected() or not self.reuse_server_connection(True, self.server_sni):
+                self.ctx.connect()
+                self._establish_tls_with_server()
         except Exception:
             # If establishing TLS with the server fails, we try to establish TLS with the client nonetheless
             # to send an error message over TLS.
@@ -387,6 +388,7 @@ class TlsLayer(base.Layer):
                 chain_file=chain_file,
                 alpn_select_callback=self.__alpn_select_callback,
                 extra_chain_certs=extra_certs,
+                context_cache=self.config.context_cache,
             )
             # Some TLS clients will not fail the handshake,
             # but will immediately throw an "unexpected eof" error on the first read.
@@ -445,6 +447,7 @@ class TlsLayer(base.Layer):
             self.server_conn.establish_tls(
                 sni=self.server_sni,
                 alpn_protos=alpn,
+                context_cache=self.config.context_cache,
                 **args
             )
             tls_cert_err = self.server_conn.ssl_verification_error
@@ -1,4 +1,5 @@
 import collections.abc
+import inspect
 import logging
 import os
 import pkgutil
@@ -167,6 +168,13 @@ def is_list_alike(container):
     return isinstance(container, collections.abc.Sequence) and not isinstance(container, str)
 
 
+def is_coroutine_callable(func):
+    """Whether calling func returns a coroutine, as with an async def function or
+    an object with an async def __call__ method.
+    """
+    return inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, '__call__', None))
+
+
 def urlsafe_address(address):
     """Make an address safe to use in a URL.
 
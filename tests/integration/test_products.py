@@ -94,4 +94,19 @@ class TestProducts:
             price = price.split('\n')[0]
             prices.append(float(price))
 
-        assert all(price == 100.00 for price in prices)
\ No newline at end of file
+        assert all(price == 100.00 for price in prices)
+
+    @sleep_for(2.0)
+    def test_typed_table(self, app_handler: OpenCart):
+        """
+        Verify that bulk table extraction matches the per-element path and parses prices.
+
+        Args:
+            app_handler (OpenCart): The OpenCart application handler.
+        """
+        app_handler.filter_products('MacBook')
+        items = app_handler.get_table()
+        typed_items = app_handler.get_table(typed=True)
+
+        assert items == app_handler.get_table(bulk=False), "Bulk extraction does not match per-element extraction."
+        assert all(isinstance(item['Price'], float) for item in typed_items), "Prices were not parsed as floats."
@@ -0,0 +1,139 @@
+import os
+import time
+
+import pytest
+
+from seleniumwire import storage
+from seleniumwire.cache import ResponseCache
+from seleniumwire.thirdparty.mitmproxy.connections import ClientConnection, ServerConnection
+from seleniumwire.thirdparty.mitmproxy.http import HTTPFlow, HTTPRequest, HTTPResponse
+
+URL = 'https://example.com/app.js'
+
+
+def make_flow(url: str = URL, method: str = 'GET', headers=()) -> HTTPFlow:
+    """
+    Create a flow for a request to the URL, without a response.
+    """
+    flow = HTTPFlow(ClientConnection.make_dummy(('127.0.0.1', 0)), ServerConnection.make_dummy(('127.0.0.1', 0)))
+    flow.request = HTTPRequest.make(method, url, headers=[(k.encode(), v.encode()) for k, v in headers])
+
+    return flow
+
+
+def fetch(cache: ResponseCache, status: int = 200, body: bytes = b'body', headers=(), request_headers=()) -> HTTPFlow:
+    """
+    Pass a request through the cache, with the response the server would give if it is sent upstream.
+    """
+    flow = make_flow(headers=request_headers)
+    cache.apply_request(flow)
+
+    if flow.response is None:
+        flow.response = HTTPResponse.make(status, body, [(k.encode(), v.encode()) for k, v in headers])
+        cache.apply_response(flow)
+
+    return flow
+
+
+@pytest.mark.unit
+class TestResponseCache:
+    """
+    Test case group for the cache of responses to GET requests.
+    """
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return ResponseCache(str(tmp_path / 'cache'))
+
+    def test_fresh_response_served(self, cache):
+        """
+        Verify that a fresh response is served from the cache without contacting the server.
+        """
+        fetch(cache, headers=[('Cache-Control', 'max-age=60')])
+        flow = fetch(cache, body=b'changed')
+
+        assert flow.metadata.get('seleniumwire_cache_hit')
+        assert flow.response.content == b'body'
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['bytes_saved'] == 4
+
+    def test_no_store(self, cache):
+        """
+        Verify that a response marked no-store is not stored.
+        """
+        fetch(cache, headers=[('Cache-Control', 'no-store, max-age=60')])
+        flow = fetch(cache, body=b'fetched')
+
+        assert flow.response.content == b'fetched'
+        assert cache.stats()['entries'] == 0
+
+    def test_revalidated(self, cache):
+        """
+        Verify that a stale response is revalidated with its ETag and served again on 304 Not Modified.
+        """
+        fetch(cache, headers=[('Cache-Control', 'max-age=0'), ('ETag', '"v1"')])
+        flow = make_flow()
+        cache.apply_request(flow)
+
+        assert flow.response is None
+        assert flow.request.headers['If-None-Match'] == '"v1"'
+
+        flow.response = HTTPResponse.make(304, b'', [])
+        cache.apply_response(flow)
+
+        assert flow.response.status_code == 200
+        assert flow.response.content == b'body'
+        assert cache.stats()['revalidated'] == 1
+
+    def test_vary(self, cache):
+        """
+        Verify that a response is only served for requests with the headers it varies by.
+        """
+        fetch(
+            cache,
+            headers=[('Cache-Control', 'max-age=60'), ('Vary', 'Accept-Language')],
+            request_headers=[('Accept-Language', 'en')],
+        )
+
+        assert fetch(cache, request_headers=[('Accept-Language', 'en')]).metadata.get('seleniumwire_cache_hit')
+        assert not fetch(cache, request_headers=[('Accept-Language', 'fr')]).metadata.get('seleniumwire_cache_hit')
+
+    def test_unsafe_method_invalidates(self, cache):
+        """
+        Verify that a successful POST to a URL removes the response stored for it.
+        """
+        fetch(cache, headers=[('Cache-Control', 'max-age=60')])
+        flow = make_flow(method='POST')
+        flow.response = HTTPResponse.make(200, b'', [])
+        cache.apply_response(flow)
+
+        assert cache.stats()['entries'] == 0
+
+    def test_persists(self, cache):
+        """
+        Verify that a later session sharing the cache directory starts with the responses already stored.
+        """
+        fetch(cache, headers=[('Cache-Control', 'max-age=60')])
+        later = ResponseCache(cache.cache_dir)
+
+        assert fetch(later, body=b'changed').response.content == b'body'
+
+    def test_survives_storage_sweep(self, tmp_path):
+        """
+        Verify that a new storage sweeping old storage directories leaves the cache alone.
+        """
+        home_dir = tmp_path / '.seleniumwire'
+        cache = ResponseCache(str(home_dir / 'cache'))
+        fetch(cache, headers=[('Cache-Control', 'max-age=60')])
+        old_storage_dir = home_dir / 'storage-old'
+        old_storage_dir.mkdir()
+
+        old = time.time() - 2 * 24 * 60 * 60
+        for path in (home_dir / 'cache', old_storage_dir):
+            os.utime(path, (old, old))
+
+        store = storage.create(base_dir=str(tmp_path))
+        store.cleanup()
+
+        assert not old_storage_dir.exists()
+        assert fetch(ResponseCache(cache.cache_dir), body=b'changed').response.content == b'body'
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import pytest
+
+from seleniumwire.thirdparty.mitmproxy import certs
+from seleniumwire.thirdparty.mitmproxy.certs import CertStore
+from seleniumwire.thirdparty.mitmproxy.server.protocol.tls import TlsLayer
+
+
+def find_cert(store: CertStore, host: str, sni: bytes = None):
+    """
+    Find the cert for a connection to the host as the TLS layer does when the upstream cert is not used.
+    """
+    layer = SimpleNamespace(
+        server_conn=SimpleNamespace(address=(host, 443), tls_established=False),
+        config=SimpleNamespace(certstore=store, options=SimpleNamespace(upstream_cert=False)),
+        _client_hello=SimpleNamespace(sni=sni),
+        _custom_server_sni=None,
+    )
+
+    return TlsLayer._find_cert(layer)
+
+
+@pytest.mark.unit
+class TestCertStore:
+    """
+    Test case group for the store of certificates generated for the hosts the proxy connects to.
+    """
+
+    @pytest.fixture
+    def generated(self, monkeypatch):
+        # The names of each cert generated, which stand in for the certs themselves
+        generated = []
+
+        def dummy_cert(privkey, cacert, commonname, sans, organization, key=None):
+            generated.append((commonname, sans))
+            return SimpleNamespace(cn=commonname, altnames=sans)
+
+        monkeypatch.setattr(certs, 'dummy_cert', dummy_cert)
+
+        return generated
+
+    @pytest.mark.parametrize('sni', [None, b'example.com'])
+    def test_prewarmed_hosts_found(self, generated, sni):
+        """
+        Verify that the certs prewarmed for hosts are the ones later found for connections to them.
+        """
+        store = CertStore(None, None, None, None)
+        store.prewarm(['example.com', 'bücher.test']).join()
+        prewarmed = list(generated)
+
+        assert find_cert(store, 'example.com', sni)[0].cn == b'example.com'
+        assert find_cert(store, 'bücher.test')[0].cn == 'bücher.test'.encode('idna')
+        assert generated == prewarmed
@@ -0,0 +1,322 @@
+import asyncio
+import gzip
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from seleniumwire import storage
+from seleniumwire.handler import InterceptRequestHandler, StreamCapture
+from seleniumwire.modifier import RequestModifier
+from seleniumwire.rules import RuleEngine
+from seleniumwire.scope import ScopeMatcher
+from seleniumwire.thirdparty.mitmproxy import controller
+from seleniumwire.thirdparty.mitmproxy.connections import ClientConnection, ServerConnection
+from seleniumwire.thirdparty.mitmproxy.http import HTTPFlow, HTTPRequest, HTTPResponse
+
+
+def make_proxy(**attrs) -> SimpleNamespace:
+    """
+    Create a stand-in proxy with the attributes the capture add-on reads, capturing every request in memory.
+    """
+    proxy = SimpleNamespace(
+        options={},
+        storage=storage.create(request_storage='memory'),
+        modifier=RequestModifier(),
+        rules=RuleEngine(),
+        scope_matcher=ScopeMatcher(),
+        request_interceptor=None,
+        response_interceptor=None,
+        interceptor_executor=None,
+    )
+    vars(proxy).update(attrs)
+
+    return proxy
+
+
+def make_flow(url: str = 'https://example.com/', body: bytes = None) -> HTTPFlow:
+    """
+    Create a flow for a request to the URL, with a response if a body is supplied.
+    """
+    flow = HTTPFlow(ClientConnection.make_dummy(('127.0.0.1', 0)), ServerConnection.make_dummy(('127.0.0.1', 0)))
+    flow.request = HTTPRequest.make('GET', url)
+
+    if body is not None:
+        flow.response = HTTPResponse.make(200, body, [(b'Content-Type', b'text/plain')])
+
+    return flow
+
+
+def handle(hook, flow: HTTPFlow, timeout: float = 5) -> None:
+    """
+    Call a hook of the add-on for the flow, and wait for the flow to be resumed as the connection thread does.
+    """
+    start(hook, flow)
+
+    assert flow.reply.q.get(timeout=timeout) is flow
+
+
+def start(hook, flow: HTTPFlow) -> None:
+    """
+    Call a hook of the add-on for the flow, replying at once unless the add-on holds the flow.
+    """
+    flow.reply = controller.Reply(flow)
+    hook(flow)
+
+    if flow.reply.state == 'start':
+        flow.reply.take()
+        flow.reply.ack()
+        flow.reply.commit()
+
+
+@pytest.mark.unit
+class TestInterceptorWorkers:
+    """
+    Test case group for running interceptors on a thread pool.
+    """
+
+    @pytest.fixture
+    def proxy(self):
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='Selenium Wire Interceptor')
+        proxy = make_proxy(interceptor_executor=executor)
+        yield proxy
+        executor.shutdown(wait=False)
+        proxy.storage.cleanup()
+
+    def test_resumed_once_handled(self, proxy):
+        """
+        Verify that a flow is held while its interceptors run on the pool, and resumed once it is captured.
+        """
+        threads = []
+
+        def interceptor(request, response=None):
+            threads.append(threading.current_thread().name)
+            (response or request).headers['X-Intercepted'] = '1'
+
+        proxy.request_interceptor = proxy.response_interceptor = interceptor
+        handler = InterceptRequestHandler(proxy)
+        flow = make_flow()
+
+        handle(handler.request, flow)
+        flow.response = HTTPResponse.make(200, b'body', [])
+        handle(handler.response, flow)
+        request = proxy.storage.load_requests()[0]
+
+        assert all(name.startswith('Selenium Wire Interceptor') for name in threads) and len(threads) == 2
+        assert flow.request.headers['X-Intercepted'] == flow.response.headers['X-Intercepted'] == '1'
+        assert request.headers['X-Intercepted'] == request.response.headers['X-Intercepted'] == '1'
+
+    def test_flows_in_parallel(self, proxy):
+        """
+        Verify that the interceptors for different flows run at the same time.
+        """
+        barrier = threading.Barrier(2, timeout=5)
+        proxy.request_interceptor = lambda request: barrier.wait()
+        handler = InterceptRequestHandler(proxy)
+        flows = [make_flow('https://example.com/{}'.format(i)) for i in range(2)]
+
+        for flow in flows:
+            start(handler.request, flow)
+
+        for flow in flows:
+            assert flow.reply.q.get(timeout=5) is flow
+
+        assert not barrier.broken
+        assert len(proxy.storage.load_requests()) == 2
+
+    def test_resumed_after_error(self, proxy):
+        """
+        Verify that a flow whose interceptor raises is still resumed.
+        """
+
+        def interceptor(request):
+            raise ValueError('interceptor failed')
+
+        proxy.request_interceptor = interceptor
+        flow = make_flow()
+
+        handle(InterceptRequestHandler(proxy).request, flow)
+
+        assert not flow.intercepted
+
+
+@pytest.mark.unit
+class TestAsyncInterceptors:
+    """
+    Test case group for awaiting async interceptors on the proxy event loop.
+    """
+
+    @pytest.fixture
+    def proxy(self):
+        proxy = make_proxy()
+        yield proxy
+        proxy.storage.cleanup()
+
+    def run(self, hook, flows) -> None:
+        """
+        Call a hook for each flow on an event loop, checking it was held, and run the loop until all are resumed.
+        """
+
+        async def main():
+            for flow in flows:
+                start(hook, flow)
+                assert flow.intercepted
+
+            for flow in flows:
+                assert await asyncio.get_running_loop().run_in_executor(None, flow.reply.q.get, True, 5) is flow
+
+        asyncio.run(main())
+
+    def test_flows_interleaved(self, proxy):
+        """
+        Verify that the interceptors for different flows are awaited together, without holding up the loop.
+        """
+        events = []
+
+        async def interceptor(request):
+            events.append('start')
+            await asyncio.sleep(0.1)
+            request.headers['X-Intercepted'] = '1'
+            events.append('end')
+
+        proxy.request_interceptor = interceptor
+        flows = [make_flow('https://example.com/{}'.format(i)) for i in range(2)]
+
+        self.run(InterceptRequestHandler(proxy).request, flows)
+
+        assert events == ['start', 'start', 'end', 'end']
+        assert all(flow.request.headers['X-Intercepted'] == '1' for flow in flows)
+        assert all(request.headers['X-Intercepted'] == '1' for request in proxy.storage.load_requests())
+
+    def test_mocked_response(self, proxy):
+        """
+        Verify that a response created by an async request interceptor is sent back and captured.
+        """
+
+        async def interceptor(request):
+            request.create_response(status_code=201, body=b'mocked')
+
+        proxy.request_interceptor = interceptor
+        flow = make_flow()
+
+        self.run(InterceptRequestHandler(proxy).request, [flow])
+
+        assert flow.response.status_code == 201
+        assert proxy.storage.load_requests()[0].response.body == b'mocked'
+
+    def test_response_interceptor(self, proxy):
+        """
+        Verify that an object with an async __call__ intercepts responses, and a flow is resumed when it raises.
+        """
+
+        class Interceptor:
+            async def __call__(self, request, response):
+                if request.url.endswith('/fail'):
+                    raise ValueError('interceptor failed')
+
+                response.headers['X-Intercepted'] = '1'
+
+        handler = InterceptRequestHandler(proxy)
+        flows = [make_flow('https://example.com/', b'body'), make_flow('https://example.com/fail', b'body')]
+
+        for flow in flows:
+            handle(handler.request, flow)
+
+        proxy.response_interceptor = Interceptor()
+        self.run(handler.response, flows)
+
+        assert flows[0].response.headers['X-Intercepted'] == '1'
+        assert not flows[1].intercepted
+
+
+@pytest.mark.unit
+class TestStreamCapture:
+    """
+    Test case group for capturing response bodies as they are streamed to the client.
+    """
+
+    @pytest.fixture
+    def proxy(self):
+        proxy = make_proxy(options={'stream_capture': True, 'enable_har': True})
+        yield proxy
+        proxy.storage.cleanup()
+
+    def stream(self, proxy, chunks, headers=()):
+        """
+        Pass a flow through the add-on with its response body streamed from the chunks, returning what the client
+        was sent.
+        """
+        handler = InterceptRequestHandler(proxy)
+        flow = make_flow()
+        # The HAR entry times the connection to the server
+        flow.server_conn.timestamp_start = flow.server_conn.timestamp_tcp_setup = time.time()
+        handle(handler.request, flow)
+
+        # The body has yet to be read when the headers arrive
+        flow.response = HTTPResponse.make(200, b'', [(b'Content-Type', b'text/plain')] + list(headers))
+        flow.response.data.content = None
+        handle(handler.responseheaders, flow)
+        handle(handler.response, flow)
+        sent = []
+
+        try:
+            for chunk in flow.response.stream(chunks):
+                sent.append(chunk)
+        except ConnectionError:
+            pass
+
+        return b''.join(sent)
+
+    def test_captured(self, proxy):
+        """
+        Verify that a streamed body is sent on as it is and captured once it has been.
+        """
+        sent = self.stream(proxy, iter([b'abc', b'def']))
+        response = proxy.storage.load_requests()[0].response
+
+        assert sent == b'abcdef'
+        assert response.body == b'abcdef' and not response.truncated
+        assert proxy.storage.load_har_entries()[0]['response']['content']['text'] == 'abcdef'
+
+    def test_truncated_at_max_size(self, proxy):
+        """
+        Verify that only up to the maximum size of a streamed body is captured, while all of it is sent on.
+        """
+        proxy.options['capture_max_body_size'] = 4
+        sent = self.stream(proxy, iter([b'abc', b'def']))
+        response = proxy.storage.load_requests()[0].response
+
+        assert sent == b'abcdef'
+        assert response.body == b'abcd' and response.truncated
+        assert proxy.storage.load_har_entries()[0]['response']['content']['text'] == 'abcd'
+
+    def test_truncated_when_interrupted(self, proxy):
+        """
+        Verify that a compressed body that stops part way is captured as far as it got, with a HAR entry.
+        """
+        body = gzip.compress(b'a' * 1000)
+
+        def chunks():
+            yield body[:10]
+            raise ConnectionError('connection reset')
+
+        sent = self.stream(proxy, chunks(), [(b'Content-Encoding', b'gzip')])
+        response = proxy.storage.load_requests()[0].response
+        content = proxy.storage.load_har_entries()[0]['response']['content']
+
+        assert sent == body[:10]
+        assert response.truncated
+        assert content['encoding'] == 'base64' and content['size'] == 10
+
+    def test_max_size(self):
+        """
+        Verify that a body is kept up to the maximum size, and the callback told it was truncated.
+        """
+        captured = []
+        capture = StreamCapture(max_size=5)
+        capture.callback = lambda body, truncated: captured.append((body, truncated))
+
+        assert list(capture(iter([b'abc', b'def', b'ghi']))) == [b'abc', b'def', b'ghi']
+        assert captured == [(b'abcde', True)]
@@ -0,0 +1,123 @@
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+from seleniumwire.thirdparty.mitmproxy.connections import ServerConnection
+from seleniumwire.thirdparty.mitmproxy.http import HTTPFlow, HTTPRequest, HTTPResponse
+from seleniumwire.thirdparty.mitmproxy.server.pool import ConnectionPool
+from seleniumwire.thirdparty.mitmproxy.server.protocol.http import HttpLayer
+
+
+def make_flow(http_version: str = 'HTTP/1.1', status_code: int = 200, headers=()) -> HTTPFlow:
+    """
+    Create a flow for a completed exchange with the server.
+    """
+    flow = HTTPFlow(None, None)
+    flow.request = HTTPRequest.make('GET', 'http://example.com/')
+    flow.request.http_version = http_version
+    flow.response = HTTPResponse.make(status_code, b'body', [(k.encode(), v.encode()) for k, v in headers])
+    flow.response.http_version = http_version
+
+    return flow
+
+
+def reusable(flow: HTTPFlow, alpn: bytes = b'http/1.1') -> bool:
+    """
+    Whether the HTTP layer would return the server connection of the flow to the pool.
+    """
+    layer = SimpleNamespace(
+        config=SimpleNamespace(connection_pool=ConnectionPool()),
+        server_conn=SimpleNamespace(get_alpn_proto_negotiated=lambda: alpn),
+    )
+
+    return HttpLayer._server_conn_reusable(layer, flow)
+
+
+@pytest.mark.unit
+class TestConnectionPool:
+    """
+    Test case group for the pool of idle server connections shared by client connections.
+    """
+
+    @pytest.fixture
+    def server(self):
+        server = socket.create_server(('127.0.0.1', 0))
+        yield server
+        server.close()
+
+    @pytest.fixture
+    def pool(self):
+        pool = ConnectionPool()
+        yield pool
+        pool.close()
+
+    def connect(self, server) -> ServerConnection:
+        """
+        Connect to the server, as the proxy does once an exchange that leaves the connection reusable has completed.
+        """
+        conn = ServerConnection(server.getsockname())
+        conn.connect()
+        conn.reusable = True
+
+        return conn
+
+    def test_reused(self, server, pool):
+        """
+        Verify that a released connection is handed out again for the same server, once.
+        """
+        conn = self.connect(server)
+        key = pool.key(conn.address, False, None)
+
+        assert pool.release(conn)
+        assert pool.checkout(pool.key(conn.address, True, 'example.com')) is None
+        assert pool.checkout(key) is conn
+        assert pool.checkout(key) is None
+        assert pool.stats()['hits'] == 1 and pool.stats()['misses'] == 2
+
+    def test_closed_by_server(self, server, pool):
+        """
+        Verify that a pooled connection the server has since closed is not handed out.
+        """
+        conn = self.connect(server)
+        pool.release(conn)
+        server.accept()[0].close()
+
+        assert pool.checkout(pool.key(conn.address, False, None)) is None
+        assert pool.stats()['evicted'] == 1
+
+    def test_not_pooled(self, server, pool):
+        """
+        Verify that connections are not pooled when they are not reusable, or once the server has its share.
+        """
+        pool.max_per_host = 1
+        conns = [self.connect(server) for _ in range(3)]
+        conns[0].reusable = False
+
+        assert not pool.release(conns[0])
+        assert pool.release(conns[1])
+        assert not pool.release(conns[2])
+
+        for conn in conns:
+            conn.close()
+
+    def test_idle_timeout(self, server, pool):
+        """
+        Verify that a connection idle for longer than the idle timeout is closed rather than handed out.
+        """
+        conn = self.connect(server)
+        pool.release(conn)
+        pool.idle_timeout = -1
+
+        assert pool.checkout(pool.key(conn.address, False, None)) is None
+        assert not conn.connected()
+
+    def test_reusable_after_exchange(self):
+        """
+        Verify that a connection is only returned to the pool after an HTTP/1 exchange that leaves it open.
+        """
+        assert reusable(make_flow())
+        assert not reusable(make_flow('HTTP/2.0'))
+        assert not reusable(make_flow(), alpn=b'h2')
+        assert not reusable(make_flow(status_code=101, headers=[('Upgrade', 'websocket')]))
+        assert not reusable(make_flow(headers=[('Connection', 'close')]))
@@ -0,0 +1,61 @@
+import pickle
+from http.client import HTTPMessage
+
+import pytest
+
+from seleniumwire.request import HTTPHeaders
+
+HEADERS = [
+    [],
+    [('Content-Type', 'Text/HTML; charset="UTF-8"'), ('X-Test', '1'), ('x-test', '2')],
+    [('Content-Type', 'application/json;charset=utf-8')],
+    [('Content-Type', 'not-a-type')],
+    [('Accept', '*/*')],
+]
+
+
+def make_message(headers) -> HTTPMessage:
+    """
+    Create the HTTPMessage that HTTPHeaders used to be, holding the same headers.
+    """
+    message = HTTPMessage()
+
+    for name, value in headers:
+        message[name] = value
+
+    return message
+
+
+@pytest.mark.unit
+class TestHTTPHeaders:
+    """
+    Test case group for the headers of captured requests and responses.
+    """
+
+    @pytest.mark.parametrize('headers', HEADERS)
+    def test_as_http_message(self, headers):
+        """
+        Verify that the headers read the same as the HTTPMessage they replaced.
+        """
+        ours, theirs = HTTPHeaders(headers), make_message(headers)
+
+        assert ours.items() == theirs.items()
+        assert ours.get_all('x-test') == theirs.get_all('x-test')
+        assert ours.get_content_type() == theirs.get_content_type()
+        assert ours.get_content_maintype() == theirs.get_content_maintype()
+        assert ours.get_content_subtype() == theirs.get_content_subtype()
+        assert ours.get_content_charset() == theirs.get_content_charset()
+        assert ours.as_string() == theirs.as_string()
+        assert str(ours) == str(theirs)
+
+    def test_legacy_pickle(self):
+        """
+        Verify that headers pickled when they were an HTTPMessage still load.
+        """
+        headers = pickle.loads(pickle.dumps(make_message(HEADERS[1])))
+        state = vars(headers)
+        loaded = HTTPHeaders.__new__(HTTPHeaders)
+        loaded.__setstate__(state)
+
+        assert loaded.items() == HEADERS[1]
+        assert loaded['x-test'] == '1'
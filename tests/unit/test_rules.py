@@ -0,0 +1,113 @@
+import json
+import os
+
+import pytest
+
+from seleniumwire import rules as rules_module
+from seleniumwire.rules import RuleEngine
+from seleniumwire.thirdparty.mitmproxy.connections import ClientConnection, ServerConnection
+from seleniumwire.thirdparty.mitmproxy.http import HTTPFlow, HTTPRequest
+
+
+def actions(engine: RuleEngine, url: str, method: str = 'GET') -> list:
+    """
+    Return the actions of the rules that match a request to the URL.
+    """
+    _, rest = url.split('://', 1)
+    host, _, path = rest.partition('/')
+
+    return [rule.action for rule in engine.match(host, '/' + path, method, url)]
+
+
+def rewritten(engine: RuleEngine, url: str) -> str:
+    """
+    Return the URL a request to the URL is sent to once the rules have been applied.
+    """
+    flow = HTTPFlow(ClientConnection.make_dummy(('127.0.0.1', 0)), ServerConnection.make_dummy(('127.0.0.1', 0)))
+    flow.request = HTTPRequest.make('GET', url)
+    engine.apply_request(flow)
+
+    return flow.request.url
+
+
+@pytest.mark.unit
+class TestRuleEngine:
+    """
+    Test case group for matching requests against the declarative rules.
+    """
+
+    def test_host_and_subdomains(self):
+        """
+        Verify that a host rule matches the host and its subdomains, but not other hosts that end the same way.
+        """
+        engine = RuleEngine([{'match': {'host': 'example.com'}, 'action': 'block'}])
+
+        assert actions(engine, 'https://example.com/') == ['block']
+        assert actions(engine, 'https://cdn.example.com/a.js') == ['block']
+        assert actions(engine, 'https://badexample.com/') == []
+
+    def test_host_case_and_trailing_dot(self):
+        """
+        Verify that a host rule matches whatever the case of the host, and a fully qualified host with a trailing dot.
+        """
+        engine = RuleEngine([{'match': {'host': 'Example.COM.'}, 'action': 'block'}])
+
+        assert actions(engine, 'https://EXAMPLE.com/') == ['block']
+        assert actions(engine, 'https://cdn.example.com./') == ['block']
+
+    def test_order_and_criteria(self):
+        """
+        Verify that matching rules are returned in the order given, filtered by path prefix, URL and method.
+        """
+        engine = RuleEngine(
+            [
+                {'match': {'path': '/api', 'method': 'post'}, 'action': 'delay', 'seconds': 1},
+                {'match': {'host': 'example.com'}, 'action': 'header', 'headers': {'X-Rule': 'yes'}},
+                {'match': {'url': r'\.js$'}, 'action': 'block'},
+            ]
+        )
+
+        assert actions(engine, 'https://example.com/api/items', method='POST') == ['delay', 'header']
+        assert actions(engine, 'https://example.com/api/items') == ['header']
+        assert actions(engine, 'https://other.com/app.js') == ['block']
+
+    def test_invalid_rule(self):
+        """
+        Verify that loading a rule that is not valid raises, naming the rule.
+        """
+        with pytest.raises(ValueError, match='Rule 1'):
+            RuleEngine([{'action': 'block'}, {'action': 'explode'}])
+
+    def test_reload(self, tmp_path, monkeypatch):
+        """
+        Verify that rules loaded from a file are reloaded when the file changes.
+        """
+        monkeypatch.setattr(rules_module, 'RELOAD_INTERVAL', 0)
+        path = tmp_path / 'rules.json'
+        path.write_text(json.dumps([{'match': {'host': 'a.com'}, 'action': 'block'}]))
+        engine = RuleEngine(str(path))
+
+        assert actions(engine, 'https://a.com/') == ['block']
+
+        path.write_text(json.dumps([{'match': {'host': 'b.com'}, 'action': 'block'}]))
+        mtime = os.stat(path).st_mtime + 10
+        os.utime(path, (mtime, mtime))
+
+        assert actions(engine, 'https://a.com/') == []
+        assert actions(engine, 'https://b.com/') == ['block']
+
+    def test_rewrite(self):
+        """
+        Verify that a rewrite replaces the part of the URL the rule matched, or what its pattern matches.
+        """
+        engine = RuleEngine(
+            [
+                {'match': {'url': r'^https://cdn\.example\.com/'}, 'action': 'rewrite', 'url': 'https://cdn.test/'},
+                {'match': {'host': 'api.example.com'}, 'action': 'rewrite', 'pattern': r'/v1/', 'url': '/v2/'},
+                {'match': {'host': 'old.example.com'}, 'action': 'rewrite', 'url': 'https://new.example.com/'},
+            ]
+        )
+
+        assert rewritten(engine, 'https://cdn.example.com/js/app.js?v=1') == 'https://cdn.test/js/app.js?v=1'
+        assert rewritten(engine, 'https://api.example.com/v1/items') == 'https://api.example.com/v2/items'
+        assert rewritten(engine, 'https://old.example.com/page') == 'https://new.example.com/'
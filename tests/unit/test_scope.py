@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+
+from seleniumwire.handler import InterceptRequestHandler
+from seleniumwire.scope import ScopeMatcher
+
+
+def make_handler(scopes=None, **options) -> InterceptRequestHandler:
+    """
+    Create a capture add-on for a stand-in proxy with the supplied scopes and options.
+    """
+    return InterceptRequestHandler(SimpleNamespace(options=options, scope_matcher=ScopeMatcher(scopes)))
+
+
+def make_request(url: str, method: str = 'GET') -> SimpleNamespace:
+    """
+    Create a request with the attributes the scope decision reads.
+    """
+    return SimpleNamespace(method=method, url=url)
+
+
+@pytest.mark.unit
+class TestScopeMatcher:
+    """
+    Test case group for matching requests against the capture scopes.
+    """
+
+    def test_matches(self):
+        """
+        Verify that requests are matched against any of the scopes, and ignored methods never match.
+        """
+        matcher = ScopeMatcher(['(?i)FOO', r'(a)\1'])
+
+        assert matcher.matches('GET', 'https://foo.com/')
+        assert matcher.matches('GET', 'https://aa.com/')
+        assert not matcher.matches('GET', 'https://bar.com/')
+        assert not matcher.matches('OPTIONS', 'https://foo.com/')
+
+    def test_matching_is_not_counted(self):
+        """
+        Verify that only recorded decisions are counted.
+        """
+        matcher = ScopeMatcher('foo')
+        matcher.matches('GET', 'https://foo.com/')
+        matcher.count(True)
+        matcher.count(True, sampled=False)
+        matcher.count(False)
+
+        assert matcher.stats() == {'hits': 1, 'misses': 1, 'sampled_out': 1}
+
+
+@pytest.mark.unit
+class TestInScope:
+    """
+    Test case group for the scope decision made for each flow.
+    """
+
+    def test_counted_once_per_flow(self):
+        """
+        Verify that a flow is counted once, however many hooks decide its scope, even when its URL changes.
+        """
+        handler = make_handler('foo')
+        flow = SimpleNamespace(metadata={})
+
+        assert handler.in_scope(make_request('http://foo.com/'), flow)
+        assert handler.in_scope(make_request('http://foo.com/'), flow)
+        assert handler.in_scope(make_request('https://foo.com/'), flow)
+
+        assert handler.proxy.scope_matcher.stats() == {'hits': 1, 'misses': 0, 'sampled_out': 0}
+
+    def test_sampled_out(self):
+        """
+        Verify that a flow in scope that sampling leaves out is neither captured nor counted as a hit.
+        """
+        handler = make_handler('foo', capture_sample_rate=0)
+        flow = SimpleNamespace(metadata={})
+
+        assert not handler.in_scope(make_request('http://foo.com/'), flow)
+        assert not handler.in_scope(make_request('http://foo.com/'), flow)
+
+        assert flow.metadata['seleniumwire_scope'][1], "The scope match was not kept apart from sampling."
+        assert handler.proxy.scope_matcher.stats() == {'hits': 0, 'misses': 0, 'sampled_out': 1}
+
+    def test_scopes_changed(self):
+        """
+        Verify that a flow is decided afresh once the scopes change.
+        """
+        handler = make_handler('foo')
+        flow = SimpleNamespace(metadata={})
+
+        assert handler.in_scope(make_request('http://foo.com/'), flow)
+        handler.proxy.scope_matcher.scopes = 'bar'
+
+        assert not handler.in_scope(make_request('http://foo.com/'), flow)
@@ -0,0 +1,575 @@
+import copy
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+from seleniumwire import storage
+from seleniumwire.request import Request, Response
+from seleniumwire.thirdparty.mitmproxy.options import CONF_BASENAME
+
+
+def make_request(url: str = 'https://example.com/', body: bytes = b'') -> Request:
+    """
+    Create a request with a text body, as the proxy captures it.
+    """
+    return Request(method='POST', url=url, headers=[('Content-Type', 'text/plain')], body=body)
+
+
+def make_response(body: bytes = b'') -> Response:
+    """
+    Create a response with a text body, as the proxy captures it.
+    """
+    return Response(status_code=200, reason='OK', headers=[('Content-Type', 'text/plain')], body=body)
+
+
+# Each backend, as uncompressed and compressed, with the in-memory storage spilling every body to disk.
+BACKENDS = [
+    pytest.param({}, id='directory'),
+    pytest.param({'compress': True, 'compression_threshold': 1}, id='directory-compressed'),
+    pytest.param({'request_storage': 'segment'}, id='segment'),
+    pytest.param({'request_storage': 'segment', 'compress': True, 'compression_threshold': 1}, id='segment-compressed'),
+    pytest.param({'request_storage': 'sqlite'}, id='sqlite'),
+    pytest.param({'request_storage': 'sqlite', 'compress': True, 'compression_threshold': 1}, id='sqlite-compressed'),
+    pytest.param({'request_storage': 'memory', 'max_memory': 0}, id='memory'),
+    pytest.param(
+        {'request_storage': 'memory', 'max_memory': 0, 'compress': True, 'compression_threshold': 1},
+        id='memory-compressed',
+    ),
+]
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path):
+    store = storage.create(base_dir=str(tmp_path), **request.param)
+    yield store
+    store.cleanup()
+
+
+@pytest.mark.unit
+class TestClearThenRead:
+    """
+    Test case group for reading bodies loaded before the storage was cleared.
+    """
+
+    def test_unread_body(self, store):
+        """
+        Verify that a request loaded before a clear keeps bodies it had not yet read.
+        """
+        store.save_request(make_request(body=b'x' * 2000))
+        request_id = store.load_requests()[0].id
+        store.save_response(request_id, make_response(body=b'y' * 2000))
+        stale = store.load_requests()[0]
+
+        store.clear_requests()
+        store.save_request(make_request(body=b'z' * 2000))
+
+        assert stale.body == b'x' * 2000
+        assert stale.response.body == b'y' * 2000
+        assert store.load_requests()[0].body == b'z' * 2000
+
+    def test_shared_body(self, store):
+        """
+        Verify that every request sharing a body keeps it through a clear.
+        """
+        for _ in range(3):
+            store.save_request(make_request(body=b'x' * 2000))
+        stale = store.load_requests()
+
+        store.clear_requests()
+
+        assert [request.body for request in stale] == [b'x' * 2000] * 3
+
+
+@pytest.mark.unit
+class TestPickle:
+    """
+    Test case group for pickling and copying requests loaded from storage.
+    """
+
+    def test_pickle_and_copy(self, store):
+        """
+        Verify that a request with a response can be pickled and copied once loaded.
+        """
+        store.save_request(make_request(body=b'x' * 2000))
+        request_id = store.load_requests()[0].id
+        response = make_response(body=b'y' * 2000)
+        response.cert = {'subject': 'example.com'}
+        store.save_response(request_id, response)
+        request = store.load_requests()[0]
+
+        for loaded in (pickle.loads(pickle.dumps(request)), copy.copy(request), copy.deepcopy(request)):
+            assert loaded.body == b'x' * 2000
+            assert loaded.response.body == b'y' * 2000
+            assert loaded.cert == {'subject': 'example.com'}
+
+    def test_self_contained(self, store):
+        """
+        Verify that a pickled request keeps its bodies once the storage has been cleaned up.
+        """
+        store.save_request(make_request(body=b'x' * 2000))
+        request_id = store.load_requests()[0].id
+        store.save_response(request_id, make_response(body=b'y' * 2000))
+        data = pickle.dumps(store.load_requests()[0])
+
+        store.cleanup()
+        request = pickle.loads(data)
+
+        assert request.body == b'x' * 2000
+        assert request.response.body == b'y' * 2000
+
+
+@pytest.mark.unit
+class TestMappedBody:
+    """
+    Test case group for bodies mapped from a file.
+    """
+
+    def test_missing_file(self, tmp_path):
+        """
+        Verify that reading a body whose file has gone raises rather than returning an empty body.
+        """
+        with pytest.raises(storage.BodyNotFoundError):
+            storage.MappedBody(str(tmp_path / 'body'))()
+
+    def test_truncated_file(self, tmp_path):
+        """
+        Verify that reading a body past the end of its file raises rather than returning part of it.
+        """
+        path = tmp_path / 'segment'
+        path.write_bytes(b'x' * 10)
+
+        with pytest.raises(storage.BodyNotFoundError):
+            storage.MappedBody(str(path), offset=5, length=10)()
+
+    def test_detached(self, tmp_path):
+        """
+        Verify that a detached body is still read once its file has gone.
+        """
+        path = tmp_path / 'body'
+        path.write_bytes(b'x' * 10)
+        body = storage.MappedBody(str(path))
+
+        body.detach()
+        path.unlink()
+
+        assert body() == b'x' * 10
+
+
+@pytest.mark.unit
+class TestSegmentRequestStorage:
+    """
+    Test case group for the append-only segment storage.
+    """
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = storage.create(request_storage='segment', base_dir=str(tmp_path), segment_size=4096)
+        yield store
+        store.cleanup()
+
+    def test_rollover(self, store):
+        """
+        Verify that records spread across several segments are all read back.
+        """
+        bodies = [bytes([i]) * 1500 for i in range(1, 10)]
+
+        for body in bodies:
+            store.save_request(make_request(body=body))
+
+        assert [request.body for request in store.load_requests()] == bodies
+        assert len(store._segments) > 1, "The records did not roll over to a new segment."
+
+    def test_stale_body_after_clear(self, store):
+        """
+        Verify that a body loaded before the storage was cleared never reads a record saved after it.
+        """
+        store.save_request(make_request(body=b'x' * 100))
+        stale = store.load_requests()[0]
+
+        store.clear_requests()
+        store.save_request(make_request(body=b'z' * 100))
+
+        assert store.load_requests()[0].body == b'z' * 100
+        assert stale.body == b'x' * 100, "A body loaded before the clear did not keep its content."
+
+    def test_stale_compressed_body_after_clear(self, tmp_path):
+        """
+        Verify that a compressed body loaded before the storage was cleared is still read back intact.
+        """
+        store = storage.create(request_storage='segment', base_dir=str(tmp_path), compress=True)
+
+        try:
+            store.save_request(make_request(body=b'x' * 10000))
+            stale = store.load_requests()[0]
+
+            store.clear_requests()
+            store.save_request(make_request(body=b'z' * 10000))
+
+            assert stale.body == b'x' * 10000
+        finally:
+            store.cleanup()
+
+    def test_load_during_clear(self, store):
+        """
+        Verify that loading requests while the storage is cleared never fails.
+        """
+        errors = []
+        stop = threading.Event()
+
+        def load():
+            while not stop.is_set():
+                try:
+                    for request in store.load_requests():
+                        assert request.url == 'https://example.com/'
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=load) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+
+        for _ in range(200):
+            for _ in range(5):
+                store.save_request(make_request())
+            store.clear_requests()
+
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        assert not errors, "Loading failed during a clear: {!r}".format(errors[:3])
+
+
+@pytest.mark.unit
+class TestAsyncWrites:
+    """
+    Test case group for storages that write on a background thread.
+    """
+
+    @pytest.fixture(params=[None, 'segment', 'sqlite'])
+    def store(self, request, tmp_path):
+        store = storage.create(request_storage=request.param, base_dir=str(tmp_path), async_writes=True)
+        yield store
+        store.cleanup()
+
+    def test_save_during_cleanup(self, store):
+        """
+        Verify that requests saved while and after the storage is cleaned up are dropped without failing.
+        """
+        errors = []
+
+        def save():
+            for _ in range(200):
+                try:
+                    store.save_request(make_request(body=b'x' * 100))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+
+        store.cleanup()
+
+        for thread in threads:
+            thread.join()
+
+        store.save_request(make_request())
+
+        assert not errors, "Saving failed during cleanup: {!r}".format(errors[:3])
+
+    def test_flush_under_traffic(self, store):
+        """
+        Verify that flushing returns while requests keep arriving.
+        """
+        stop = threading.Event()
+
+        def save():
+            while not stop.is_set():
+                store.save_request(make_request(body=b'x' * 100))
+
+        saver = threading.Thread(target=save)
+        saver.start()
+
+        try:
+            for _ in range(5):
+                flusher = threading.Thread(target=store.flush)
+                flusher.start()
+                flusher.join(timeout=10)
+
+                assert not flusher.is_alive(), "Flushing did not return while requests kept arriving."
+        finally:
+            stop.set()
+            saver.join()
+
+    def test_flush_writes_queued(self, store):
+        """
+        Verify that the writes queued before a flush have landed when it returns.
+        """
+        for _ in range(50):
+            store.save_request(make_request(body=b'x' * 100))
+
+        store.flush()
+
+        assert not store._pending
+
+
+@pytest.mark.unit
+class TestSqliteRequestStorage:
+    """
+    Test case group for the SQLite storage.
+    """
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = storage.create(request_storage='sqlite', base_dir=str(tmp_path))
+        yield store
+        store.cleanup()
+
+    def test_query(self, store):
+        """
+        Verify that requests are queried inside the database.
+        """
+        store.save_request(make_request(url='https://a.example.com/'))
+        store.save_request(make_request(url='https://b.example.com/'))
+
+        assert [request.url for request in store.query(host='b.example.com')] == ['https://b.example.com/']
+
+    def test_use_after_cleanup(self, store):
+        """
+        Verify that a storage that has been cleaned up can still be used, as if empty, without failing.
+        """
+        store.save_request(make_request(body=b'x' * 100))
+        store.cleanup()
+
+        # Writes arriving late from the proxy threads
+        store._save(make_request(), 'late', 'request')
+        store._write_body('late', b'x' * 100)
+
+        assert store.query(host='example.com') == []
+        assert store.load_requests() == []
+        assert store._load('late', 'request') is None
+
+
+@pytest.mark.unit
+class TestInMemoryBudget:
+    """
+    Test case group for the memory budget of the in-memory storage.
+    """
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = storage.create(request_storage='memory', base_dir=str(tmp_path), max_memory=50000)
+        yield store
+        store.cleanup()
+
+    def test_budget_after_read(self, store):
+        """
+        Verify that reading bodies holds no more of them in memory than the storage accounts for.
+        """
+        for i in range(20):
+            store.save_request(make_request(body=bytes([i]) * 10000))
+
+            for request in store.load_requests():
+                assert request.body == bytes([int(request.body[0])]) * 10000
+
+        held = sum(len(request._body) for request in store.load_requests() if isinstance(request._body, bytes))
+
+        assert store.stats()['resident_bytes'] <= 50000
+        assert held == store.stats()['resident_bytes']
+
+    def test_compressed_budget_after_read(self, tmp_path):
+        """
+        Verify that reading compressed bodies leaves them compressed in memory.
+        """
+        store = storage.create(request_storage='memory', base_dir=str(tmp_path), compress=True)
+
+        try:
+            for i in range(10):
+                store.save_request(make_request(body=bytes([i]) * 100000))
+
+            assert [request.body for request in store.load_requests()] == [bytes([i]) * 100000 for i in range(10)]
+            assert all(isinstance(request._body, storage.CompressedBody) for request in store.load_requests())
+            assert store.stats()['resident_bytes'] < 10000
+        finally:
+            store.cleanup()
+
+    def test_pickle_spilled(self, store):
+        """
+        Verify that a request whose body was spilled to disk pickles with its body.
+        """
+        store.save_request(make_request(body=b'x' * 100000))
+        request = store.load_requests()[0]
+        store.clear_requests()
+
+        assert pickle.loads(pickle.dumps(request)).body == b'x' * 100000
+
+    @pytest.mark.parametrize('compress', [False, True])
+    def test_lru_read_body_kept(self, tmp_path, compress):
+        """
+        Verify that with LRU eviction, a body read since it was saved is kept in memory over one that was not.
+        """
+        store = storage.create(
+            request_storage='memory', base_dir=str(tmp_path), max_memory=25000, eviction='lru', compress=compress
+        )
+
+        try:
+            read, unread = make_request(body=os.urandom(10000)), make_request(body=os.urandom(10000))
+            store.save_request(read)
+            store.save_request(unread)
+            assert read.body
+            store.save_request(make_request(body=os.urandom(10000)))
+
+            assert isinstance(unread._body, storage.MappedBody)
+            assert not isinstance(read._body, storage.MappedBody)
+        finally:
+            store.cleanup()
+
+    def test_lru_iterated_kept(self, tmp_path):
+        """
+        Verify that with LRU eviction, iterating over the requests counts as using their bodies.
+        """
+        store = storage.create(request_storage='memory', base_dir=str(tmp_path), max_memory=25000, eviction='lru')
+
+        try:
+            first, second = make_request(body=b'a' * 10000), make_request(body=b'b' * 10000)
+            store.save_request(first)
+            store.save_request(second)
+            assert next(store.iter_requests()) is first
+            store.save_request(make_request(body=b'c' * 10000))
+
+            assert isinstance(second._body, storage.MappedBody)
+            assert not isinstance(first._body, storage.MappedBody)
+        finally:
+            store.cleanup()
+
+
+@pytest.mark.unit
+class TestSaveDuringClear:
+    """
+    Test case group for saving bodies while the storage is cleared.
+    """
+
+    @pytest.fixture(params=[None, 'segment', 'sqlite'])
+    def store(self, request, tmp_path):
+        store = storage.create(request_storage=request.param, base_dir=str(tmp_path))
+        yield store
+        store.cleanup()
+
+    def test_identical_body(self, store, monkeypatch):
+        """
+        Verify that a body saved again while the storage is cleared is not removed with the cleared one.
+        """
+        store.save_request(make_request(body=b'x' * 100))
+        discard = store._discard
+
+        def save_then_discard(*args):
+            # Arrives after the clear has released the body and before it is removed
+            store.save_request(make_request(body=b'x' * 100))
+            discard(*args)
+
+        monkeypatch.setattr(store, '_discard', save_then_discard)
+        store.clear_requests()
+
+        assert [request.body for request in store.load_requests()] == [b'x' * 100]
+        assert store.stats()['bodies'] == 1
+
+    def test_concurrent_saves(self, store):
+        """
+        Verify that every request saved while the storage is cleared keeps its body.
+        """
+        def save():
+            for _ in range(100):
+                store.save_request(make_request(body=b'x' * 100))
+
+        threads = [threading.Thread(target=save) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+
+        while any(thread.is_alive() for thread in threads):
+            store.clear_requests()
+
+        for thread in threads:
+            thread.join()
+
+        assert all(request.body == b'x' * 100 for request in store.load_requests())
+
+
+@pytest.mark.unit
+class TestCleanupOldDirs:
+    """
+    Test case group for sweeping the storage directories left behind by earlier sessions.
+    """
+
+    def test_keeps_certificates(self, tmp_path):
+        """
+        Verify that the sweep removes old storage directories but keeps the certificates persisted beside them.
+        """
+        home_dir = tmp_path / '.seleniumwire'
+        cert_dir = home_dir / '{}-certs'.format(CONF_BASENAME) / '0123456789abcdef'
+        cert_dir.mkdir(parents=True)
+        (cert_dir / 'cert.pem').write_bytes(b'cert')
+        old_storage_dir = home_dir / 'storage-old'
+        old_storage_dir.mkdir()
+
+        old = time.time() - 2 * 24 * 60 * 60
+        for path in (cert_dir.parent, cert_dir, old_storage_dir):
+            os.utime(path, (old, old))
+
+        store = storage.create(base_dir=str(tmp_path))
+        store.cleanup()
+
+        assert not old_storage_dir.exists()
+        assert (cert_dir / 'cert.pem').read_bytes() == b'cert'
+
+
+@pytest.mark.unit
+class TestWaitFor:
+    """
+    Test case group for waiting for a request to be captured.
+    """
+
+    @pytest.fixture(params=[None, 'segment', 'sqlite', 'memory'])
+    def store(self, request, tmp_path):
+        store = storage.create(request_storage=request.param, base_dir=str(tmp_path))
+        yield store
+        store.cleanup()
+
+    def test_woken_by_request(self, store):
+        """
+        Verify that a waiter not needing a response is woken as soon as a matching request is saved.
+        """
+        timer = threading.Timer(0.2, lambda: store.save_request(make_request(url='https://example.com/match')))
+        timer.start()
+        start = time.monotonic()
+
+        try:
+            request = store.wait_for('match', timeout=10, check_response=False)
+        finally:
+            timer.join()
+
+        assert request.url == 'https://example.com/match'
+        assert time.monotonic() - start < 5, "The waiter was not woken by the request."
+
+    def test_match_cleared(self, store, monkeypatch):
+        """
+        Verify that a waiter whose match is cleared before it is loaded keeps waiting for another.
+        """
+        if isinstance(store, storage.InMemoryRequestStorage):
+            pytest.skip('Requests held in memory are returned as they are')
+
+        store.save_request(make_request(url='https://example.com/first'))
+        load_request = store._load_request
+
+        def clear_then_load(request_id):
+            monkeypatch.setattr(store, '_load_request', load_request)
+            store.clear_requests()
+            store.save_request(make_request(url='https://example.com/second'))
+            return load_request(request_id)
+
+        monkeypatch.setattr(store, '_load_request', clear_then_load)
+
+        assert store.wait_for('example', timeout=5, check_response=False).url == 'https://example.com/second'
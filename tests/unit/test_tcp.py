@@ -0,0 +1,105 @@
+import io
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from seleniumwire.thirdparty.mitmproxy import exceptions
+from seleniumwire.thirdparty.mitmproxy.net import tcp
+
+
+def send(sock: socket.socket, pieces) -> threading.Thread:
+    """
+    Send the pieces over the socket one at a time on a thread of its own, then close it.
+    """
+
+    def run():
+        for piece in pieces:
+            sock.sendall(piece)
+            time.sleep(0.01)
+
+        sock.close()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    return thread
+
+
+@pytest.mark.unit
+class TestReader:
+    """
+    Test case group for reading from connections.
+    """
+
+    @pytest.fixture
+    def sockets(self):
+        ours, theirs = socket.socketpair()
+        ours.settimeout(5)
+        yield ours, theirs
+        ours.close()
+        theirs.close()
+
+    def test_readline_fragmented(self, sockets):
+        """
+        Verify that lines that arrive in pieces are read whole, up to the end of the stream.
+        """
+        ours, theirs = sockets
+        reader = tcp.Reader(socket.SocketIO(ours, 'rb'))
+        reader.start_log()
+        thread = send(theirs, [b'GET / HT', b'TP/1.1\r', b'\nHost: x\r\n', b'\r\nrest'])
+
+        assert reader.readline() == b'GET / HTTP/1.1\r\n'
+        assert reader.readline() == b'Host: x\r\n'
+        assert reader.readline() == b'\r\n'
+        assert reader.readline() == b'rest'
+        assert reader.readline() == b''
+        assert reader.get_log() == b'GET / HTTP/1.1\r\nHost: x\r\n\r\nrest'
+        thread.join(5)
+
+    def test_readline_reads_no_further(self, sockets):
+        """
+        Verify that nothing beyond the line, or the size asked for, is taken from the socket.
+        """
+        ours, theirs = sockets
+        reader = tcp.Reader(socket.SocketIO(ours, 'rb'))
+        theirs.sendall(b'abcdefgh\nXYZ')
+
+        assert reader.readline(3) == b'abc'
+        assert reader.readline() == b'defgh\n'
+        assert ours.recv(10, socket.MSG_PEEK) == b'XYZ'
+        assert reader.read(3) == b'XYZ'
+
+    def test_read_until_closed(self, sockets):
+        """
+        Verify that large reads return all of the data, in order.
+        """
+        ours, theirs = sockets
+        reader = tcp.Reader(socket.SocketIO(ours, 'rb'))
+        data = os.urandom(3 * 1024 * 1024 + 7)
+        thread = send(theirs, [data])
+
+        assert reader.safe_read(1024 * 1024) + reader.read(-1) == data
+        thread.join(5)
+
+    def test_incomplete(self, sockets):
+        """
+        Verify that a read of more than is sent before the connection is closed raises.
+        """
+        ours, theirs = sockets
+        reader = tcp.Reader(socket.SocketIO(ours, 'rb'))
+        theirs.sendall(b'abc')
+        theirs.close()
+
+        with pytest.raises(exceptions.TcpReadIncomplete):
+            reader.safe_read(10)
+
+    def test_file(self):
+        """
+        Verify that lines are read from a file that cannot be peeked at.
+        """
+        reader = tcp.Reader(io.BytesIO(b'one\ntwo\nthree'))
+
+        assert [reader.readline() for _ in range(4)] == [b'one\n', b'two\n', b'three', b'']
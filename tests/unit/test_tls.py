@@ -0,0 +1,136 @@
+import datetime
+import socket
+import ssl
+import threading
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from seleniumwire.thirdparty.mitmproxy.connections import ServerConnection
+from seleniumwire.thirdparty.mitmproxy.net import tls
+
+
+def make_cert_file(path) -> str:
+    """
+    Write a self-signed certificate for localhost and its key to a file, returning the path of the file.
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    path.write_bytes(
+        cert.public_bytes(serialization.Encoding.PEM)
+        + key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    )
+
+    return str(path)
+
+
+@pytest.mark.unit
+class TestContextCache:
+    """
+    Test case group for sharing SSL contexts and TLS sessions between connections to servers.
+    """
+
+    @pytest.fixture(params=[ssl.TLSVersion.TLSv1_2, ssl.TLSVersion.TLSv1_3])
+    def server(self, request, tmp_path):
+        """
+        A TLS server that sends each connection a greeting, recording whether each resumed a session.
+        """
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(make_cert_file(tmp_path / 'server.pem'))
+        context.maximum_version = request.param
+        sock = socket.create_server(('127.0.0.1', 0))
+        resumed = []
+
+        def serve():
+            while True:
+                try:
+                    conn, _ = sock.accept()
+                except OSError:
+                    return
+
+                with context.wrap_socket(conn, server_side=True) as tls_conn:
+                    resumed.append(tls_conn.session_reused)
+                    tls_conn.sendall(b'hello')
+                    # Wait for the client to finish, so that it reads the TLS 1.3 session sent after the handshake
+                    tls_conn.recv(1)
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        yield sock.getsockname(), resumed
+        # Wakes the server from accepting
+        sock.shutdown(socket.SHUT_RDWR)
+        sock.close()
+        thread.join(5)
+
+    def connect(self, address, cache: tls.ContextCache) -> ServerConnection:
+        conn = ServerConnection(address)
+        conn.connect()
+        conn.establish_tls(sni='localhost', context_cache=cache)
+
+        try:
+            assert conn.rfile.read(5) == b'hello'
+        finally:
+            conn.finish()
+
+        return conn
+
+    def test_session_resumed(self, server):
+        """
+        Verify that a later connection to a server shares the context and resumes the session of an earlier one.
+        """
+        address, resumed = server
+        cache = tls.ContextCache()
+
+        for _ in range(2):
+            self.connect(address, cache)
+
+        assert resumed == [False, True]
+        assert cache.stats() == {
+            'contexts': 1,
+            'context_hits': 1,
+            'context_misses': 1,
+            'sessions': 1,
+            'session_hits': 1,
+            'session_misses': 1,
+        }
+
+    def test_server_kept_with_connection(self, server):
+        """
+        Verify that a connection made with a shared context keeps the name and address of its server for errors.
+        """
+        address, _ = server
+        conn = self.connect(address, tls.ContextCache())
+
+        assert conn.connection.get_app_data() == ('localhost', address)
+
+    def test_context_per_arguments(self):
+        """
+        Verify that a context is shared by connections made with the same arguments only.
+        """
+        cache = tls.ContextCache(max_contexts=2)
+        context, key = cache.client_context(alpn_protos=[b'http/1.1'])
+
+        assert cache.client_context(alpn_protos=[b'http/1.1']) == (context, key)
+        assert cache.client_context(alpn_protos=[b'h2', b'http/1.1'])[0] is not context
+
+        cache.client_context(alpn_protos=[b'h2'])
+
+        assert cache.client_context(alpn_protos=[b'http/1.1'])[0] is not context
+        assert cache.stats()['contexts'] == 2